@@ -5,6 +5,9 @@ from astral import LocationInfo
 from astral.sun import sun
 import pickle
 import os
+import json
+import hashlib
+import copy
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
@@ -12,18 +15,49 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, accuracy_score
 import warnings
 import pytz
+from ml_cache import ml_prediction_cache, quantize_features
 warnings.filterwarnings('ignore')
 
+MODEL_FILES = ['regression_model.pkl', 'classification_model.pkl', 'scaler.pkl']
+
+# 香港地理位置（日出日落時間；攝影機選擇的太陽方位角亦使用此位置）
+HK_LOCATION = LocationInfo("Hong Kong", "Hong Kong", "Asia/Hong_Kong", 22.3193, 114.1694)
+
+
+def compute_model_version(model_dir='models'):
+    """
+    根據模型檔案內容計算版本號（內容雜湊，重新部署或複製檔案不會改變版本）
+
+    Returns:
+        str 或 None（任何模型檔案不存在）
+    """
+    digest = hashlib.sha1()
+    for filename in MODEL_FILES:
+        path = os.path.join(model_dir, filename)
+        if not os.path.exists(path):
+            return None
+        digest.update(filename.encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
 class AdvancedBurnskyPredictor:
+    # 機器學習特徵（順序與已訓練模型一致）
+    FEATURE_NAMES = ['temperature', 'humidity', 'uv_index', 'rainfall', 'wind_speed', 'time_factor', 'cloud_score']
+
     def __init__(self):
         """初始化進階燒天預測器"""
         # 香港地理位置
-        self.hong_kong = LocationInfo("Hong Kong", "Hong Kong", "Asia/Hong_Kong", 22.3193, 114.1694)
+        self.hong_kong = HK_LOCATION
         
         # 機器學習模型
         self.regression_model = None
         self.classification_model = None
         self.scaler = StandardScaler()
+        self.model_version = None
+        self.model_metadata = {}
         
         # 雲層類型映射
         self.cloud_types = {
@@ -430,141 +464,172 @@ class AdvancedBurnskyPredictor:
         }
         return recommendations.get(visibility_level, "請根據實際情況判斷")
     
-    def generate_training_data(self, num_samples=1000):
-        """生成訓練數據（模擬歷史燒天數據）"""
-        np.random.seed(42)  # 確保可重現性
+    # 合成訓練數據各類別的特徵分佈（低、中、高機率燒天條件）
+    TRAINING_CLASS_PROFILES = {
+        0: {  # 低機率燒天條件
+            'temperature': (25, 3),      # 較低溫度
+            'humidity': (80, 10),        # 較高濕度
+            'uv_gamma': (1, 1.5),        # 較低UV
+            'rain_scale': 3,             # 較多降雨
+            'time_beta': (1, 4),         # 較差時間
+            'cloud': (8, 3),             # 較差雲層
+            'target_range': (10, 35)
+        },
+        1: {  # 中機率燒天條件
+            'temperature': (28, 2),
+            'humidity': (75, 8),
+            'uv_gamma': (2, 2),
+            'rain_scale': 1.5,
+            'time_beta': (2, 3),
+            'cloud': (12, 3),
+            'target_range': (35, 65)
+        },
+        2: {  # 高機率燒天條件
+            'temperature': (30, 2),
+            'humidity': (70, 8),
+            'uv_gamma': (3, 2),
+            'rain_scale': 0.8,
+            'time_beta': (4, 2),
+            'cloud': (16, 3),
+            'target_range': (65, 90)
+        }
+    }
+    
+    TRAINING_COLUMNS = FEATURE_NAMES + ['burnsky_score', 'burnsky_class']
+    
+    def _generate_class_samples(self, class_type, n, rng):
+        """向量化生成單一類別的樣本"""
+        profile = self.TRAINING_CLASS_PROFILES[class_type]
+        
+        # 確保值在合理範圍內
+        temperature = np.clip(rng.normal(*profile['temperature'], n), 15, 40)
+        humidity = np.clip(rng.normal(*profile['humidity'], n), 30, 95)
+        uv_index = np.clip(rng.gamma(*profile['uv_gamma'], n), 0, 15)
+        rainfall = rng.exponential(profile['rain_scale'], n)
+        wind_speed = rng.gamma(1.5, 2, n)
+        time_factor = np.clip(rng.beta(*profile['time_beta'], n), 0, 1)
+        cloud_score = np.clip(rng.normal(*profile['cloud'], n), 0, 20)
+        
+        # 計算燒天指數（基於改良經驗公式）
+        temp_score = np.maximum(0, 25 - np.abs(temperature - 29) * 1.5)   # 最佳範圍 26-32度
+        humid_score = np.maximum(0, 25 - np.abs(humidity - 70) * 0.25)    # 最佳範圍 60-80%
+        uv_score = np.minimum(uv_index * 1.5, 15)                         # 適中UV有利
+        rain_penalty = np.maximum(15 - rainfall * 1.5, 0)                 # 降雨懲罰
+        time_score = time_factor * 20                                     # 時間加權
+        cloud_contribution = cloud_score * 0.8                            # 雲層貢獻
+        
+        burnsky_score = (
+            temp_score * 0.25 +      # 溫度25%
+            humid_score * 0.2 +      # 濕度20%
+            uv_score * 0.15 +        # UV 15%
+            rain_penalty * 0.15 +    # 降雨15%
+            time_score * 0.15 +      # 時間15%
+            cloud_contribution * 0.1  # 雲層10%
+        )
         
-        data = []
+        # 調整分數以符合目標範圍
+        min_target, max_target = profile['target_range']
+        burnsky_score = np.where(burnsky_score < min_target, rng.uniform(min_target, min_target + 5, n), burnsky_score)
+        burnsky_score = np.where(burnsky_score > max_target, rng.uniform(max_target - 5, max_target, n), burnsky_score)
+        
+        # 添加小量隨機變化
+        burnsky_score = np.clip(burnsky_score + rng.normal(0, 2, n), 0, 100)
+        
+        return {
+            'temperature': temperature,
+            'humidity': humidity,
+            'uv_index': uv_index,
+            'rainfall': rainfall,
+            'wind_speed': wind_speed,
+            'time_factor': time_factor,
+            'cloud_score': cloud_score,
+            'burnsky_score': burnsky_score,
+            'burnsky_class': np.full(n, class_type)
+        }
+    
+    def _generate_remaining_samples(self, n, rng):
+        """向量化生成補足樣本（簡化版分佈，類別隨機）"""
+        class_type = rng.choice([0, 1, 2], n)
+        temp_mean = np.choose(class_type, [25, 28, 30])
+        temp_std = np.choose(class_type, [3, 2, 2])
+        score_low = np.choose(class_type, [10, 35, 65])
+        score_high = np.choose(class_type, [35, 65, 90])
         
+        return {
+            'temperature': np.clip(rng.normal(temp_mean, temp_std), 15, 40),
+            'humidity': rng.normal(75, 10, n),
+            'uv_index': rng.gamma(2, 2, n),
+            'rainfall': rng.exponential(1.5, n),
+            'wind_speed': rng.gamma(1.5, 2, n),
+            'time_factor': rng.beta(2, 3, n),
+            'cloud_score': rng.normal(12, 4, n),
+            'burnsky_score': rng.uniform(score_low, score_high),
+            'burnsky_class': class_type
+        }
+    
+    def _generate_training_arrays(self, num_samples, rng):
+        """生成一批訓練數據（欄位名稱 → numpy 陣列）"""
         # 確保每個類別都有足夠的樣本
         samples_per_class = num_samples // 3
-        
-        for class_type in [0, 1, 2]:  # 低、中、高機率
-            for i in range(samples_per_class):
-                if class_type == 0:  # 低機率燒天條件
-                    temperature = np.random.normal(25, 3)  # 較低溫度
-                    humidity = np.random.normal(80, 10)    # 較高濕度
-                    uv_index = np.random.gamma(1, 1.5)     # 較低UV
-                    rainfall = np.random.exponential(3)    # 較多降雨
-                    time_factor = np.random.beta(1, 4)     # 較差時間
-                    cloud_score = np.random.normal(8, 3)   # 較差雲層
-                    target_score_range = (10, 35)
-                    
-                elif class_type == 1:  # 中機率燒天條件
-                    temperature = np.random.normal(28, 2)  # 適中溫度
-                    humidity = np.random.normal(75, 8)     # 適中濕度
-                    uv_index = np.random.gamma(2, 2)       # 適中UV
-                    rainfall = np.random.exponential(1.5)  # 少量降雨
-                    time_factor = np.random.beta(2, 3)     # 一般時間
-                    cloud_score = np.random.normal(12, 3)  # 一般雲層
-                    target_score_range = (35, 65)
-                    
-                else:  # 高機率燒天條件
-                    temperature = np.random.normal(30, 2)  # 較高溫度
-                    humidity = np.random.normal(70, 8)     # 適中偏低濕度
-                    uv_index = np.random.gamma(3, 2)       # 較高UV
-                    rainfall = np.random.exponential(0.8)  # 很少降雨
-                    time_factor = np.random.beta(4, 2)     # 較好時間
-                    cloud_score = np.random.normal(16, 3)  # 較好雲層
-                    target_score_range = (65, 90)
-                
-                # 確保值在合理範圍內
-                temperature = max(15, min(40, temperature))
-                humidity = max(30, min(95, humidity))
-                uv_index = max(0, min(15, uv_index))
-                rainfall = max(0, rainfall)
-                wind_speed = np.random.gamma(1.5, 2)
-                time_factor = max(0, min(1, time_factor))
-                cloud_score = max(0, min(20, cloud_score))
-                
-                # 計算燒天指數（基於改良經驗公式）
-                # 溫度貢獻：最佳範圍 26-32度
-                temp_score = max(0, 25 - abs(temperature - 29) * 1.5)
-                
-                # 濕度貢獻：最佳範圍 60-80%
-                humid_score = max(0, 25 - abs(humidity - 70) * 0.25)
-                
-                # UV貢獻：適中UV有利
-                uv_score = min(uv_index * 1.5, 15)
-                
-                # 降雨懲罰
-                rain_penalty = max(15 - rainfall * 1.5, 0)
-                
-                # 時間加權
-                time_score = time_factor * 20
-                
-                # 雲層貢獻
-                cloud_contribution = cloud_score * 0.8
-                
-                # 綜合分數計算
-                burnsky_score = (
-                    temp_score * 0.25 +      # 溫度25%
-                    humid_score * 0.2 +      # 濕度20%
-                    uv_score * 0.15 +        # UV 15%
-                    rain_penalty * 0.15 +    # 降雨15%
-                    time_score * 0.15 +      # 時間15%
-                    cloud_contribution * 0.1  # 雲層10%
-                )
-                
-                # 調整分數以符合目標範圍
-                min_target, max_target = target_score_range
-                if burnsky_score < min_target:
-                    burnsky_score = np.random.uniform(min_target, min_target + 5)
-                elif burnsky_score > max_target:
-                    burnsky_score = np.random.uniform(max_target - 5, max_target)
-                
-                # 添加小量隨機變化
-                burnsky_score += np.random.normal(0, 2)
-                burnsky_score = max(0, min(100, burnsky_score))
-                
-                data.append({
-                    'temperature': temperature,
-                    'humidity': humidity,
-                    'uv_index': uv_index,
-                    'rainfall': rainfall,
-                    'wind_speed': wind_speed,
-                    'time_factor': time_factor,
-                    'cloud_score': cloud_score,
-                    'burnsky_score': burnsky_score,
-                    'burnsky_class': class_type
-                })
+        parts = [self._generate_class_samples(class_type, samples_per_class, rng) for class_type in [0, 1, 2]]
         
         # 添加剩餘樣本
-        remaining_samples = num_samples - len(data)
-        for i in range(remaining_samples):
-            class_type = np.random.choice([0, 1, 2])
-            # 重複上述邏輯（簡化版）
-            if class_type == 0:
-                temperature = np.random.normal(25, 3)
-                burnsky_score = np.random.uniform(10, 35)
-            elif class_type == 1:
-                temperature = np.random.normal(28, 2)
-                burnsky_score = np.random.uniform(35, 65)
-            else:
-                temperature = np.random.normal(30, 2)
-                burnsky_score = np.random.uniform(65, 90)
-            
-            data.append({
-                'temperature': max(15, min(40, temperature)),
-                'humidity': np.random.normal(75, 10),
-                'uv_index': np.random.gamma(2, 2),
-                'rainfall': np.random.exponential(1.5),
-                'wind_speed': np.random.gamma(1.5, 2),
-                'time_factor': np.random.beta(2, 3),
-                'cloud_score': np.random.normal(12, 4),
-                'burnsky_score': burnsky_score,
-                'burnsky_class': class_type
-            })
+        remaining_samples = num_samples - samples_per_class * 3
+        if remaining_samples > 0:
+            parts.append(self._generate_remaining_samples(remaining_samples, rng))
+        
+        return {column: np.concatenate([part[column] for part in parts]) for column in self.TRAINING_COLUMNS}
+    
+    def generate_training_data(self, num_samples=1000, seed=42):
+        """生成訓練數據（模擬歷史燒天數據）"""
+        rng = np.random.default_rng(seed)  # 確保可重現性
+        return pd.DataFrame(self._generate_training_arrays(num_samples, rng))
+    
+    def iter_training_data(self, num_samples, chunk_size=100000, seed=42):
+        """
+        分塊串流生成訓練數據，適用於百萬級樣本
+        
+        每個分塊使用獨立的子隨機種子，結果可重現且記憶體用量只與 chunk_size 相關
         
-        return pd.DataFrame(data)
+        Yields:
+            pd.DataFrame: 每塊最多 chunk_size 行
+        """
+        n_chunks = -(-num_samples // chunk_size)
+        child_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+        for index, child_seed in enumerate(child_seeds):
+            rows = min(chunk_size, num_samples - index * chunk_size)
+            yield pd.DataFrame(self._generate_training_arrays(rows, np.random.default_rng(child_seed)))
+    
+    def export_training_data(self, path, num_samples, chunk_size=100000, seed=42):
+        """
+        生成訓練數據並直接保存為 .npz（float32 特徵矩陣 X、回歸目標 y_score、分類目標 y_class）
+        
+        Returns:
+            str: 保存路徑
+        """
+        X = np.empty((num_samples, len(self.FEATURE_NAMES)), dtype=np.float32)
+        y_score = np.empty(num_samples, dtype=np.float32)
+        y_class = np.empty(num_samples, dtype=np.int8)
+        
+        offset = 0
+        for chunk in self.iter_training_data(num_samples, chunk_size, seed):
+            rows = len(chunk)
+            X[offset:offset + rows] = chunk[self.FEATURE_NAMES].to_numpy(dtype=np.float32)
+            y_score[offset:offset + rows] = chunk['burnsky_score'].to_numpy()
+            y_class[offset:offset + rows] = chunk['burnsky_class'].to_numpy()
+            offset += rows
+        
+        np.savez(path, X=X, y_score=y_score, y_class=y_class, feature_names=np.array(self.FEATURE_NAMES))
+        print(f"💾 已保存 {num_samples} 筆訓練數據: {path}")
+        return path
     
-    def train_models(self):
+    def train_models(self, num_samples=1000):
         """訓練機器學習模型"""
         print("🤖 正在生成訓練數據...")
-        df = self.generate_training_data(1000)
+        df = self.generate_training_data(num_samples)
         
         # 準備特徵
-        features = ['temperature', 'humidity', 'uv_index', 'rainfall', 'wind_speed', 'time_factor', 'cloud_score']
+        features = self.FEATURE_NAMES
         X = df[features]
         y_regression = df['burnsky_score']
         y_classification = df['burnsky_class']
@@ -609,7 +674,12 @@ class AdvancedBurnskyPredictor:
         print(f"✅ 分類模型準確率: {cls_acc:.2f}")
         
         # 保存模型
-        self.save_models()
+        self.save_models(metadata={
+            'source': 'train_models',
+            'num_samples': num_samples,
+            'regression_mse': float(reg_mse),
+            'classification_accuracy': float(cls_acc)
+        })
         
         return {
             'regression_mse': reg_mse,
@@ -617,8 +687,13 @@ class AdvancedBurnskyPredictor:
             'feature_importance': dict(zip(features, self.regression_model.feature_importances_))
         }
     
-    def save_models(self):
-        """保存訓練好的模型"""
+    def save_models(self, metadata=None):
+        """
+        保存訓練好的模型
+        
+        Args:
+            metadata: 可選的模型描述（參數、交叉驗證指標等），寫入 models/model_meta.json
+        """
         try:
             with open('models/regression_model.pkl', 'wb') as f:
                 pickle.dump(self.regression_model, f)
@@ -629,9 +704,22 @@ class AdvancedBurnskyPredictor:
             with open('models/scaler.pkl', 'wb') as f:
                 pickle.dump(self.scaler, f)
             
-            print("💾 模型已保存到 models/ 目錄")
+            self._register_model_version()
+            self.model_metadata = dict(metadata or {'source': 'train_models'})
+            self.model_metadata.update({
+                'version': self.model_version,
+                'saved_at': datetime.now().isoformat(),
+                'regression_model': type(self.regression_model).__name__,
+                'classification_model': type(self.classification_model).__name__
+            })
+            with open('models/model_meta.json', 'w', encoding='utf-8') as f:
+                json.dump(self.model_metadata, f, ensure_ascii=False, indent=2)
+            
+            print(f"💾 模型已保存到 models/ 目錄 (版本 {self.model_version})")
         except Exception as e:
             print(f"❌ 保存模型失敗: {e}")
+            # 新模型只存在於記憶體，不可沿用磁碟上舊模型的版本號
+            self._register_model_version(saved=False)
     
     def load_models(self):
         """載入已訓練的模型"""
@@ -649,12 +737,25 @@ class AdvancedBurnskyPredictor:
             with open('models/scaler.pkl', 'rb') as f:
                 self.scaler = pickle.load(f)
             
+            self._register_model_version()
+            if os.path.exists('models/model_meta.json'):
+                with open('models/model_meta.json', 'r', encoding='utf-8') as f:
+                    self.model_metadata = json.load(f)
             print("✅ 已載入訓練好的模型")
             return True
         except Exception as e:
             print(f"⚠️ 載入模型失敗，將重新訓練: {e}")
             return False
     
+    def _register_model_version(self, saved=True):
+        """根據模型檔案內容計算版本號，並通知推論快取（版本改變時快取自動失效）"""
+        version = compute_model_version('models') if saved else None
+        if version is None:
+            # 模型只存在於記憶體（保存失敗），以物件身份區分版本
+            version = hashlib.sha1(f"memory:{id(self)}".encode()).hexdigest()[:12]
+        self.model_version = version
+        ml_prediction_cache.set_model_version(self.model_version)
+    
     def predict_ml(self, weather_data, forecast_data):
         """使用機器學習模型進行預測"""
         # 如果模型不存在，先訓練
@@ -662,9 +763,15 @@ class AdvancedBurnskyPredictor:
             print("🤖 模型不存在，正在訓練...")
             self.train_models()
         
-        # 提取特徵
+        # 提取特徵（模型以原始特徵推論，量化只用於快取鍵）
         features = self.extract_features(weather_data, forecast_data)
         
+        # 推論快取（快取項目與返回值互不共用巢狀字典，呼叫者修改結果不會影響之後的命中）
+        cache_key = ml_prediction_cache.make_key(quantize_features(features), self.model_version)
+        cached_result = ml_prediction_cache.get(cache_key)
+        if cached_result is not None:
+            return dict(copy.deepcopy(cached_result), input_features=features)
+        
         # 標準化
         features_scaled = self.scaler.transform([list(features.values())])
         
@@ -674,10 +781,9 @@ class AdvancedBurnskyPredictor:
         classification_proba = self.classification_model.predict_proba(features_scaled)[0]
         
         # 特徵重要性
-        feature_names = ['temperature', 'humidity', 'uv_index', 'rainfall', 'wind_speed', 'time_factor', 'cloud_score']
-        importance = dict(zip(feature_names, self.regression_model.feature_importances_))
+        importance = dict(zip(self.FEATURE_NAMES, self.regression_model.feature_importances_))
         
-        return {
+        result = {
             'ml_burnsky_score': round(max(0, min(100, regression_pred))),  # round成整數
             'ml_class': classification_pred,
             'ml_class_probabilities': {
@@ -688,6 +794,8 @@ class AdvancedBurnskyPredictor:
             'feature_importance': importance,
             'input_features': features
         }
+        ml_prediction_cache.put(cache_key, copy.deepcopy(result))
+        return result
     
     def extract_features(self, weather_data, forecast_data):
         """從天氣數據中提取機器學習特徵"""
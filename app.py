@@ -1,11 +1,22 @@
-from flask import Flask, jsonify, render_template, request, send_from_directory, redirect
+from flask import Flask, jsonify, render_template, request, send_file, send_from_directory, redirect
 from flask_caching import Cache
 from flask_cors import CORS
 from hko_fetcher import fetch_weather_data, fetch_forecast_data, fetch_ninday_forecast, get_current_wind_data, fetch_warning_data
 from unified_scorer import calculate_burnsky_score_unified
 from forecast_extractor import forecast_extractor
-from hko_webcam_fetcher import RealTimeWebcamMonitor, HKOWebcamFetcher, WebcamImageAnalyzer
+from hko_webcam_fetcher import RealTimeWebcamMonitor, BackgroundWebcamMonitor, HKOWebcamFetcher, WebcamImageAnalyzer
 from burnsky_case_analyzer import BurnskyCaseAnalyzer
+from webcam_analysis_pool import WebcamAnalysisPool
+from ml_cache import ml_prediction_cache
+from feature_store import feature_store
+from webcam_metrics_store import webcam_metrics_store
+from webcam_image_proxy import WebcamImageProxy
+from modules.image_decode import DecodedPhoto, PhotoDecodeError, decode_photo, probe_image
+from modules.photo_storage import photo_storage, PUBLIC_VARIANTS as PHOTO_VARIANTS
+from modules.photo_features import extract_photo_features, generate_photo_recommendation, score_burnsky_photo
+from photo_jobs import photo_job_queue, PhotoQueueFull
+from photo_batch_analyzer import PhotoBatchPool, PHOTO_BATCH_MAX_FILES, summarize_session
+from photo_dedupe import photo_dedupe_index, compute_dhash, mean_color
 import numpy as np
 import os
 import time
@@ -16,13 +27,17 @@ from dotenv import load_dotenv
 load_dotenv()
 import threading
 from datetime import datetime, timedelta
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 import base64
 import io
 from PIL import Image
 import uuid
+import shutil
 import sqlite3
+import tempfile
 import json
+import re
 
 # ========== 模塊化組件導入 ==========
 # 優先使用模塊化組件，如果不可用則使用內嵌函數
@@ -73,8 +88,59 @@ except ImportError as e:
     PREDICTION_HISTORY_DB = os.getenv('PREDICTION_HISTORY_DB', 'prediction_history.db')
     HOURLY_SAVE_ENABLED = os.getenv('HOURLY_SAVE_ENABLED', 'True').lower() == 'true'
 
-# 即時攝影機監控系統
-webcam_monitor = RealTimeWebcamMonitor()
+# 以 `python app.py` 啟動時，spawn 進程池的工作進程會以 __mp_main__ 重新匯入本模組；
+# 工作進程只需要分析函數，不可重複啟動背景監控、排程及數據初始化
+IS_POOL_WORKER = __name__ == '__mp_main__'
+
+# 即時攝影機監控系統（背景輪詢，端點讀取最新快照）
+WEBCAM_BACKGROUND_MONITOR = os.getenv('WEBCAM_BACKGROUND_MONITOR', 'True').lower() == 'true'
+# 攝影機選擇：all = 全部32個（預設）；sun = 只分析視野覆蓋日出／日落方向的攝影機及對照組
+WEBCAM_CAMERA_SELECTION = os.getenv('WEBCAM_CAMERA_SELECTION', 'all').lower()
+webcam_analysis_pool = WebcamAnalysisPool.from_env()
+webcam_monitor = BackgroundWebcamMonitor(analysis_pool=webcam_analysis_pool,
+                                         metrics_store=webcam_metrics_store,
+                                         all_cameras=WEBCAM_CAMERA_SELECTION == 'all')
+webcam_image_proxy = WebcamImageProxy(webcam_monitor.fetcher)
+# 照片上傳預設使用工作模式（亦可由表單 async=true/false 指定）
+PHOTO_UPLOAD_ASYNC = os.getenv('PHOTO_UPLOAD_ASYNC', 'False').lower() == 'true'
+# 批次照片分析（預設共用攝影機分析的工作進程）及單次請求總大小上限
+photo_batch_pool = PhotoBatchPool.from_env(shared_pool=webcam_analysis_pool)
+PHOTO_BATCH_MAX_BYTES = int(os.getenv('PHOTO_BATCH_MAX_BYTES', str(200 * 1024 * 1024)))
+if WEBCAM_BACKGROUND_MONITOR and not IS_POOL_WORKER:
+    webcam_monitor.start()
+    print("📷 背景攝影機監控已啟動")
+
+
+# 背景監控尚未有可用快照時，建議客戶端重試的秒數
+WEBCAM_WARMUP_RETRY_AFTER = 30
+
+
+def get_webcam_conditions(detailed=True):
+    """
+    讀取攝影機分析快照；背景監控未啟用時即時分析
+
+    Returns:
+        狀況報告；背景監控已啟用但仍在預熱或快照已過期時返回 None（不在請求中即時下載全部攝影機）
+    """
+    if not WEBCAM_BACKGROUND_MONITOR:
+        return webcam_monitor.get_current_conditions(detailed=detailed, all_cameras=webcam_monitor.all_cameras)
+    snapshot = webcam_monitor.get_snapshot()
+    if snapshot is not None and not detailed:
+        # 快照總是包含詳細分析，非詳細請求只返回整體結果
+        snapshot = {key: value for key, value in snapshot.items() if key != 'individual_analyses'}
+    return snapshot
+
+
+def webcam_warming_up_response(body):
+    """背景監控沒有可用快照時的 503 回應"""
+    monitor_status = webcam_monitor.status()
+    response = jsonify(dict(body, monitor_status={
+        'running': monitor_status['running'],
+        'last_error': monitor_status['last_error']
+    }))
+    response.status_code = 503
+    response.headers['Retry-After'] = str(WEBCAM_WARMUP_RETRY_AFTER)
+    return response
 
 # ========== 以下是原始函數定義（保留用於向後兼容）==========
 # 如果模塊已載入，這些函數將被模塊中的版本覆蓋
@@ -386,13 +452,14 @@ def start_hourly_scheduler():
     print("⏰ 每小時預測保存排程已啟動")
 
 # 初始化預測歷史數據庫
-if MODULES_LOADED:
-    print("🔧 使用模塊化組件初始化系統...")
-    initialize_photo_cases()  # 初始化照片案例系統
-    start_hourly_scheduler()  # 啟動調度器
-else:
-    print("🔧 使用內嵌函數初始化系統...")
-    init_prediction_history_db()
+if not IS_POOL_WORKER:
+    if MODULES_LOADED:
+        print("🔧 使用模塊化組件初始化系統...")
+        initialize_photo_cases()  # 初始化照片案例系統
+        start_hourly_scheduler()  # 啟動調度器
+    else:
+        print("🔧 使用內嵌函數初始化系統...")
+        init_prediction_history_db()
 
 # 以下函數定義保留用於向後兼容（當模塊未載入時）
 
@@ -411,24 +478,31 @@ def validate_image_content(image_data):
         return False
 
 def cleanup_old_photos():
-    """清理舊照片"""
-    if not os.path.exists(UPLOAD_FOLDER):
-        return
-        
-    cutoff_time = time.time() - (PHOTO_RETENTION_DAYS * 24 * 60 * 60)
-    cleaned_count = 0
-    
-    for filename in os.listdir(UPLOAD_FOLDER):
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        if os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff_time:
-            try:
-                os.remove(file_path)
-                cleaned_count += 1
-            except OSError:
-                pass
-    
-    if cleaned_count > 0:
-        print(f"🧹 清理了 {cleaned_count} 個舊照片")
+    """清理已過保留期限的照片（以索引範圍刪除）"""
+    cleaned = photo_storage.cleanup_expired()
+    if cleaned:
+        print(f"🧹 清理了 {len(cleaned)} 個舊照片")
+
+def forget_deleted_photo_paths(deleted):
+    """照片檔案被刪除（過期或清理）後，清除案例及重複照片索引中指向這些檔案的 saved_path"""
+    paths = [photo['path'] for photo in deleted]
+    path_set = set(paths)
+    for case in BURNSKY_PHOTO_CASES.values():
+        if case.get('saved_path') in path_set:
+            case['saved_path'] = None
+    try:
+        conn = sqlite3.connect('burnsky_photos.db')
+        try:
+            with conn:
+                conn.executemany('UPDATE photos SET saved_path = NULL WHERE saved_path = ?',
+                                 [(path,) for path in paths])
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        pass  # 照片案例表尚未建立
+    photo_dedupe_index.clear_saved_paths(paths)
+
+photo_storage.add_delete_listener(forget_deleted_photo_paths)
 
 def get_cached_data(key, fetch_function, *args):
     """獲取快取數據或重新獲取"""
@@ -706,7 +780,8 @@ def init_warning_analysis():
     return False
 
 # 初始化警告分析系統
-init_warning_analysis()
+if not IS_POOL_WORKER:
+    init_warning_analysis()
 
 def get_seasonal_sun_times(date=None):
     """
@@ -825,45 +900,19 @@ def convert_numpy_types(obj):
         return obj
 
 def analyze_photo_quality(image_data):
-    """分析照片質量 - 重點在顏色和雲層變化"""
+    """分析照片質量 - 重點在顏色和雲層變化（可直接傳入上傳時已解碼的 DecodedPhoto）"""
     try:
         # 如果是base64編碼，先解碼
         if isinstance(image_data, str) and image_data.startswith('data:image'):
             header, data = image_data.split(',', 1)
             image_data = base64.b64decode(data)
         
-        # 打開圖片
-        image = Image.open(io.BytesIO(image_data))
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # 調整圖片大小以加快分析
-        image.thumbnail((800, 600), Image.Resampling.LANCZOS)
-        pixels = np.array(image)
-        
-        # 分析顏色質量
-        color_analysis = analyze_burnsky_colors(pixels)
-        
-        # 分析雲層變化
-        cloud_analysis = analyze_cloud_variations(pixels)
-        
-        # 分析時間特徵
-        time_analysis = analyze_lighting_quality(pixels)
-        
-        # 綜合評分 (1-10)
-        color_score = color_analysis['intensity'] * 4  # 顏色強度 (0-4分)
-        cloud_score = cloud_analysis['variation'] * 3  # 雲層變化 (0-3分)
-        lighting_score = time_analysis['golden_ratio'] * 3  # 光線質量 (0-3分)
+        # 以分析解析度（800×600 內）直接解碼，所有指標共用同一陣列
+        decoded = image_data if isinstance(image_data, DecodedPhoto) else decode_photo(image_data)
         
-        total_score = min(10, color_score + cloud_score + lighting_score)
-        
-        return {
-            'quality_score': total_score,
-            'color_analysis': color_analysis,
-            'cloud_analysis': cloud_analysis,
-            'lighting_analysis': time_analysis,
-            'recommendation': generate_photo_recommendation(total_score, color_analysis, cloud_analysis)
-        }
+        # 一次提取顏色、雲層及光線統計，綜合評分 (1-10)：顏色強度 0-4、雲層變化 0-3、光線質量 0-3
+        features = extract_photo_features(decoded.pixels, hsv_stats=False)
+        return score_burnsky_photo(features, recommend=generate_photo_recommendation)
     
     except Exception as e:
         print(f"❌ 照片分析錯誤: {e}")
@@ -873,101 +922,7 @@ def analyze_photo_quality(image_data):
             'recommendation': '無法分析照片，請確保照片格式正確'
         }
 
-def analyze_burnsky_colors(pixels):
-    """分析燒天顏色特徵"""
-    height, width = pixels.shape[:2]
-    
-    # 重點分析天空區域 (上半部)
-    sky_region = pixels[:height//2, :]
-    
-    # 計算橙紅色比例
-    red_channel = sky_region[:, :, 0].astype(float)
-    green_channel = sky_region[:, :, 1].astype(float)
-    blue_channel = sky_region[:, :, 2].astype(float)
-    
-    # 燒天色彩特徵：高紅色、中等綠色、低藍色
-    orange_red_mask = (red_channel > 120) & (green_channel > 60) & (blue_channel < 120)
-    warm_ratio = np.sum(orange_red_mask) / orange_red_mask.size
-    
-    # 顏色飽和度分析
-    saturation = np.std([red_channel, green_channel, blue_channel])
-    
-    # 顏色漸變分析 (燒天特徵)
-    avg_red = np.mean(red_channel)
-    avg_blue = np.mean(blue_channel)
-    warm_cool_contrast = (avg_red - avg_blue) / 255.0
-    
-    return {
-        'warm_ratio': warm_ratio,
-        'saturation': saturation / 100.0,  # 標準化
-        'contrast': max(0, warm_cool_contrast),
-        'intensity': min(1.0, warm_ratio * 2 + warm_cool_contrast * 0.5)  # 綜合強度
-    }
-
-def analyze_cloud_variations(pixels):
-    """分析雲層變化和層次"""
-    height, width = pixels.shape[:2]
-    
-    # 轉換為灰度圖分析雲層紋理
-    gray = np.mean(pixels, axis=2)
-    
-    # 計算圖像的標準差（雲層變化指標）
-    cloud_variation = np.std(gray) / 127.5  # 標準化到0-2
-    
-    # 分析明暗對比（雲層層次）
-    hist, _ = np.histogram(gray, bins=50, range=(0, 255))
-    contrast_peaks = len([i for i, h in enumerate(hist) if h > np.mean(hist) * 1.5])
-    layer_complexity = min(1.0, contrast_peaks / 10.0)
-    
-    # 邊緣檢測 (雲層輪廓清晰度)
-    edges = np.abs(np.gradient(gray))
-    edge_strength = np.mean(edges) / 50.0  # 標準化
-    
-    return {
-        'variation': min(1.0, cloud_variation),
-        'layers': layer_complexity,
-        'edge_definition': min(1.0, edge_strength),
-        'overall_quality': min(1.0, (cloud_variation + layer_complexity + edge_strength) / 3)
-    }
-
-def analyze_lighting_quality(pixels):
-    """分析光線質量和時間特徵"""
-    # 整體亮度分析
-    brightness = np.mean(pixels) / 255.0
-    
-    # 黃金時段特徵 (偏暖色調)
-    red_avg = np.mean(pixels[:, :, 0])
-    blue_avg = np.mean(pixels[:, :, 2])
-    golden_ratio = min(1.0, (red_avg - blue_avg + 50) / 100.0)
-    
-    # 光線柔和度
-    brightness_std = np.std(pixels) / 127.5
-    softness = 1.0 - min(1.0, brightness_std)  # 標準差越小越柔和
-    
-    return {
-        'brightness': brightness,
-        'golden_ratio': max(0, golden_ratio),
-        'softness': softness,
-        'quality': (brightness * 0.3 + golden_ratio * 0.5 + softness * 0.2)
-    }
-
-def generate_photo_recommendation(score, color_analysis, cloud_analysis):
-    """根據分析結果產生建議"""
-    if score >= 8:
-        return "🔥 極佳燒天！顏色濃烈，雲層層次豐富，建議記錄當時天氣條件"
-    elif score >= 6:
-        if color_analysis['intensity'] > 0.7:
-            return "🌅 色彩不錯！雲層可以更豐富一些"
-        elif cloud_analysis['variation'] > 0.7:
-            return "☁️ 雲層層次很好！可以等待更強烈的色彩"
-        else:
-            return "✨ 不錯的燒天，各方面都有改善空間"
-    elif score >= 4:
-        return "🌤️ 普通燒天，建議等待更好的條件"
-    else:
-        return "😐 非燒天條件，建議下次嘗試"
-
-def record_burnsky_photo_case(date, time, location, weather_conditions, visual_rating, prediction_score=None, photo_analysis=None, saved_path=None):
+def record_burnsky_photo_case(date, time, location, weather_conditions, visual_rating, prediction_score=None, photo_analysis=None, saved_path=None, prediction_uid=None):
     """記錄燒天照片案例 - 專注於ML訓練數據收集而非即時校正"""
     case_id = f"{date}_{time}_{location}".replace(' ', '_').replace(':', '-')
     
@@ -990,6 +945,9 @@ def record_burnsky_photo_case(date, time, location, weather_conditions, visual_r
     # 保存到ML訓練數據庫
     save_ml_training_case(case_data)
     
+    # 連結到拍攝時對應預測的特徵向量
+    feature_store.link_label(prediction_uid, 'photo_case', case_id, visual_rating)
+    
     storage_status = "已儲存" if saved_path else "僅分析"
     print(f"📸 記錄ML訓練案例: {case_id} (視覺評分: {visual_rating}/10, {storage_status})")
     
@@ -2328,6 +2286,11 @@ def predict_burnsky_core(prediction_type='sunset', advance_hours=0):
         "scoring_method": "unified_v1.2_with_advance_warning_risk"  # � 更新版本號標示風險評估功能
     }
     
+    # 🗄️ 記錄特徵向量到特徵庫（背景寫入）；每個回應的 prediction_uid 在返回時由 serve_prediction 產生
+    result["_feature_uid"] = feature_store.record_prediction(
+        unified_result, score, prediction_type, advance_hours, ml_prediction_cache.model_version
+    )
+    
     result = convert_numpy_types(result)
     
     # 🚀 快取完整預測結果
@@ -2336,9 +2299,17 @@ def predict_burnsky_core(prediction_type='sunset', advance_hours=0):
     
     return result  # 返回結果字典而不是 jsonify
 
+def serve_prediction(result):
+    """
+    返回預測回應：每個回應產生自己的 prediction_uid（供反饋及照片案例連結），
+    因此預測端點不使用整個回應的 Flask 快取，重複計算由 predict_burnsky_core 的結果快取避免
+    """
+    response = {key: value for key, value in result.items() if key != '_feature_uid'}
+    response["prediction_uid"] = feature_store.record_serve(result.get('_feature_uid'))
+    return jsonify(response)
+
 @app.route("/predict", methods=["GET"])
 @limiter.limit("100 per hour")
-@flask_cache.cached(timeout=300, query_string=True)  # 5分鐘快取，根據查詢參數
 def predict_burnsky():
     """統一燒天預測 API 端點 - 支援即時和提前預測"""
     # 獲取查詢參數
@@ -2347,29 +2318,27 @@ def predict_burnsky():
     
     # 呼叫核心預測邏輯
     result = predict_burnsky_core(prediction_type, advance_hours)
-    return jsonify(result)
+    return serve_prediction(result)
 
 @app.route("/predict/sunrise", methods=["GET"])
 @limiter.limit("100 per hour")
-@flask_cache.cached(timeout=300, query_string=True)  # 5分鐘快取，根據查詢參數
 def predict_sunrise():
     """專門的日出燒天預測端點 - 直接回傳結果，不重定向"""
     advance_hours = request.args.get('advance_hours', '0')  # 預設即時預測
     
     # 直接呼叫核心預測邏輯
     result = predict_burnsky_core('sunrise', advance_hours)
-    return jsonify(result)
+    return serve_prediction(result)
 
 @app.route("/predict/sunset", methods=["GET"])
 @limiter.limit("100 per hour")
-@flask_cache.cached(timeout=300, query_string=True)  # 5分鐘快取，根據查詢參數
 def predict_sunset():
     """專門的日落燒天預測端點 - 直接回傳結果，不重定向"""
     advance_hours = request.args.get('advance_hours', '0')  # 預設即時預測
     
     # 直接呼叫核心預測邏輯
     result = predict_burnsky_core('sunset', advance_hours)
-    return jsonify(result)
+    return serve_prediction(result)
 
 @app.route("/api")
 @flask_cache.cached(timeout=3600)  # 1小時快取，API資訊很少變化
@@ -2558,7 +2527,13 @@ def cross_check_prediction_with_webcam():
         prediction_score = prediction_result.get('burnsky_score', 0)
         
         # 獲取即時攝影機分析
-        webcam_conditions = webcam_monitor.get_current_conditions(detailed=True)
+        webcam_conditions = get_webcam_conditions(detailed=True)
+        if webcam_conditions is None:
+            return webcam_warming_up_response({
+                'status': 'warming_up',
+                'message': '攝影機背景監控正在預熱，請稍後再試',
+                'timestamp': datetime.now().isoformat()
+            })
         webcam_score = webcam_conditions.get('overall_sunset_potential', 0)
         
         # 計算差異
@@ -2646,7 +2621,7 @@ def _generate_cross_check_recommendation(prediction_score, webcam_score, is_suns
         return '❌ 當前條件不佳，建議等待明天或其他時段'
 
 @app.route("/api/webcam/current", methods=["GET"])
-@flask_cache.cached(timeout=120, query_string=True)  # 2分鐘快取，攝影機狀態變化較快
+@flask_cache.cached(timeout=120, query_string=True, unless=lambda: WEBCAM_BACKGROUND_MONITOR)  # 背景監控關閉時才需快取即時分析
 def get_current_webcam_conditions():
     """
     獲取即時攝影機天氣狀況分析
@@ -2659,13 +2634,22 @@ def get_current_webcam_conditions():
         detailed = request.args.get('detailed', 'true').lower() == 'true'
         
         # 獲取當前狀況
-        conditions = webcam_monitor.get_current_conditions(detailed=detailed)
+        conditions = get_webcam_conditions(detailed=detailed)
+        if conditions is None:
+            return webcam_warming_up_response({
+                'overall_sunset_potential': 0,
+                'analysis_status': 'warming_up',
+                'webcam_data': {},
+                'error_message': '攝影機背景監控正在預熱，請稍後再試'
+            })
         
         # 轉換數據結構以符合前端期望，並添加更多詳細信息
         response_data = {
             'overall_sunset_potential': conditions.get('overall_sunset_potential', 0),
             'analysis_status': conditions.get('status', 'unknown'),
             'analysis_time': conditions.get('analysis_time', datetime.now().isoformat()),
+            'snapshot_time': conditions.get('snapshot_time'),
+            'camera_selection': conditions.get('camera_selection'),
             'webcam_data': {}
         }
         
@@ -2703,6 +2687,46 @@ def get_current_webcam_conditions():
             'error_message': f'攝影機分析失敗: {str(e)}'
         }), 500
 
+@app.route("/api/webcam/trend", methods=["GET"])
+def get_webcam_trend():
+    """
+    攝影機指標趨勢（讀取時間序列存儲，不需重新下載圖片）
+    
+    Query Parameters:
+        location_id: 攝影機ID，省略時返回所有攝影機
+        window: 統計窗口分鐘數 (默認 120，最多 1440)
+        series: 是否包含原始時間序列供圖表使用 (true/false)
+        
+    Returns:
+        每部攝影機的窗口統計、最新值及根據最近30分鐘顏色豐富度斜率的臨近預報
+    """
+    try:
+        location_id = request.args.get('location_id')
+        if location_id and location_id not in webcam_monitor.fetcher.WEBCAM_LOCATIONS:
+            return jsonify({
+                'status': 'error',
+                'message': f'未知的攝影機位置: {location_id}'
+            }), 400
+        window = min(max(request.args.get('window', 120, type=int), 5), 1440)
+        include_series = request.args.get('series', 'false').lower() == 'true'
+        
+        cameras = webcam_metrics_store.trend(location_id, window, include_series)
+        
+        return jsonify({
+            'status': 'success',
+            'window_minutes': window,
+            'camera_count': len(cameras),
+            'cameras': cameras,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'獲取攝影機趨勢失敗: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @app.route("/api/webcam/image/<location_id>", methods=["GET"])
 def get_webcam_image(location_id):
     """
@@ -2713,14 +2737,16 @@ def get_webcam_image(location_id):
         
     Query Parameters:
         format: 返回格式 (image, json, url) - 默認 image
+        size: 圖片尺寸 (full, medium, thumb) - 默認 full，只適用於 format=image
         analyze: 是否進行分析 (true/false)
         
     Returns:
         圖片數據或分析結果
     """
     try:
-        fetcher = HKOWebcamFetcher()
-        analyzer = WebcamImageAnalyzer()
+        # 共用監控系統的獲取器及分析器（重用連線池、條件請求快取及像素指標快取）
+        fetcher = webcam_monitor.fetcher
+        analyzer = webcam_monitor.analyzer
         
         # 檢查參數
         return_format = request.args.get('format', 'image')
@@ -2744,25 +2770,46 @@ def get_webcam_image(location_id):
                     'message': f'未知的攝影機位置: {location_id}'
                 }), 400
         
-        # 獲取圖片數據（bytes格式用於直接返回）
-        webcam_data = fetcher.fetch_webcam_image(location_id, return_format='bytes')
+        # 如果要求返回實際圖片（作為代理，從代理快取讀取並支援條件請求）
+        if return_format == 'image':
+            size = request.args.get('size', 'full')
+            if size not in webcam_image_proxy.supported_sizes:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'不支援的圖片尺寸: {size}，可用: {", ".join(webcam_image_proxy.supported_sizes)}'
+                }), 400
+            if location_id not in fetcher.WEBCAM_LOCATIONS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'未知的攝影機位置: {location_id}'
+                }), 400
+            
+            proxied = webcam_image_proxy.get(location_id, size)
+            if not proxied:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'無法獲取攝影機 {location_id} 的圖片'
+                }), 404
+            
+            if request.if_none_match.contains_weak(proxied['etag']):
+                response = app.response_class(status=304)
+            else:
+                response = app.response_class(proxied['data'], mimetype='image/jpeg')
+                response.headers['Content-Disposition'] = f'inline; filename={location_id}_{size}.jpg'
+            response.set_etag(proxied['etag'])
+            response.last_modified = proxied['capture_time']
+            response.cache_control.public = True
+            response.cache_control.max_age = webcam_image_proxy.max_age
+            return response
+        
+        # 只獲取一次圖片，原始位元組、base64 及分析用陣列都從同一物件取得
+        webcam_data = fetcher.fetch_webcam_image(location_id, return_format='image')
         
         if not webcam_data:
             return jsonify({
                 'status': 'error',
                 'message': f'無法獲取攝影機 {location_id} 的圖片'
             }), 404
-        
-        # 如果要求返回實際圖片（作為代理）
-        if return_format == 'image':
-            from flask import send_file
-            import io
-            return send_file(
-                io.BytesIO(webcam_data['image']),
-                mimetype='image/jpeg',
-                as_attachment=False,
-                download_name=f'{location_id}.jpg'
-            )
             
         # JSON格式（包含base64編碼）
         result = {
@@ -2775,17 +2822,11 @@ def get_webcam_image(location_id):
         }
         
         if return_format == 'json':
-            # 轉換為base64
-            import base64
-            result['image_data'] = base64.b64encode(webcam_data['image']).decode()
+            result['image_data'] = webcam_data['image'].base64
             
         # 如果需要分析
         if analyze:
-            # 重新獲取PIL格式進行分析
-            pil_data = fetcher.fetch_webcam_image(location_id, return_format='pil')
-            if pil_data:
-                analysis = analyzer.analyze_sky_conditions(pil_data['image'])
-                result['analysis'] = analysis
+            result['analysis'] = analyzer.analyze_sky_conditions(webcam_data['image'], location_id=location_id)
                 
         return jsonify(result)
         
@@ -2805,7 +2846,8 @@ def get_webcam_locations():
         所有攝影機位置的詳細信息
     """
     try:
-        fetcher = HKOWebcamFetcher()
+        fetcher = webcam_monitor.fetcher
+        breaker_status = fetcher.get_breaker_status()
         
         locations = {}
         for location_id, info in fetcher.WEBCAM_LOCATIONS.items():
@@ -2814,13 +2856,15 @@ def get_webcam_locations():
                 'direction': info['direction'],
                 'latitude': info['latitude'],
                 'longitude': info['longitude'],
-                'priority': info['priority']
+                'priority': info['priority'],
+                'circuit_breaker': breaker_status.get(location_id)
             }
             
         return jsonify({
             'status': 'success',
             'locations': locations,
             'total_count': len(locations),
+            'unavailable_count': sum(1 for status in breaker_status.values() if status['state'] != 'closed'),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -3497,7 +3541,8 @@ def handle_photo_cases():
             weather_conditions=data.get("weather_conditions", {}),
             visual_rating=data.get("visual_rating"),
             prediction_score=data.get("prediction_score"),
-            photo_analysis=photo_analysis
+            photo_analysis=photo_analysis,
+            prediction_uid=data.get("prediction_uid")
         )
         
         return jsonify({
@@ -3578,25 +3623,33 @@ def analyze_photo():
                         "message": "不支援 HEIC/HEIF 格式。請使用 iPhone 設定 > 相機 > 格式 改為「最相容」，或將照片轉換為 JPG/PNG 格式後上傳。"
                     }), 400
             
-            test_image = Image.open(io.BytesIO(photo_data))
-            test_image.verify()
-            print(f"   圖片驗證成功: {test_image.format} {test_image.size}")
-        except Exception as ve:
+            # 檢查檔頭後直接以分析解析度解碼（過大的圖片在解碼前拒絕）
+            decoded_photo = decode_photo(photo_data)
+            print(f"   圖片解碼成功: {decoded_photo.format} {decoded_photo.original_size} → {decoded_photo.size}")
+        except PhotoDecodeError as ve:
             print(f"❌ 圖片驗證失敗: {ve}")
             file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else 'unknown'
             
             if file_ext in ['heic', 'heif']:
                 error_msg = "不支援 HEIC/HEIF 格式。請將照片轉換為 JPG 或 PNG 格式後上傳。"
             else:
-                error_msg = f"檔案損壞或不是有效的圖片格式 ({file_ext})"
+                error_msg = f"{ve} ({file_ext})"
             
             return jsonify({
                 "success": False,
                 "message": error_msg
             }), 400
         
-        # 分析照片質量
-        photo_analysis = analyze_photo_quality(photo_data)
+        # 分析照片質量（相同或近似照片沿用之前的分析結果）
+        photo_hash = compute_dhash(decoded_photo.pixels)
+        photo_color = mean_color(decoded_photo.pixels)
+        cached = photo_dedupe_index.find(photo_hash, photo_color)
+        if cached and cached['analysis']:
+            photo_analysis = cached['analysis']
+        else:
+            photo_analysis = analyze_photo_quality(decoded_photo)
+            if 'error' not in photo_analysis:
+                photo_dedupe_index.add(photo_hash, photo_color, photo_analysis)
         
         # 獲取用戶評分
         user_rating = int(request.form.get('rating', 5))
@@ -3698,6 +3751,177 @@ def analyze_photo():
             "message": f"分析失敗：{str(e)}"
         }), 500
 
+@app.route('/api/analyze-photos', methods=['POST'])
+def analyze_photos():
+    """批次分析同一場日落的多張照片，返回每張評分及整組彙總（最佳一張、色彩高峰時間、評分走勢）"""
+    # 批次上傳的總大小上限高於單張照片（須在讀取表單前設定）
+    request.max_content_length = PHOTO_BATCH_MAX_BYTES
+    try:
+        files = [file for file in request.files.getlist('photos') if file.filename]
+        if not files:
+            return jsonify({
+                "status": "error",
+                "message": "沒有選擇照片（欄位名稱: photos）"
+            }), 400
+        
+        if len(files) > PHOTO_BATCH_MAX_FILES:
+            return jsonify({
+                "status": "error",
+                "message": f"照片太多，每次最多 {PHOTO_BATCH_MAX_FILES} 張"
+            }), 400
+        
+        photos = [{"index": index, "filename": file.filename} for index, file in enumerate(files)]
+        spool_dir = tempfile.mkdtemp(prefix='burnsky_batch_')
+        analyzed_indexes = []
+        
+        def spool_files():
+            """逐一把上傳檔案寫入暫存檔，寫完一張即交給進程池"""
+            for photo, file in zip(photos, files):
+                if not allowed_file(file.filename):
+                    photo["error"] = f"不支援的檔案格式。支援: {', '.join(ALLOWED_EXTENSIONS)}"
+                    continue
+                path = os.path.join(spool_dir, str(photo["index"]))
+                file.save(path)
+                file.close()
+                if os.path.getsize(path) > MAX_FILE_SIZE:
+                    photo["error"] = f"檔案太大，最大支援 {MAX_FILE_SIZE // (1024*1024)}MB"
+                    continue
+                analyzed_indexes.append(photo["index"])
+                yield path
+        
+        try:
+            results = photo_batch_pool.analyze_files(spool_files())
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+        
+        for index, result in zip(analyzed_indexes, results):
+            photos[index].update(result)
+        
+        return jsonify({
+            "status": "success",
+            "photo_count": len(photos),
+            "failed_count": sum(1 for photo in photos if "error" in photo),
+            "photos": photos,
+            "session_summary": summarize_session(photos)
+        })
+    
+    except HTTPException:
+        # 超出請求大小上限等錯誤保留原本的狀態碼（413）
+        raise
+    except Exception as e:
+        print(f"❌ 批次照片分析錯誤: {e}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+def process_uploaded_photo(photo_data, filename, location='未知地點', visual_rating=5.0, weather_notes='',
+                           save_photo=False, prediction_uid=None, decoded_photo=None):
+    """
+    分析上傳照片、儲存及記錄ML訓練案例（同步上傳及照片分析工作共用）
+
+    Raises:
+        PhotoDecodeError: 照片無法解碼
+    """
+    if decoded_photo is None:
+        decoded_photo = decode_photo(photo_data)
+    
+    # 重複上傳的照片直接返回之前的分析結果，不再儲存或寫入ML訓練數據
+    photo_hash = compute_dhash(decoded_photo.pixels)
+    photo_color = mean_color(decoded_photo.pixels)
+    duplicate = photo_dedupe_index.find(photo_hash, photo_color, require_case=True)
+    if duplicate:
+        print(f"♻️ 重複照片（漢明距離 {duplicate['distance']}），沿用案例: {duplicate['case_id']}")
+        return {
+            "status": "success",
+            "message": "此照片已上傳過，返回之前的分析結果",
+            "duplicate": True,
+            "duplicate_of": {
+                "case_id": duplicate['case_id'],
+                "hamming_distance": duplicate['distance'],
+                "uploaded_at": duplicate['created_at']
+            },
+            "case_id": duplicate['case_id'],
+            "photo_analysis": duplicate['analysis'],
+            "saved": False,
+            "file_size": f"{len(photo_data) / 1024:.1f} KB",
+            "immediate_prediction_update": False,
+            "contributes_to_ml_training": False
+        }
+    
+    # 分析照片（重用已解碼的陣列）
+    photo_analysis = analyze_photo_quality(decoded_photo)
+    
+    saved_path = None
+    stored_photo = None
+    
+    # 保存照片（如果選擇）
+    if save_photo or AUTO_SAVE_PHOTOS:
+        try:
+            # 清理舊照片
+            cleanup_old_photos()
+            
+            # 以內容雜湊儲存（分層子目錄），檔案資訊寫入索引；
+            # 縮圖及預覽圖由分析用的縮小陣列生成，不再解碼原圖
+            safe_filename = secure_filename(filename) or "photo.jpg"
+            stored_photo = photo_storage.store(photo_data, safe_filename, capture_time=decoded_photo.capture_time,
+                                               pixels=decoded_photo.pixels, orientation=decoded_photo.orientation)
+            
+            saved_path = stored_photo['path']
+            print(f"📁 照片已儲存: {saved_path}")
+            
+        except Exception as e:
+            print(f"⚠️ 照片儲存失敗: {e}")
+            # 儲存失敗不影響分析功能
+    
+    # 記錄案例到ML訓練數據庫（不觸發即時校正）
+    case_id = record_burnsky_photo_case(
+        date=datetime.now().strftime('%Y-%m-%d'),
+        time=datetime.now().strftime('%H:%M'),
+        location=location,
+        weather_conditions={"notes": weather_notes},
+        visual_rating=visual_rating,
+        photo_analysis=photo_analysis,
+        saved_path=saved_path,
+        prediction_uid=prediction_uid
+    )
+    photo_dedupe_index.add(photo_hash, photo_color, photo_analysis, case_id=case_id, saved_path=saved_path)
+    if stored_photo:
+        photo_storage.link_case(stored_photo['content_hash'], case_id)
+    
+    # 進行準確性分析（用於數據質量評估）
+    photo_datetime = datetime.now().strftime('%Y-%m-%d_%H-%M')
+    accuracy_check = cross_check_photo_with_prediction(
+        photo_datetime, location, visual_rating, 'sunset'
+    )
+    
+    # 獲取ML訓練數據統計
+    ml_stats = get_ml_training_stats()
+    
+    return {
+        "status": "success",
+        "message": "照片已加入ML訓練數據庫",
+        "duplicate": False,
+        "case_id": case_id,
+        "photo_analysis": photo_analysis,
+        "accuracy_check": accuracy_check,
+        "ml_training_info": {
+            "total_cases": ml_stats['total_cases'],
+            "pending_training": ml_stats['pending_cases'],
+            "next_retrain_threshold": 10 - ml_stats['pending_cases'],
+            "data_quality_score": ml_stats['avg_quality'],
+            "will_trigger_retrain": ml_stats['pending_cases'] >= 9
+        },
+        "saved": saved_path is not None,
+        "file_size": f"{len(photo_data) / 1024:.1f} KB",
+        "immediate_prediction_update": False,  # 不會立即更新預測
+        "contributes_to_ml_training": True,     # 但會貢獻ML訓練
+        "suggestions": {
+            "data_collection_tips": get_data_collection_tips(photo_analysis),
+            "ml_improvement_advice": get_ml_improvement_advice(visual_rating, ml_stats)
+        }
+    }
+
 @app.route('/api/upload-photo', methods=['POST'])
 def upload_burnsky_photo():
     """上傳燒天照片並分析"""
@@ -3734,96 +3958,57 @@ def upload_burnsky_photo():
                 "message": f"檔案太大，最大支援 {MAX_FILE_SIZE // (1024*1024)}MB"
             }), 400
         
-        # 讀取並驗證照片
+        # 讀取照片
         photo_data = file.read()
         
-        # 驗證檔案確實是有效圖片
-        if not validate_image_content(photo_data):
-            return jsonify({
-                "status": "error",
-                "message": "檔案損壞或不是有效的圖片格式"
-            }), 400
-        
-        # 分析照片
-        photo_analysis = analyze_photo_quality(photo_data)
-        
-        # 獲取表單數據
-        location = request.form.get('location', '未知地點')
-        visual_rating = float(request.form.get('visual_rating', 5))
-        weather_notes = request.form.get('weather_notes', '')
-        
-        # 儲存選項
-        save_photo = request.form.get('save_photo', 'false').lower() == 'true'
-        saved_path = None
+        # 獲取表單數據（工作模式下背景執行緒無法存取 request）
+        upload_options = {
+            "filename": file.filename,
+            "location": request.form.get('location', '未知地點'),
+            "visual_rating": float(request.form.get('visual_rating', 5)),
+            "weather_notes": request.form.get('weather_notes', ''),
+            "save_photo": request.form.get('save_photo', 'false').lower() == 'true',
+            "prediction_uid": request.form.get('prediction_uid')
+        }
         
-        # 保存照片（如果選擇）
-        if save_photo or AUTO_SAVE_PHOTOS:
+        # 工作模式：只檢查檔頭，暫存照片後立即返回工作ID，分析由背景工作佇列處理
+        if request.form.get('async', str(PHOTO_UPLOAD_ASYNC)).lower() == 'true':
             try:
-                # 清理舊照片
-                cleanup_old_photos()
-                
-                # 生成安全檔名
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                safe_filename = secure_filename(file.filename)
-                if not safe_filename:
-                    safe_filename = "photo.jpg"
-                
-                filename = f"{timestamp}_{safe_filename}"
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                
-                # 儲存檔案
-                with open(file_path, 'wb') as f:
-                    f.write(photo_data)
-                
-                saved_path = file_path
-                print(f"📁 照片已儲存: {filename}")
-                
-            except Exception as e:
-                print(f"⚠️ 照片儲存失敗: {e}")
-                # 儲存失敗不影響分析功能
-        
-        # 記錄案例到ML訓練數據庫（不觸發即時校正）
-        case_id = record_burnsky_photo_case(
-            date=datetime.now().strftime('%Y-%m-%d'),
-            time=datetime.now().strftime('%H:%M'),
-            location=location,
-            weather_conditions={"notes": weather_notes},
-            visual_rating=visual_rating,
-            photo_analysis=photo_analysis,
-            saved_path=saved_path
-        )
-        
-        # 進行準確性分析（用於數據質量評估）
-        photo_datetime = datetime.now().strftime('%Y-%m-%d_%H-%M')
-        accuracy_check = cross_check_photo_with_prediction(
-            photo_datetime, location, visual_rating, 'sunset'
-        )
+                probe_image(photo_data)
+                job_id = photo_job_queue.submit(photo_data, process_uploaded_photo, **upload_options)
+            except PhotoDecodeError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
+            except PhotoQueueFull as e:
+                response = jsonify({
+                    "status": "error",
+                    "message": str(e)
+                })
+                response.headers['Retry-After'] = '30'
+                return response, 503
+            
+            status_url = f"/api/photo-jobs/{job_id}"
+            response = jsonify({
+                "status": "accepted",
+                "message": "照片已加入分析佇列",
+                "job_id": job_id,
+                "status_url": status_url
+            })
+            response.headers['Location'] = status_url
+            return response, 202
         
-        # 獲取ML訓練數據統計
-        ml_stats = get_ml_training_stats()
+        # 檢查檔頭並以分析解析度解碼（損壞、格式不符或像素過多的圖片在此拒絕）
+        try:
+            decoded_photo = decode_photo(photo_data)
+        except PhotoDecodeError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
         
-        return jsonify({
-            "status": "success",
-            "message": "照片已加入ML訓練數據庫",
-            "case_id": case_id,
-            "photo_analysis": photo_analysis,
-            "accuracy_check": accuracy_check,
-            "ml_training_info": {
-                "total_cases": ml_stats['total_cases'],
-                "pending_training": ml_stats['pending_cases'],
-                "next_retrain_threshold": 10 - ml_stats['pending_cases'],
-                "data_quality_score": ml_stats['avg_quality'],
-                "will_trigger_retrain": ml_stats['pending_cases'] >= 9
-            },
-            "saved": saved_path is not None,
-            "file_size": f"{file_size / 1024:.1f} KB",
-            "immediate_prediction_update": False,  # 不會立即更新預測
-            "contributes_to_ml_training": True,     # 但會貢獻ML訓練
-            "suggestions": {
-                "data_collection_tips": get_data_collection_tips(photo_analysis),
-                "ml_improvement_advice": get_ml_improvement_advice(visual_rating, ml_stats)
-            }
-        })
+        return jsonify(process_uploaded_photo(photo_data, decoded_photo=decoded_photo, **upload_options))
     
     except Exception as e:
         print(f"❌ 照片上傳錯誤: {e}")
@@ -3832,6 +4017,22 @@ def upload_burnsky_photo():
             "message": str(e)
         }), 500
 
+@app.route('/api/photo-jobs/<job_id>', methods=['GET'])
+def photo_job_status(job_id):
+    """查詢照片分析工作狀態及結果"""
+    job = photo_job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "找不到此工作（可能已過期）"
+        }), 404
+    
+    return jsonify({
+        "status": "success",
+        "job_id": job_id,
+        "job": job
+    })
+
 def get_ml_training_stats():
     """獲取ML訓練數據統計"""
     try:
@@ -3933,28 +4134,11 @@ def get_next_shoot_advice(photo_analysis):
 
 @app.route('/api/photo-storage', methods=['GET'])
 def photo_storage_info():
-    """照片儲存資訊"""
+    """照片儲存資訊（總計讀取索引，檔案清單分頁：page、per_page）"""
     try:
-        total_files = 0
-        total_size = 0
-        files_info = []
-        
-        if os.path.exists(UPLOAD_FOLDER):
-            for filename in os.listdir(UPLOAD_FOLDER):
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    file_size = os.path.getsize(file_path)
-                    file_time = os.path.getmtime(file_path)
-                    
-                    files_info.append({
-                        'filename': filename,
-                        'size': file_size,
-                        'created': datetime.fromtimestamp(file_time).isoformat(),
-                        'age_days': (time.time() - file_time) / (24 * 60 * 60)
-                    })
-                    
-                    total_files += 1
-                    total_size += file_size
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(200, max(1, request.args.get('per_page', 50, type=int)))
+        storage_stats = photo_storage.stats()
         
         return jsonify({
             "status": "success",
@@ -3965,11 +4149,16 @@ def photo_storage_info():
                 "max_file_size_mb": MAX_FILE_SIZE // (1024*1024),
                 "allowed_extensions": list(ALLOWED_EXTENSIONS)
             },
-            "current_storage": {
-                "total_files": total_files,
-                "total_size_bytes": total_size,
-                "total_size_mb": round(total_size / (1024*1024), 2),
-                "files": files_info
+            "current_storage": dict(storage_stats, files=[
+                dict(photo,
+                     thumbnail_url=f"/api/photos/{photo['content_hash']}/thumb",
+                     preview_url=f"/api/photos/{photo['content_hash']}/preview")
+                for photo in photo_storage.list_photos(page, per_page)
+            ]),
+            "pagination": {
+                "page": page,
+                "per_page": per_page,
+                "total_pages": max(1, -(-storage_stats['total_files'] // per_page))
             }
         })
     
@@ -3983,35 +4172,12 @@ def photo_storage_info():
 def manual_cleanup():
     """手動清理舊照片"""
     try:
-        if not os.path.exists(UPLOAD_FOLDER):
-            return jsonify({
-                "status": "success",
-                "message": "無照片需要清理",
-                "cleaned_count": 0
-            })
-        
-        cutoff_time = time.time() - (PHOTO_RETENTION_DAYS * 24 * 60 * 60)
-        cleaned_count = 0
-        cleaned_files = []
-        
-        for filename in os.listdir(UPLOAD_FOLDER):
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff_time:
-                try:
-                    file_size = os.path.getsize(file_path)
-                    os.remove(file_path)
-                    cleaned_files.append({
-                        'filename': filename,
-                        'size': file_size
-                    })
-                    cleaned_count += 1
-                except OSError as e:
-                    print(f"清理檔案失敗: {filename} - {e}")
+        cleaned_files = photo_storage.cleanup_expired()
         
         return jsonify({
             "status": "success",
-            "message": f"已清理 {cleaned_count} 個舊照片",
-            "cleaned_count": cleaned_count,
+            "message": f"已清理 {len(cleaned_files)} 個舊照片" if cleaned_files else "無照片需要清理",
+            "cleaned_count": len(cleaned_files),
             "cleaned_files": cleaned_files
         })
     
@@ -4021,6 +4187,40 @@ def manual_cleanup():
             "message": str(e)
         }), 500
 
+# 照片內容以雜湊定址，同一網址的內容永不改變，可讓瀏覽器及CDN長期快取
+PHOTO_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+@app.route('/api/photos/<content_hash>/<variant>', methods=['GET'])
+def serve_stored_photo(content_hash, variant):
+    """提供已儲存照片的衍生版本（preview 預覽圖、thumb 縮圖；原圖含 EXIF 位置資料，不公開提供）"""
+    if variant not in PHOTO_VARIANTS:
+        return jsonify({
+            "status": "error",
+            "message": f"不支援的照片版本: {variant}，可用: {', '.join(PHOTO_VARIANTS)}"
+        }), 400
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        return jsonify({
+            "status": "error",
+            "message": "無效的照片雜湊"
+        }), 400
+    
+    try:
+        path = photo_storage.variant_path(content_hash, variant)
+    except (OSError, PhotoDecodeError) as e:
+        print(f"⚠️ 生成衍生照片失敗: {content_hash} - {e}")
+        path = None
+    if not path:
+        return jsonify({
+            "status": "error",
+            "message": "照片不存在或已過期"
+        }), 404
+    
+    response = send_file(path, conditional=True, etag=f"{content_hash[:20]}-{variant}",
+                         max_age=PHOTO_CACHE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/api/prediction/update', methods=['POST'])
 def manual_prediction_update():
     """手動觸發預測更新"""
@@ -4058,8 +4258,17 @@ def prediction_status():
                 "cache_status": {
                     "total_cache_items": total_cache_count,
                     "prediction_cache_items": prediction_cache_count,
-                    "cache_duration_seconds": CACHE_DURATION
+                    "cache_duration_seconds": CACHE_DURATION,
+                    "ml_inference_cache": ml_prediction_cache.stats()
                 },
+                "feature_store": feature_store.stats(),
+                "webcam_monitor": webcam_monitor.status(),
+                "webcam_analysis_pool": webcam_monitor.analysis_pool.stats(),
+                "webcam_image_proxy": webcam_image_proxy.stats(),
+                "photo_jobs": photo_job_queue.stats(),
+                "photo_batch_pool": photo_batch_pool.stats(),
+                "photo_dedupe": photo_dedupe_index.stats(),
+                "photo_storage": photo_storage.stats(),
                 "auto_update_enabled": True,
                 "learning_active": len(BURNSKY_PHOTO_CASES) > 0
             }
@@ -4106,19 +4315,8 @@ def data_management_info():
         except sqlite3.OperationalError:
             history_count = 0
         
-        # 統計上傳檔案
-        upload_files = []
-        if os.path.exists(UPLOAD_FOLDER):
-            for filename in os.listdir(UPLOAD_FOLDER):
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(filepath):
-                    stat = os.stat(filepath)
-                    upload_files.append({
-                        'filename': filename,
-                        'size': stat.st_size,
-                        'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    })
+        # 統計上傳檔案（讀取儲存索引）
+        upload_stats = photo_storage.stats()
         
         return jsonify({
             'status': 'success',
@@ -4135,9 +4333,9 @@ def data_management_info():
                     'database_file': PREDICTION_HISTORY_DB
                 },
                 'uploaded_files': {
-                    'count': len(upload_files),
-                    'total_size': sum(f['size'] for f in upload_files),
-                    'files': upload_files[:10],  # 只顯示前10個
+                    'count': upload_stats['total_files'],
+                    'total_size': upload_stats['total_size_bytes'],
+                    'files': photo_storage.list_photos(1, 10),  # 只顯示最新10個
                     'folder': UPLOAD_FOLDER
                 }
             },
@@ -4186,6 +4384,9 @@ def data_cleanup():
             global BURNSKY_PHOTO_CASES
             BURNSKY_PHOTO_CASES.clear()
             
+            # 重複照片索引中指向這些案例的記錄（清理全部數據時一併清除只分析的記錄）
+            photo_dedupe_index.clear(cases_only=operation == 'clear_photo_cases')
+            
             results.append(f"✅ 已清理 {before_count} 個照片案例")
         
         if operation == 'clear_prediction_history' or operation == 'clear_all':
@@ -4203,17 +4404,9 @@ def data_cleanup():
         
         if operation == 'clear_uploaded_files' or operation == 'clear_all':
             # 清理上傳檔案
-            deleted_count = 0
-            deleted_size = 0
-            
-            if os.path.exists(UPLOAD_FOLDER):
-                for filename in os.listdir(UPLOAD_FOLDER):
-                    filepath = os.path.join(UPLOAD_FOLDER, filename)
-                    if os.path.isfile(filepath):
-                        file_size = os.path.getsize(filepath)
-                        os.remove(filepath)
-                        deleted_count += 1
-                        deleted_size += file_size
+            deleted_files = photo_storage.clear()
+            deleted_count = len(deleted_files)
+            deleted_size = sum(f['size'] for f in deleted_files)
             
             results.append(f"✅ 已清理 {deleted_count} 個上傳檔案 ({deleted_size/1024/1024:.1f}MB)")
         
@@ -4224,12 +4417,15 @@ def data_cleanup():
             # 清理舊照片案例
             conn = sqlite3.connect('burnsky_photos.db')
             cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM photos WHERE timestamp < ?', (cutoff_date,))
+            cursor.execute('SELECT COUNT(*) FROM photos WHERE recorded_at < ?', (cutoff_date.isoformat(),))
             old_photos = cursor.fetchone()[0]
-            cursor.execute('DELETE FROM photos WHERE timestamp < ?', (cutoff_date,))
+            cursor.execute('DELETE FROM photos WHERE recorded_at < ?', (cutoff_date.isoformat(),))
             conn.commit()
             conn.close()
             
+            # 清理舊的重複照片索引記錄
+            photo_dedupe_index.delete_before(cutoff_date)
+            
             # 清理舊預測歷史
             conn = sqlite3.connect(PREDICTION_HISTORY_DB)
             cursor = conn.cursor()
@@ -4240,15 +4436,7 @@ def data_cleanup():
             conn.close()
             
             # 清理舊檔案
-            deleted_files = 0
-            if os.path.exists(UPLOAD_FOLDER):
-                for filename in os.listdir(UPLOAD_FOLDER):
-                    filepath = os.path.join(UPLOAD_FOLDER, filename)
-                    if os.path.isfile(filepath):
-                        file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                        if file_time < cutoff_date:
-                            os.remove(filepath)
-                            deleted_files += 1
+            deleted_files = len(photo_storage.delete_stored_before(cutoff_date.timestamp()))
             
             results.append(f"✅ 已清理 {days_old} 天前的數據:")
             results.append(f"   - 照片案例: {old_photos} 個")
@@ -5722,17 +5910,25 @@ def get_data_coverage_analysis():
             "seasonal_coverage": "無數據"
         }
 
-# 初始化照片案例學習系統
-initialize_photo_cases()
+case_analyzer = None
+if not IS_POOL_WORKER:
+    # 初始化照片案例學習系統
+    initialize_photo_cases()
 
-# 初始化ML案例分析器
-try:
-    case_analyzer = BurnskyCaseAnalyzer()
-    case_analyzer.load_or_train_model()
-    print("✅ ML燒天預測系統已初始化")
-except Exception as e:
-    case_analyzer = None
-    print(f"⚠️ ML系統初始化失敗: {e}")
+    # 舊版直接存放在上傳目錄的照片搬到內容定址儲存
+    try:
+        photo_storage.import_flat_files()
+    except Exception as e:
+        print(f"⚠️ 照片儲存索引初始化失敗: {e}")
+
+    # 初始化ML案例分析器
+    try:
+        case_analyzer = BurnskyCaseAnalyzer()
+        case_analyzer.load_or_train_model()
+        print("✅ ML燒天預測系統已初始化")
+    except Exception as e:
+        case_analyzer = None
+        print(f"⚠️ ML系統初始化失敗: {e}")
 
 @app.route('/api/ml-analysis', methods=['POST'])
 @limiter.limit("30 per hour")  # ML分析更嚴格的限制
@@ -6052,6 +6248,9 @@ def submit_feedback():
         feedback_id = cursor.lastrowid
         conn.close()
         
+        # 連結到該次預測的特徵向量
+        feature_store.link_label(data.get('prediction_uid'), 'user_feedback', feedback_id, user_rating)
+        
         # 計算更新後的準確率
         accuracy_stats = calculate_real_accuracy()
         
@@ -6158,7 +6357,8 @@ def calculate_real_accuracy():
         }
 
 # 啟動每小時預測保存排程
-start_hourly_scheduler()
+if not IS_POOL_WORKER:
+    start_hourly_scheduler()
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '5001'))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片特徵引擎基準測試及輸出核對
+以 modules/photo_features 提取統計量再評分，與原本兩套分析器（下方保留的參考實作）
+比較速度，並逐項核對輸出是否相同；--check 時任何差異超出容許值即以狀態碼 1 結束
+
+用法:
+    python benchmark_photo_features.py                        # 內建合成圖片
+    python benchmark_photo_features.py photos/*.jpg --repeat 5
+    python benchmark_photo_features.py --check                # 只核對輸出（適合放在 CI）
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+from modules.image_decode import decode_photo
+from modules.photo_features import (
+    count_unique_colors, extract_photo_features, score_burnsky_photo, score_photo_quality
+)
+
+# 浮點輸出容許的絕對差（引擎以整數和計算，與原本逐像素 float 計算只有捨入差異）
+TOLERANCE = 1e-9
+
+
+# ===== 參考實作：原 app.analyze_photo_quality =====
+
+def reference_burnsky_colors(pixels):
+    height, width = pixels.shape[:2]
+    sky_region = pixels[:height//2, :]
+    red_channel = sky_region[:, :, 0].astype(float)
+    green_channel = sky_region[:, :, 1].astype(float)
+    blue_channel = sky_region[:, :, 2].astype(float)
+    orange_red_mask = (red_channel > 120) & (green_channel > 60) & (blue_channel < 120)
+    warm_ratio = np.sum(orange_red_mask) / orange_red_mask.size
+    saturation = np.std([red_channel, green_channel, blue_channel])
+    avg_red = np.mean(red_channel)
+    avg_blue = np.mean(blue_channel)
+    warm_cool_contrast = (avg_red - avg_blue) / 255.0
+    return {
+        'warm_ratio': warm_ratio,
+        'saturation': saturation / 100.0,
+        'contrast': max(0, warm_cool_contrast),
+        'intensity': min(1.0, warm_ratio * 2 + warm_cool_contrast * 0.5)
+    }
+
+
+def reference_cloud_variations(pixels):
+    gray = np.mean(pixels, axis=2)
+    cloud_variation = np.std(gray) / 127.5
+    hist, _ = np.histogram(gray, bins=50, range=(0, 255))
+    contrast_peaks = len([i for i, h in enumerate(hist) if h > np.mean(hist) * 1.5])
+    layer_complexity = min(1.0, contrast_peaks / 10.0)
+    edges = np.abs(np.gradient(gray))
+    edge_strength = np.mean(edges) / 50.0
+    return {
+        'variation': min(1.0, cloud_variation),
+        'layers': layer_complexity,
+        'edge_definition': min(1.0, edge_strength),
+        'overall_quality': min(1.0, (cloud_variation + layer_complexity + edge_strength) / 3)
+    }
+
+
+def reference_lighting_quality(pixels):
+    brightness = np.mean(pixels) / 255.0
+    red_avg = np.mean(pixels[:, :, 0])
+    blue_avg = np.mean(pixels[:, :, 2])
+    golden_ratio = min(1.0, (red_avg - blue_avg + 50) / 100.0)
+    brightness_std = np.std(pixels) / 127.5
+    softness = 1.0 - min(1.0, brightness_std)
+    return {
+        'brightness': brightness,
+        'golden_ratio': max(0, golden_ratio),
+        'softness': softness,
+        'quality': (brightness * 0.3 + golden_ratio * 0.5 + softness * 0.2)
+    }
+
+
+def reference_burnsky_photo(pixels):
+    color_analysis = reference_burnsky_colors(pixels)
+    cloud_analysis = reference_cloud_variations(pixels)
+    time_analysis = reference_lighting_quality(pixels)
+    total_score = min(10, color_analysis['intensity'] * 4 + cloud_analysis['variation'] * 3
+                      + time_analysis['golden_ratio'] * 3)
+    return {
+        'quality_score': total_score,
+        'color_analysis': color_analysis,
+        'cloud_analysis': cloud_analysis,
+        'lighting_analysis': time_analysis
+    }
+
+
+# ===== 參考實作：原 photo_analyzer.analyze_photo_quality =====
+
+def reference_photo_quality(img_array):
+    height = img_array.shape[0]
+    total_pixels = img_array.shape[0] * img_array.shape[1]
+    hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
+    (avg_hue, avg_saturation, avg_value), (_, _, value_std) = (
+        channel.ravel() for channel in cv2.meanStdDev(hsv)
+    )
+    orange_mask = cv2.inRange(hsv, (5, 51, 101), (25, 255, 255))
+    orange_ratio = cv2.countNonZero(orange_mask) / total_pixels
+    contrast = value_std / avg_value if avg_value > 0 else 0
+    color_diversity = count_unique_colors(img_array) / total_pixels
+    sky_value = hsv[:height//2, :, 2]
+    sky_mean, sky_std = (float(stat[0, 0]) for stat in cv2.meanStdDev(sky_value))
+    sky_brightness = sky_mean
+    cloud_score = min(1.0, (sky_brightness / 200) * (sky_std / 50))
+    atmospheric_score = min(1.0, (avg_saturation / 100) * (contrast / 0.5))
+    quality_score = (orange_ratio * 3 + contrast * 2 + color_diversity * 2
+                     + cloud_score * 2 + atmospheric_score * 1)
+    quality_score = min(10.0, max(0.0, quality_score))
+    return {
+        'quality_score': round(quality_score, 1),
+        'color_analysis': {
+            'orange_ratio': round(orange_ratio, 3),
+            'avg_hue': round(avg_hue, 1),
+            'avg_saturation': round(avg_saturation, 1),
+            'color_diversity': round(color_diversity, 3)
+        },
+        'cloud_analysis': {
+            'cloud_score': round(cloud_score, 2),
+            'sky_brightness': round(sky_brightness, 1),
+            'variation': round(sky_std / 255, 3)
+        },
+        'lighting_analysis': {
+            'contrast': round(contrast, 3),
+            'avg_brightness': round(avg_value, 1),
+            'golden_ratio': round(min(1.0, quality_score / 8), 2)
+        },
+        'atmospheric_conditions': {
+            'visibility_score': round(atmospheric_score, 2),
+            'haze_level': round(1 - atmospheric_score, 2)
+        }
+    }
+
+
+# ===== 測試圖片 =====
+
+def synthetic_samples(width=800, height=600):
+    """固定種子的合成圖片：日落漸層、灰階雲層、純色、噪聲及極小尺寸"""
+    rng = np.random.default_rng(42)
+    rows = np.linspace(0, 1, height)[:, None]
+    cols = np.linspace(0, 1, width)[None, :]
+
+    sunset = np.empty((height, width, 3))
+    sunset[..., 0] = 255 - 60 * rows + 0 * cols
+    sunset[..., 1] = 60 + 120 * rows * (1 - cols / 2)
+    sunset[..., 2] = 40 + 160 * rows
+    sunset += rng.normal(0, 12, sunset.shape)
+
+    clouds = np.repeat((128 + 60 * np.sin(rows * 9) * np.cos(cols * 13))[..., None], 3, axis=2)
+    clouds += rng.normal(0, 20, clouds.shape)
+
+    samples = {
+        'sunset_gradient': sunset,
+        'grey_clouds': clouds,
+        'flat_orange': np.broadcast_to([230, 120, 40], (height, width, 3)),
+        'black': np.zeros((height, width, 3)),
+        'noise': rng.integers(0, 256, (height, width, 3)),
+        'tiny_3x2': rng.integers(0, 256, (2, 3, 3)),
+        'odd_rows': rng.integers(0, 256, (height + 1, width // 2 + 1, 3))
+    }
+    return {name: np.ascontiguousarray(np.clip(image, 0, 255).astype(np.uint8)) for name, image in samples.items()}
+
+
+def load_samples(paths):
+    """本地照片以上傳相同的解碼管線縮小到分析解析度"""
+    samples = {}
+    for path in paths:
+        for filename in sorted(glob.glob(path)):
+            with open(filename, 'rb') as f:
+                samples[os.path.basename(filename)] = decode_photo(f.read()).pixels
+    return samples
+
+
+# ===== 核對及計時 =====
+
+def compare(expected, actual, path=''):
+    """遞迴比較兩個輸出，返回差異列表"""
+    if isinstance(expected, dict):
+        differences = [f"{path}: 缺少欄位 {key}" for key in expected if key not in actual]
+        differences += [f"{path}: 多出欄位 {key}" for key in actual if key not in expected]
+        for key in expected:
+            if key in actual:
+                differences += compare(expected[key], actual[key], f"{path}.{key}" if path else key)
+        return differences
+    if abs(float(expected) - float(actual)) > TOLERANCE:
+        return [f"{path}: 參考 {float(expected)!r} ≠ 引擎 {float(actual)!r}"]
+    return []
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def run(samples, repeat=3, timing=True):
+    """
+    Returns:
+        (差異列表, 計時表)
+    """
+    differences = []
+    timings = []
+    for name, pixels in samples.items():
+        engine_burnsky = score_burnsky_photo(extract_photo_features(pixels, hsv_stats=False))
+        engine_quality = score_photo_quality(extract_photo_features(pixels, rgb_stats=False))
+        differences += [f"{name} burnsky {d}" for d in compare(reference_burnsky_photo(pixels), engine_burnsky)]
+        differences += [f"{name} quality {d}" for d in compare(reference_photo_quality(pixels), engine_quality)]
+
+        if timing:
+            both = lambda: (score_burnsky_photo(features := extract_photo_features(pixels)),
+                            score_photo_quality(features))
+            timings.append({
+                'name': name,
+                'size': f"{pixels.shape[1]}×{pixels.shape[0]}",
+                'reference_burnsky': best_time(lambda: reference_burnsky_photo(pixels), repeat),
+                'engine_burnsky': best_time(
+                    lambda: score_burnsky_photo(extract_photo_features(pixels, hsv_stats=False)), repeat),
+                'reference_quality': best_time(lambda: reference_photo_quality(pixels), repeat),
+                'engine_quality': best_time(
+                    lambda: score_photo_quality(extract_photo_features(pixels, rgb_stats=False)), repeat),
+                'engine_both': best_time(both, repeat)
+            })
+    return differences, timings
+
+
+def print_timings(timings):
+    print(f"\n📊 毫秒/張（取最快一次）")
+    print(f"{'圖片':<22} {'尺寸':>10} {'燒天評分 參考→引擎':>22} {'HSV評分 參考→引擎':>22} {'兩者合併':>10}")
+    for row in timings:
+        print(f"{row['name']:<22} {row['size']:>10} "
+              f"{row['reference_burnsky']:>9.2f} → {row['engine_burnsky']:>6.2f} "
+              f"({row['reference_burnsky'] / row['engine_burnsky']:>4.1f}x) "
+              f"{row['reference_quality']:>9.2f} → {row['engine_quality']:>6.2f} "
+              f"({row['reference_quality'] / row['engine_quality']:>4.1f}x) "
+              f"{row['engine_both']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='照片特徵引擎基準測試及輸出核對')
+    parser.add_argument('images', nargs='*', help='本地照片檔案或 glob 模式（另加內建合成圖片）')
+    parser.add_argument('--repeat', type=int, default=3, help='每張圖片重複次數（取最快一次）')
+    parser.add_argument('--check', action='store_true', help='只核對輸出，不計時')
+    args = parser.parse_args()
+
+    samples = synthetic_samples()
+    samples.update(load_samples(args.images))
+
+    differences, timings = run(samples, args.repeat, timing=not args.check)
+    if timings:
+        print_timings(timings)
+
+    if differences:
+        print(f"\n❌ {len(differences)} 項輸出與參考實作不同:")
+        for difference in differences:
+            print(f"   {difference}")
+        sys.exit(1)
+    print(f"\n✅ {len(samples)} 張圖片的兩套評分輸出與參考實作相同（容許差 {TOLERANCE}）")
+
+
+if __name__ == "__main__":
+    main()
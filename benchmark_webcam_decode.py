@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+攝影機圖片低解析度解碼基準測試
+比較 WebcamImageAnalyzer 在各解碼縮放比例（1/2/4/8）下的速度及指標偏差，
+用於選擇 WEBCAM_DECODE_SCALE 預設值
+
+用法:
+    python benchmark_webcam_decode.py --live                  # 即時下載全部攝影機圖片
+    python benchmark_webcam_decode.py images/*.jpg            # 使用本地 JPEG
+    python benchmark_webcam_decode.py --live --repeat 5 --save-dir /tmp/webcams
+"""
+
+import argparse
+import glob
+import os
+import time
+import numpy as np
+
+from hko_webcam_fetcher import (
+    HKOWebcamFetcher, SUPPORTED_DECODE_SCALES, WebcamImage, WebcamImageAnalyzer
+)
+
+METRICS = ['red', 'green', 'blue', 'cloud_coverage', 'visibility', 'sunset_potential']
+
+
+def load_samples(paths, live=False, save_dir=None):
+    """載入測試圖片位元組：本地檔案或即時下載"""
+    samples = {}
+    for path in paths:
+        for filename in sorted(glob.glob(path)):
+            with open(filename, 'rb') as f:
+                samples[os.path.basename(filename)] = f.read()
+
+    if live:
+        fetcher = HKOWebcamFetcher()
+        for location_id, data in fetcher.fetch_multiple_webcams(return_format='bytes').items():
+            samples[location_id] = data['image']
+            if save_dir:
+                os.makedirs(save_dir, exist_ok=True)
+                with open(os.path.join(save_dir, f'{location_id}.jpg'), 'wb') as f:
+                    f.write(data['image'])
+    return samples
+
+
+def flatten_metrics(analysis):
+    """抽取要比較的數值指標"""
+    return {
+        'red': analysis['mean_color']['red'],
+        'green': analysis['mean_color']['green'],
+        'blue': analysis['mean_color']['blue'],
+        'cloud_coverage': analysis['cloud_coverage'],
+        'visibility': analysis['visibility'],
+        'sunset_potential': analysis['sunset_potential']['score']
+    }
+
+
+def run_benchmark(samples, repeat=3):
+    """
+    對每個縮放比例測量解碼+分析時間，並以全解析度結果為基準計算指標平均絕對偏差
+
+    Returns:
+        dict: 縮放比例 → {'ms_per_image', 'speedup', 'mean_abs_drift', 'max_abs_drift'}
+    """
+    reference = {}
+    report = {}
+    for scale in SUPPORTED_DECODE_SCALES:
+        analyzer = WebcamImageAnalyzer(metrics_cache_size=0, decode_scale=scale)
+        timings = []
+        drifts = {metric: [] for metric in METRICS}
+
+        for name, data in samples.items():
+            best = None
+            for _ in range(repeat):
+                # 每次建立新物件，確保包含解碼時間
+                image = WebcamImage(data)
+                start = time.perf_counter()
+                analysis = analyzer.analyze_sky_conditions(image)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+
+            metrics = flatten_metrics(analysis)
+            if scale == 1:
+                reference[name] = metrics
+            for metric in METRICS:
+                drifts[metric].append(abs(metrics[metric] - reference[name][metric]))
+
+        report[scale] = {
+            'ms_per_image': float(np.mean(timings) * 1000),
+            'mean_abs_drift': {metric: float(np.mean(values)) for metric, values in drifts.items()},
+            'max_abs_drift': {metric: float(np.max(values)) for metric, values in drifts.items()}
+        }
+
+    base = report[1]['ms_per_image']
+    for scale in report:
+        report[scale]['speedup'] = base / report[scale]['ms_per_image'] if report[scale]['ms_per_image'] else 0.0
+    return report
+
+
+def print_report(report, sample_count):
+    print(f"\n📊 {sample_count} 張圖片，指標偏差為相對全解析度的平均絕對差（括號內為最大值）")
+    header = f"{'比例':>6} {'毫秒/張':>9} {'加速':>6} " + ' '.join(f"{metric:>20}" for metric in METRICS)
+    print(header)
+    for scale, row in report.items():
+        drift = ' '.join(
+            f"{row['mean_abs_drift'][metric]:>11.2f} ({row['max_abs_drift'][metric]:>6.2f})" for metric in METRICS
+        )
+        print(f"  1/{scale:<3} {row['ms_per_image']:>9.2f} {row['speedup']:>5.1f}x {drift}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='攝影機圖片低解析度解碼基準測試')
+    parser.add_argument('images', nargs='*', help='本地 JPEG 檔案或 glob 模式')
+    parser.add_argument('--live', action='store_true', help='即時下載全部攝影機圖片')
+    parser.add_argument('--save-dir', help='保存下載的圖片，方便之後離線重跑')
+    parser.add_argument('--repeat', type=int, default=3, help='每張圖片重複次數（取最快一次）')
+    args = parser.parse_args()
+
+    samples = load_samples(args.images, args.live, args.save_dir)
+    if not samples:
+        parser.error('沒有可用的圖片，請提供 JPEG 路徑或使用 --live')
+
+    report = run_benchmark(samples, args.repeat)
+    print_report(report, len(samples))
+
+
+if __name__ == "__main__":
+    main()
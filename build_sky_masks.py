@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+攝影機天空遮罩離線生成工具
+HKO 攝影機視角固定，對每部攝影機的多張白天圖片估算天際線，
+生成天空布林遮罩並以 packbits 壓縮寫入 webcam_sky_masks.json，
+供 WebcamImageAnalyzer 取代「圖片上半部」的假設
+
+用法:
+    python build_sky_masks.py --live --samples 3 --interval 600    # 每10分鐘取樣一次，共3次
+    python build_sky_masks.py --frames-dir /tmp/webcams           # 使用 <攝影機ID>*.jpg 本地圖片
+    python build_sky_masks.py --frames-dir /tmp/webcams --preview-dir /tmp/masks  # 輸出遮罩預覽
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+
+from hko_webcam_fetcher import (
+    HKOWebcamFetcher, MIN_SKY_MASK_COVERAGE, SKY_MASK_PATH, decode_image_array, pack_sky_mask
+)
+
+# 遮罩以原圖 1/MASK_SCALE 解析度保存（分析時以最近鄰縮放到實際尺寸）
+MASK_SCALE = 8
+# 夜間或過暗圖片無法分辨天空
+MIN_FRAME_BRIGHTNESS = 60
+# 梯度低於此值視為平滑（天空）像素；雲層邊緣梯度較大，由天際線掃描的累積評分容忍
+SMOOTH_GRADIENT_THRESHOLD = 60
+# 非天空像素的扣分權重（大於 1 時天際線偏向保守）
+NON_SKY_PENALTY = 1.0
+
+
+def estimate_skyline(rgb: np.ndarray) -> np.ndarray:
+    """
+    估算單張圖片每一列的天際線位置（該列天空延伸到的行數）
+
+    天空像素：亮度足夠且局部梯度低。每列由上而下累積評分（天空 +1、非天空 -NON_SKY_PENALTY），
+    評分最高的位置即天際線；雲層等零散的非天空像素會被下方的大片天空抵銷，
+    而地面建築的連續非天空像素令評分持續下降
+    """
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    gradient = cv2.magnitude(cv2.Sobel(blurred, cv2.CV_32F, 1, 0), cv2.Sobel(blurred, cv2.CV_32F, 0, 1))
+    gradient = cv2.blur(gradient, (5, 5))
+    sky_like = (gradient < SMOOTH_GRADIENT_THRESHOLD) & (blurred > MIN_FRAME_BRIGHTNESS)
+
+    score = np.where(sky_like, 1.0, -NON_SKY_PENALTY)
+    cumulative = np.vstack([np.zeros((1, score.shape[1])), np.cumsum(score, axis=0)])
+    return cumulative.argmax(axis=0)
+
+
+def build_mask(frames: list) -> np.ndarray:
+    """以多張圖片天際線的中位數生成遮罩（過暗圖片會被略過）"""
+    skylines = []
+    shape = None
+    for rgb in frames:
+        if rgb.mean() < MIN_FRAME_BRIGHTNESS:
+            continue
+        if shape is None:
+            shape = rgb.shape[:2]
+        elif rgb.shape[:2] != shape:
+            rgb = cv2.resize(rgb, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+        skylines.append(estimate_skyline(rgb))
+    if not skylines:
+        return None
+
+    skyline = np.median(np.vstack(skylines), axis=0)
+    # 平滑天際線，去除個別列的雜訊
+    skyline = cv2.medianBlur(skyline.astype(np.float32).reshape(1, -1), 5).ravel()
+    rows = np.arange(shape[0])[:, None]
+    return rows < skyline[None, :]
+
+
+def load_local_frames(frames_dir: str) -> dict:
+    """讀取 <攝影機ID>*.jpg 本地圖片"""
+    frames = {}
+    for location_id in HKOWebcamFetcher.WEBCAM_LOCATIONS:
+        for filename in sorted(glob.glob(os.path.join(frames_dir, f'{location_id}*.jpg'))):
+            with open(filename, 'rb') as f:
+                frames.setdefault(location_id, []).append(decode_image_array(f.read(), MASK_SCALE))
+    return frames
+
+
+def fetch_live_frames(samples: int, interval: int) -> dict:
+    """即時取樣攝影機圖片（多次取樣以減少單張圖片的雲層影響）"""
+    fetcher = HKOWebcamFetcher()
+    frames = {}
+    for sample in range(samples):
+        if sample:
+            print(f"⏳ 等待 {interval} 秒後進行第 {sample + 1} 次取樣...")
+            time.sleep(interval)
+        for location_id, data in fetcher.fetch_multiple_webcams(return_format='bytes').items():
+            frames.setdefault(location_id, []).append(decode_image_array(data['image'], MASK_SCALE))
+        print(f"📷 第 {sample + 1}/{samples} 次取樣完成")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='攝影機天空遮罩離線生成工具')
+    parser.add_argument('--frames-dir', help='本地圖片目錄（檔名以攝影機ID開頭）')
+    parser.add_argument('--live', action='store_true', help='即時下載攝影機圖片')
+    parser.add_argument('--samples', type=int, default=3, help='即時取樣次數')
+    parser.add_argument('--interval', type=int, default=600, help='即時取樣間隔（秒）')
+    parser.add_argument('--output', default=SKY_MASK_PATH, help='輸出檔案')
+    parser.add_argument('--preview-dir', help='輸出遮罩預覽 PNG 以供人工檢查')
+    args = parser.parse_args()
+
+    frames = {}
+    if args.frames_dir:
+        frames.update(load_local_frames(args.frames_dir))
+    if args.live:
+        for location_id, items in fetch_live_frames(args.samples, args.interval).items():
+            frames.setdefault(location_id, []).extend(items)
+    if not frames:
+        parser.error('沒有可用的圖片，請提供 --frames-dir 或使用 --live（需在白天執行）')
+
+    masks = {}
+    for location_id, items in sorted(frames.items()):
+        mask = build_mask(items)
+        if mask is None or mask.mean() < MIN_SKY_MASK_COVERAGE:
+            print(f"⚠️ {location_id}: 無法生成有效遮罩（圖片過暗或天空過少），將沿用上半部")
+            continue
+        masks[location_id] = dict(pack_sky_mask(mask), frames=len(items))
+        print(f"✅ {location_id}: 天空覆蓋 {mask.mean() * 100:.1f}%（{len(items)} 張圖片）")
+        if args.preview_dir:
+            os.makedirs(args.preview_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(args.preview_dir, f'{location_id}_mask.png'), mask.astype(np.uint8) * 255)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'built_at': datetime.now().isoformat(),
+            'mask_scale': MASK_SCALE,
+            'masks': masks
+        }, f, ensure_ascii=False, indent=1)
+    print(f"💾 已寫入 {len(masks)} 個天空遮罩: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+預測特徵庫模組
+將每次預測的完整特徵向量（ML輸入特徵、九個因子分數、ML分數及權重）寫入
+具型別欄位的 SQLite 表，並以 prediction_uid 連結用戶反饋及照片案例，
+訓練及評估時可一次掃描直接取得特徵矩陣，無需重新解析 JSON 或重新提取特徵。
+同一次計算的結果會被快取並多次返回，每次返回的回應各有自己的 prediction_uid，
+經 prediction_serves 表對應到該次計算的特徵記錄
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+
+from advanced_predictor import AdvancedBurnskyPredictor
+
+FEATURE_STORE_DB = os.getenv('FEATURE_STORE_DB', os.getenv('PREDICTION_HISTORY_DB', 'prediction_history.db'))
+
+# 欄位定義（順序即特徵矩陣的列順序）
+ML_FEATURE_COLUMNS = list(AdvancedBurnskyPredictor.FEATURE_NAMES)
+FACTOR_COLUMNS = ['time', 'temperature', 'humidity', 'visibility', 'pressure',
+                  'cloud', 'uv', 'wind', 'air_quality']
+SCORE_COLUMNS = ['traditional_score', 'traditional_normalized', 'ml_score',
+                 'weight_traditional', 'weight_ml', 'weighted_score', 'unified_score', 'final_score']
+
+# 標籤來源：user_feedback 的 user_rating 為 0-100，照片案例的 visual_rating 為 0-10
+LABEL_SCALES = {
+    'user_feedback': 1.0,
+    'photo_case': 10.0
+}
+
+
+def _to_float(value):
+    """轉換為 SQLite REAL（numpy 數值亦適用），缺失值保留為 NULL"""
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _feature_column(name):
+    return f"f_{name}"
+
+
+def _factor_column(name):
+    return f"factor_{name}"
+
+
+MATRIX_COLUMNS = ([_feature_column(name) for name in ML_FEATURE_COLUMNS] +
+                  [_factor_column(name) for name in FACTOR_COLUMNS] +
+                  SCORE_COLUMNS)
+
+
+class FeatureStore:
+    """預測特徵庫（背景執行緒批次寫入，請求路徑只需入隊）"""
+
+    def __init__(self, db_path=FEATURE_STORE_DB, batch_size=50, flush_interval=2.0, max_queue=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._initialized = False
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def init_db(self):
+        """建立特徵表及標籤連結表"""
+        columns = ',\n'.join(f"{column} REAL" for column in MATRIX_COLUMNS)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS prediction_features (
+                prediction_uid TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                prediction_type TEXT,
+                advance_hours INTEGER,
+                model_version TEXT,
+                {columns}
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prediction_feature_labels (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                prediction_uid TEXT NOT NULL,
+                source TEXT NOT NULL,      -- user_feedback / photo_case
+                source_id TEXT,            -- 反饋ID或照片案例ID
+                label_score REAL,          -- 標準化到 0-100 的實際評分
+                created_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prediction_serves (
+                prediction_uid TEXT PRIMARY KEY,  -- 返回給客戶端的ID（每個回應不同）
+                feature_uid TEXT NOT NULL,        -- prediction_features.prediction_uid
+                served_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_created ON prediction_features(created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_serves_feature ON prediction_serves(feature_uid)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feature_labels_uid ON prediction_feature_labels(prediction_uid)')
+        conn.commit()
+        conn.close()
+        self._initialized = True
+
+    def _ensure_writer(self):
+        """延遲啟動背景寫入執行緒"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                if not self._initialized:
+                    self.init_db()
+                self._writer = threading.Thread(target=self._writer_loop, name='feature-store-writer', daemon=True)
+                self._writer.start()
+
+    def record_prediction(self, unified_result, final_score, prediction_type, advance_hours, model_version=None):
+        """
+        記錄一次預測的特徵向量（非阻塞）
+
+        Args:
+            unified_result: UnifiedBurnskyScorer.calculate_unified_score 的結果
+            final_score: 警告及照片校正後的最終分數
+            prediction_type: 'sunset' 或 'sunrise'
+            advance_hours: 提前預測小時數
+            model_version: ML模型版本
+
+        Returns:
+            str: 特徵記錄ID；每次返回回應時以 record_serve 取得該回應的 prediction_uid
+        """
+        prediction_uid = uuid.uuid4().hex
+        ml_features = unified_result.get('ml_features') or {}
+        factor_scores = unified_result.get('factor_scores') or {}
+        weights = unified_result.get('weights_used') or {}
+
+        values = [ml_features.get(name) for name in ML_FEATURE_COLUMNS]
+        values += [factor_scores.get(name) for name in FACTOR_COLUMNS]
+        values += [
+            unified_result.get('traditional_score'),
+            unified_result.get('traditional_normalized'),
+            unified_result.get('ml_score'),
+            weights.get('traditional'),
+            weights.get('ml'),
+            unified_result.get('weighted_score'),
+            unified_result.get('final_score'),
+            final_score
+        ]
+        row = [prediction_uid, datetime.now().isoformat(), prediction_type, int(advance_hours), model_version]
+        row += [_to_float(value) for value in values]
+
+        try:
+            self._ensure_writer()
+            self._queue.put_nowait(('feature', row))
+        except queue.Full:
+            self.dropped += 1
+        except Exception as e:
+            print(f"⚠️ 特徵庫記錄失敗: {e}")
+            self.write_errors += 1
+        return prediction_uid
+
+    def record_serve(self, feature_uid):
+        """
+        為一次返回的回應產生 prediction_uid 並記錄其對應的特徵記錄（非阻塞）
+
+        Args:
+            feature_uid: record_prediction 的返回值（快取結果重複返回時相同）
+
+        Returns:
+            str: 本回應的 prediction_uid；沒有特徵記錄時返回 None
+        """
+        if not feature_uid:
+            return None
+        prediction_uid = uuid.uuid4().hex
+        try:
+            self._ensure_writer()
+            self._queue.put_nowait(('serve', [prediction_uid, feature_uid, datetime.now().isoformat()]))
+        except queue.Full:
+            self.dropped += 1
+        except Exception as e:
+            print(f"⚠️ 特徵庫記錄失敗: {e}")
+            self.write_errors += 1
+        return prediction_uid
+
+    def link_label(self, prediction_uid, source, source_id, rating):
+        """將實際觀測評分（用戶反饋或照片案例）連結到預測特徵"""
+        if not prediction_uid or rating is None:
+            return False
+        scale = LABEL_SCALES.get(source, 1.0)
+        row = [prediction_uid, source, str(source_id), float(rating) * scale, datetime.now().isoformat()]
+        try:
+            self._ensure_writer()
+            self._queue.put_nowait(('label', row))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_loop(self):
+        """背景寫入：累積到 batch_size 或超過 flush_interval 即批次提交"""
+        conn = sqlite3.connect(self.db_path)
+        feature_sql = (f"INSERT OR REPLACE INTO prediction_features "
+                       f"(prediction_uid, created_at, prediction_type, advance_hours, model_version, "
+                       f"{', '.join(MATRIX_COLUMNS)}) VALUES ({', '.join(['?'] * (5 + len(MATRIX_COLUMNS)))})")
+        label_sql = ("INSERT INTO prediction_feature_labels "
+                     "(prediction_uid, source, source_id, label_score, created_at) VALUES (?, ?, ?, ?, ?)")
+        serve_sql = "INSERT OR IGNORE INTO prediction_serves (prediction_uid, feature_uid, served_at) VALUES (?, ?, ?)"
+        # 特徵記錄先於對應的回應及標籤寫入
+        statements = [('feature', feature_sql), ('serve', serve_sql), ('label', label_sql)]
+        pending = {kind: [] for kind, _ in statements}
+        last_flush = time.monotonic()
+
+        while True:
+            flushed_event = None
+            stopping = False
+            try:
+                kind, row = self._queue.get(timeout=self.flush_interval)
+                if kind in ('flush', 'stop'):
+                    flushed_event = row
+                    stopping = kind == 'stop'
+                else:
+                    pending[kind].append(row)
+            except queue.Empty:
+                pass
+
+            count = sum(len(rows) for rows in pending.values())
+            if count and (flushed_event is not None or count >= self.batch_size
+                          or time.monotonic() - last_flush >= self.flush_interval):
+                try:
+                    with conn:
+                        for kind, sql in statements:
+                            if pending[kind]:
+                                conn.executemany(sql, pending[kind])
+                    self.written += count
+                except Exception as e:
+                    print(f"❌ 特徵庫批次寫入失敗: {e}")
+                    self.write_errors += count
+                pending = {kind: [] for kind, _ in statements}
+                last_flush = time.monotonic()
+            if flushed_event is not None:
+                flushed_event.set()
+            if stopping:
+                conn.close()
+                return
+
+    def flush(self, timeout=10.0):
+        """立即寫入佇列中的記錄（用於離線腳本結束前），返回是否在時限內完成"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', done), timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """寫入佇列中的所有記錄並停止背景執行緒（進程結束時調用），返回是否在時限內完成"""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(('stop', done), timeout=timeout)
+        except queue.Full:
+            return False
+        finished = done.wait(timeout)
+        writer.join(timeout)
+        return finished
+
+    def load_feature_matrix(self, labeled_only=False, since=None):
+        """
+        一次掃描讀取特徵矩陣
+
+        Args:
+            labeled_only: 只返回有實際觀測評分的預測（每個標籤一行；標籤可連結到回應的
+                          prediction_uid 或直接連結到特徵記錄）
+            since: ISO 時間字串，只讀取此時間之後的預測
+
+        Returns:
+            dict: {'uids', 'columns', 'X' (float64, 缺失值為 NaN), 'y' (labeled_only 時為觀測評分)}
+        """
+        if not self._initialized:
+            self.init_db()
+        select_columns = ', '.join(f"f.{column}" for column in MATRIX_COLUMNS)
+        if labeled_only:
+            sql = (f"SELECT f.prediction_uid, {select_columns}, l.label_score FROM prediction_feature_labels l "
+                   f"LEFT JOIN prediction_serves s ON s.prediction_uid = l.prediction_uid "
+                   f"JOIN prediction_features f ON f.prediction_uid = COALESCE(s.feature_uid, l.prediction_uid)")
+        else:
+            sql = f"SELECT f.prediction_uid, {select_columns} FROM prediction_features f"
+        params = ()
+        if since:
+            sql += " WHERE f.created_at >= ?"
+            params = (since,)
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+
+        width = len(MATRIX_COLUMNS)
+        values = np.array([row[1:1 + width] for row in rows], dtype=np.float64).reshape(len(rows), width)
+        matrix = {
+            'uids': [row[0] for row in rows],
+            'columns': list(MATRIX_COLUMNS),
+            'X': values
+        }
+        if labeled_only:
+            matrix['y'] = np.array([row[-1] for row in rows], dtype=np.float64)
+        return matrix
+
+    def stats(self):
+        """寫入統計"""
+        return {
+            'db_path': self.db_path,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'write_errors': self.write_errors,
+            'writer_alive': bool(self._writer and self._writer.is_alive())
+        }
+
+
+# 全域共用實例（進程結束前寫入仍在佇列中的記錄）
+feature_store = FeatureStore()
+atexit.register(feature_store.close)
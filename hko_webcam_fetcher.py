@@ -3,17 +3,258 @@
 自動獲取即時天氣圖片並進行燒天預測分析
 """
 
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import time
+import hashlib
+import threading
+import heapq
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from PIL import Image
 import io
 import base64
 import numpy as np
 import cv2
+import json
+import pytz
+from astral.sun import azimuth as sun_azimuth, sun
 from typing import Dict, List, Optional, Tuple
 import logging
 
+# 日出日落時間及太陽方位角與預測器共用同一香港位置
+from advanced_predictor import HK_LOCATION
+
+HK_TZ = pytz.timezone('Asia/Hong_Kong')
+
+# 天空分析的 JPEG 解碼縮放比例（1 = 全解析度；2/4/8 利用 JPEG DCT 縮放直接以低解析度解碼）
+SUPPORTED_DECODE_SCALES = (1, 2, 4, 8)
+DEFAULT_DECODE_SCALE = int(os.getenv('WEBCAM_DECODE_SCALE', '1'))
+
+
+def decode_image_array(data: bytes, scale: int = 1) -> np.ndarray:
+    """
+    將圖片位元組解碼為 RGB 陣列
+    
+    JPEG 使用 PIL draft() 在解碼階段以 1/scale 解析度輸出（不先解碼全尺寸再縮小），
+    其他格式解碼後以 reduce() 縮小
+    """
+    image = Image.open(io.BytesIO(data))
+    if scale > 1:
+        target_size = (max(1, image.width // scale), max(1, image.height // scale))
+        if image.format == 'JPEG':
+            image.draft('RGB', target_size)
+        else:
+            image = image.reduce(scale)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image)
+
+# 畫面差異快速路徑：每部攝影機保留上次完整分析畫面的 32×18 灰階簽名，
+# 新畫面的平均絕對差（0-255）及平均顏色差都低於閾值時沿用上次的像素指標
+FRAME_SIGNATURE_SIZE = (32, 18)
+FRAME_DIFF_THRESHOLD = float(os.getenv('WEBCAM_FRAME_DIFF_THRESHOLD', '2.0'))
+
+# 各攝影機的靜態天空遮罩（由 build_sky_masks.py 離線生成；缺少遮罩的攝影機沿用上半部）
+SKY_MASK_PATH = os.getenv('WEBCAM_SKY_MASK_PATH',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webcam_sky_masks.json'))
+# 遮罩覆蓋率低於此值視為無效（分割失敗）
+MIN_SKY_MASK_COVERAGE = 0.02
+
+
+def pack_sky_mask(mask: np.ndarray) -> Dict:
+    """將布林遮罩以 np.packbits 壓縮為可寫入 JSON 的字典"""
+    mask = np.asarray(mask, dtype=bool)
+    return {
+        'shape': list(mask.shape),
+        'bits': base64.b64encode(np.packbits(mask, axis=None).tobytes()).decode(),
+        'coverage': round(float(mask.mean()), 4)
+    }
+
+
+def unpack_sky_mask(entry: Dict) -> np.ndarray:
+    """還原 pack_sky_mask 生成的布林遮罩"""
+    height, width = entry['shape']
+    bits = np.frombuffer(base64.b64decode(entry['bits']), dtype=np.uint8)
+    return np.unpackbits(bits, count=height * width).reshape(height, width).astype(bool)
+
+
+def load_sky_masks(path: str = SKY_MASK_PATH) -> Dict[str, np.ndarray]:
+    """載入天空遮罩檔案，檔案不存在或損壞時返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f).get('masks', {})
+        masks = {}
+        for location_id, entry in entries.items():
+            mask = unpack_sky_mask(entry)
+            if mask.mean() >= MIN_SKY_MASK_COVERAGE:
+                masks[location_id] = mask
+        return masks
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Failed to load sky masks from {path}: {e}")
+        return {}
+
+
+class WebcamImage:
+    """
+    攝影機圖片的多重表示：保留原始 JPEG 位元組，PIL 圖片、RGB 陣列及 base64
+    只在首次使用時才解碼／編碼，之後重用
+    """
+    
+    def __init__(self, data: bytes, content_hash: Optional[str] = None):
+        self.data = data
+        self.content_hash = content_hash or hashlib.sha1(data).hexdigest()
+        self._pil = None
+        self._arrays = {}
+        self._base64 = None
+        
+    @property
+    def pil(self) -> Image.Image:
+        """PIL 圖片（Image.open 只讀取檔頭，像素延後解碼）"""
+        if self._pil is None:
+            self._pil = Image.open(io.BytesIO(self.data))
+        return self._pil
+        
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.pil.size
+        
+    @property
+    def array(self) -> np.ndarray:
+        """全解析度 RGB numpy 陣列"""
+        return self.array_at(1)
+        
+    def array_at(self, scale: int = 1) -> np.ndarray:
+        """以 1/scale 解析度解碼的 RGB 陣列（每個比例只解碼一次）"""
+        if scale not in self._arrays:
+            self._arrays[scale] = decode_image_array(self.data, scale)
+        return self._arrays[scale]
+        
+    @property
+    def base64(self) -> str:
+        """原始 JPEG 的 base64 編碼"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode()
+        return self._base64
+        
+    def to_cv2(self) -> np.ndarray:
+        """OpenCV BGR 陣列"""
+        return cv2.cvtColor(self.array, cv2.COLOR_RGB2BGR)
+
+
+class CameraCircuitBreaker:
+    """
+    單一攝影機的斷路器及自適應超時
+    
+    closed: 正常請求；連續失敗 failure_threshold 次後轉為 open
+    open: 冷卻期內不發出請求；冷卻期後轉為 half_open
+    half_open: 只放行一個探測請求，成功則 closed，失敗則重新 open 並加倍冷卻期
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0, max_cooldown: float = 900.0,
+                 max_timeout: float = 10.0, min_timeout: float = 2.0, latency_window: int = 50):
+        """
+        Args:
+            failure_threshold: 連續失敗多少次後斷開
+            cooldown: 首次斷開的冷卻秒數（半開探測失敗後加倍，最多 max_cooldown）
+            max_timeout: 請求超時上限（延遲樣本不足時使用）
+            min_timeout: 自適應超時下限
+            latency_window: 保留最近多少次成功請求的延遲
+        """
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = cooldown
+        self.opened_at = None
+        self.open_count = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        
+    def allow_request(self) -> bool:
+        """是否可以發出請求（half_open 時只放行一個探測請求）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+            
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+            
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+            self._probe_in_flight = False
+            
+    def release_probe(self):
+        """探測請求未實際發出（已取消或時限已到）時釋放探測名額"""
+        with self._lock:
+            self._probe_in_flight = False
+            
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.open_count += 1
+        
+    def latency_percentile(self, q: float) -> Optional[float]:
+        latencies = list(self._latencies)
+        return float(np.percentile(latencies, q)) if latencies else None
+        
+    def timeout(self) -> float:
+        """自適應超時：最近延遲 p95 的三倍，樣本不足時使用上限"""
+        if len(self._latencies) < 5:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.latency_percentile(95) * 3))
+        
+    def status(self) -> Dict:
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'open_count': self.open_count,
+            'rejected_requests': self.rejected,
+            'retry_in_seconds': retry_in,
+            'latency_p50': round(p50, 3) if p50 is not None else None,
+            'latency_p95': round(p95, 3) if p95 is not None else None,
+            'timeout_seconds': round(self.timeout(), 2)
+        }
+
+
 class HKOWebcamFetcher:
     """香港天文台網路攝影機圖片獲取器"""
     
@@ -339,123 +580,322 @@ class HKOWebcamFetcher:
         }
     }
     
-    def __init__(self, timeout: int = 10, retry_attempts: int = 3):
+    # 攝影機朝向（八方位）對應的方位角
+    DIRECTION_BEARINGS = {
+        'North': 0, 'Northeast': 45, 'East': 90, 'Southeast': 135,
+        'South': 180, 'Southwest': 225, 'West': 270, 'Northwest': 315
+    }
+    # 視為覆蓋太陽方向的最大方位差（鏡頭半視角約35°，加上八方位標示的 ±22.5° 誤差）
+    CAMERA_HALF_FOV = 60
+    PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+    
+    def __init__(self, timeout: int = 10, retry_attempts: int = 3, max_workers: int = 16,
+                 fetch_deadline: float = 20.0, failure_threshold: int = 3, breaker_cooldown: float = 60.0):
         """
         初始化攝影機獲取器
         
         Args:
-            timeout: 請求超時時間（秒）
-            retry_attempts: 重試次數
+            timeout: 請求超時上限（秒），實際超時按各攝影機的延遲自適應
+            retry_attempts: 每部攝影機的最多嘗試次數
+            max_workers: 批量獲取時的並行連線數（所有批次共用同一個長駐執行緒池）
+            fetch_deadline: 批量獲取的總時限（秒），逾時返回已完成的部分結果
+            failure_threshold: 連續失敗多少次後斷開該攝影機的斷路器
+            breaker_cooldown: 斷路器首次斷開的冷卻秒數
         """
         self.timeout = timeout
         self.retry_attempts = retry_attempts
+        self.max_workers = max_workers
+        self.fetch_deadline = fetch_deadline
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # 連線池大小與並行數一致，避免並行請求互相等待連線
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.last_batch_stats = {}
+        
+        # 每個攝影機最後一張圖片的 ETag / Last-Modified / 內容雜湊，用於條件請求
+        self._image_cache = {}
+        self._image_cache_lock = threading.Lock()
+        self.conditional_stats = {'not_modified': 0, 'downloaded': 0, 'unchanged_content': 0}
+        self._stats_lock = threading.Lock()
+        
+        # 請求執行緒池延遲建立並長駐（背景監控、圖片代理及單部攝影機請求共用）
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
+        # 每個攝影機獨立的斷路器（失效的攝影機不會拖慢整批獲取）
+        self.breakers = {
+            location_id: CameraCircuitBreaker(failure_threshold, breaker_cooldown, max_timeout=timeout)
+            for location_id in self.WEBCAM_LOCATIONS
+        }
         
         # 設置日誌
         self.logger = logging.getLogger(__name__)
         
-    def fetch_webcam_image(self, location_id: str, return_format: str = 'pil') -> Optional[Dict]:
+    def fetch_webcam_image(self, location_id: str, return_format: str = 'pil',
+                           deadline: Optional[float] = None) -> Optional[Dict]:
         """
         獲取指定攝影機的最新圖片
         
         Args:
             location_id: 攝影機位置ID
-            return_format: 返回格式 ('pil', 'base64', 'cv2', 'bytes')
+            return_format: 返回格式 ('pil', 'base64', 'cv2', 'bytes', 'image' 即 WebcamImage 物件)
+            deadline: time.monotonic() 時限，None 使用 fetch_deadline
             
         Returns:
-            包含圖片和元數據的字典，或None（如果失敗）
+            包含圖片和元數據的字典，或None（如果失敗或斷路器斷開）
         """
         if location_id not in self.WEBCAM_LOCATIONS:
             self.logger.error(f"Unknown webcam location: {location_id}")
             return None
+        
+        if deadline is None:
+            deadline = time.monotonic() + self.fetch_deadline
+        results, _ = self._run_fetch_schedule([location_id], return_format, deadline)
+        return results.get(location_id)
+        
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='webcam-fetch')
+            return self._executor
             
-        location_info = self.WEBCAM_LOCATIONS[location_id]
+    def _count_conditional(self, key: str):
+        with self._stats_lock:
+            self.conditional_stats[key] += 1
+            
+    def get_conditional_stats(self) -> Dict:
+        with self._stats_lock:
+            return dict(self.conditional_stats)
+            
+    def _retry_delay(self, attempt: int) -> float:
+        """第 attempt 次失敗後的重試延遲（指數退避）"""
+        return float(2 ** attempt)
         
-        for attempt in range(self.retry_attempts):
-            try:
-                response = self.session.get(
-                    location_info['url'], 
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
+    def _run_fetch_schedule(self, location_ids: List[str], return_format: str, deadline: float):
+        """
+        以重試排程獲取多部攝影機：每次嘗試作為獨立任務提交，失敗後按退避時間重新排程，
+        工作執行緒不會因等待重試而阻塞；斷路器斷開的攝影機直接略過
+        
+        Returns:
+            (結果字典, 統計 {'failed', 'timed_out', 'circuit_open', 'retries'})
+        """
+        results = {}
+        stats = {'failed': [], 'timed_out': [], 'circuit_open': [], 'retries': 0}
+        pending = {}
+        retry_queue = []
+        
+        executor = self._get_executor()
+        
+        def submit(location_id, attempt):
+            if not self.breakers[location_id].allow_request():
+                stats['circuit_open'].append(location_id)
+                return
+            future = executor.submit(self._fetch_attempt, location_id, return_format, deadline)
+            pending[future] = (location_id, attempt)
+        
+        try:
+            for location_id in location_ids:
+                submit(location_id, 0)
+            
+            while pending or retry_queue:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                while retry_queue and retry_queue[0][0] <= now:
+                    _, location_id, attempt = heapq.heappop(retry_queue)
+                    stats['retries'] += 1
+                    submit(location_id, attempt)
                 
-                # 檢查是否為有效圖片
-                image_data = response.content
-                if len(image_data) < 1000:  # 太小可能是錯誤頁面
-                    raise ValueError("Image data too small")
-                    
-                # 獲取照片實際更新時間（從HTTP header）
-                capture_time = datetime.now()
-                if 'Last-Modified' in response.headers:
-                    try:
-                        from email.utils import parsedate_to_datetime
-                        last_modified = response.headers['Last-Modified']
-                        capture_time = parsedate_to_datetime(last_modified)
-                        # 轉換為本地時區（香港時間）
-                        import pytz
-                        hk_tz = pytz.timezone('Asia/Hong_Kong')
-                        if capture_time.tzinfo is None:
-                            # 如果沒有時區信息，假設是UTC
-                            capture_time = pytz.utc.localize(capture_time)
-                        capture_time = capture_time.astimezone(hk_tz)
-                    except Exception as e:
-                        self.logger.warning(f"Failed to parse Last-Modified header: {e}")
-                        capture_time = datetime.now()
+                # 等到有請求完成或下一次重試到期（排程執行緒等待，工作執行緒不阻塞）
+                wake_at = min(deadline, retry_queue[0][0]) if retry_queue else deadline
+                if not pending:
+                    time.sleep(max(0.0, wake_at - time.monotonic()))
+                    continue
+                done, _ = wait(list(pending), timeout=max(0.0, wake_at - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
                 
-                # 轉換圖片格式
-                pil_image = Image.open(io.BytesIO(image_data))
+                for future in done:
+                    location_id, attempt = pending.pop(future)
+                    result = None if future.exception() else future.result()
+                    if result is not None:
+                        results[location_id] = result
+                        continue
+                    now = time.monotonic()
+                    retry_at = now + self._retry_delay(attempt)
+                    if now >= deadline:
+                        # 請求因截止時間被取消（開始時已無剩餘時間或超時被截短），不算作失敗
+                        stats['timed_out'].append(location_id)
+                    elif (attempt + 1 < self.retry_attempts and retry_at < deadline
+                            and self.breakers[location_id].state == CameraCircuitBreaker.CLOSED):
+                        heapq.heappush(retry_queue, (retry_at, location_id, attempt + 1))
+                    else:
+                        stats['failed'].append(location_id)
+        finally:
+            # 不等待逾時的請求（其超時已截短至截止時間），未開始的任務直接取消並釋放探測名額
+            for future, (location_id, _) in pending.items():
+                if future.cancel():
+                    self.breakers[location_id].release_probe()
+        
+        # 截止時仍在執行、被取消或等待重試的攝影機都算作逾時
+        stats['timed_out'] += [location_id for location_id, _ in pending.values()]
+        stats['timed_out'] += [location_id for _, location_id, _ in retry_queue]
+        return results, stats
+        
+    def _fetch_attempt(self, location_id: str, return_format: str, deadline: float) -> Optional[Dict]:
+        """單次請求（超時按該攝影機的延遲自適應），結果記錄到斷路器"""
+        location_info = self.WEBCAM_LOCATIONS[location_id]
+        breaker = self.breakers[location_id]
+        timeout = min(breaker.timeout(), deadline - time.monotonic())
+        if timeout <= 0:
+            breaker.release_probe()
+            return None
+        
+        started = time.monotonic()
+        try:
+            with self._image_cache_lock:
+                cached = self._image_cache.get(location_id)
+            headers = {}
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+            
+            response = self.session.get(
+                location_info['url'], 
+                timeout=timeout,
+                headers=headers
+            )
+            
+            if response.status_code == 304 and cached:
+                # 圖片未更新，沿用快取的位元組及拍攝時間
+                breaker.record_success(time.monotonic() - started)
+                self._count_conditional('not_modified')
+                cached['checked_at'] = time.monotonic()
+                return self._build_result(location_id, cached['data'], cached['capture_time'],
+                                          cached['content_hash'], return_format, not_modified=True)
+            
+            response.raise_for_status()
+            
+            # 檢查是否為有效圖片
+            image_data = response.content
+            if len(image_data) < 1000:  # 太小可能是錯誤頁面
+                raise ValueError("Image data too small")
+            breaker.record_success(time.monotonic() - started)
+            self._count_conditional('downloaded')
+            
+            content_hash = hashlib.sha1(image_data).hexdigest()
+            if cached and cached['content_hash'] == content_hash:
+                # 伺服器未支援條件請求但內容相同
+                self._count_conditional('unchanged_content')
                 
-                result = {
-                    'location_id': location_id,
-                    'location_name': location_info['name'],
-                    'direction': location_info['direction'],
-                    'latitude': location_info['latitude'],
-                    'longitude': location_info['longitude'],
-                    'region': location_info.get('region', '其他'),  # 添加地區信息
+            # 獲取照片實際更新時間（從HTTP header）
+            capture_time = datetime.now()
+            if 'Last-Modified' in response.headers:
+                try:
+                    from email.utils import parsedate_to_datetime
+                    last_modified = response.headers['Last-Modified']
+                    capture_time = parsedate_to_datetime(last_modified)
+                    # 轉換為本地時區（香港時間）
+                    import pytz
+                    hk_tz = pytz.timezone('Asia/Hong_Kong')
+                    if capture_time.tzinfo is None:
+                        # 如果沒有時區信息，假設是UTC
+                        capture_time = pytz.utc.localize(capture_time)
+                    capture_time = capture_time.astimezone(hk_tz)
+                except Exception as e:
+                    self.logger.warning(f"Failed to parse Last-Modified header: {e}")
+                    capture_time = datetime.now()
+            
+            result = self._build_result(location_id, image_data, capture_time, content_hash, return_format)
+            
+            with self._image_cache_lock:
+                self._image_cache[location_id] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'content_hash': content_hash,
+                    'data': image_data,
                     'capture_time': capture_time,
-                    'image_size': pil_image.size,
-                    'priority': location_info['priority']
+                    'checked_at': time.monotonic()
                 }
                 
-                # 根據要求的格式返回圖片
-                if return_format == 'pil':
-                    result['image'] = pil_image
-                elif return_format == 'base64':
-                    buffer = io.BytesIO()
-                    pil_image.save(buffer, format='JPEG')
-                    result['image'] = base64.b64encode(buffer.getvalue()).decode()
-                elif return_format == 'cv2':
-                    cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-                    result['image'] = cv_image
-                elif return_format == 'bytes':
-                    result['image'] = image_data
-                else:
-                    result['image'] = pil_image
-                    
-                self.logger.info(f"Successfully fetched image from {location_info['name']}")
-                return result
-                
-            except Exception as e:
-                self.logger.warning(f"Attempt {attempt + 1} failed for {location_id}: {str(e)}")
-                if attempt < self.retry_attempts - 1:
-                    time.sleep(2 ** attempt)  # 指數退避
-                    
-        self.logger.error(f"All attempts failed for {location_id}")
-        return None
+            self.logger.info(f"Successfully fetched image from {location_info['name']}")
+            return result
+            
+        except Exception as e:
+            breaker.record_failure()
+            self.logger.warning(f"Fetch failed for {location_id} (timeout {timeout:.1f}s): {str(e)}")
+            return None
         
-    def fetch_multiple_webcams(self, location_ids: List[str] = None, priority_filter: str = None) -> Dict[str, Dict]:
+    def get_breaker_status(self) -> Dict[str, Dict]:
+        """各攝影機的斷路器狀態"""
+        return {location_id: breaker.status() for location_id, breaker in self.breakers.items()}
+        
+    def get_cached_image(self, location_id: str, max_age: float, return_format: str = 'image') -> Optional[Dict]:
+        """
+        返回最近 max_age 秒內已向上游確認的快取圖片（不發出網絡請求）
+        
+        Returns:
+            與 fetch_webcam_image 相同格式的字典，沒有足夠新的快取時返回 None
         """
-        同時獲取多個攝影機的圖片
+        with self._image_cache_lock:
+            cached = self._image_cache.get(location_id)
+        if not cached or time.monotonic() - cached.get('checked_at', 0) > max_age:
+            return None
+        return self._build_result(location_id, cached['data'], cached['capture_time'],
+                                  cached['content_hash'], return_format, not_modified=True)
+        
+    def _build_result(self, location_id: str, image_data: bytes, capture_time, content_hash: str,
+                      return_format: str, not_modified: bool = False) -> Dict:
+        """根據圖片位元組組裝返回結果（PIL 只讀取檔頭，像素在實際使用時才解碼）"""
+        location_info = self.WEBCAM_LOCATIONS[location_id]
+        webcam_image = WebcamImage(image_data, content_hash)
+        
+        result = {
+            'location_id': location_id,
+            'location_name': location_info['name'],
+            'direction': location_info['direction'],
+            'latitude': location_info['latitude'],
+            'longitude': location_info['longitude'],
+            'region': location_info.get('region', '其他'),  # 添加地區信息
+            'capture_time': capture_time,
+            'image_size': webcam_image.size,
+            'priority': location_info['priority'],
+            'content_hash': content_hash,
+            'not_modified': not_modified
+        }
+        
+        # 根據要求的格式返回圖片
+        if return_format == 'image':
+            result['image'] = webcam_image
+        elif return_format == 'base64':
+            result['image'] = webcam_image.base64
+        elif return_format == 'cv2':
+            result['image'] = webcam_image.to_cv2()
+        elif return_format == 'bytes':
+            result['image'] = image_data
+        else:
+            result['image'] = webcam_image.pil
+        return result
+        
+    def fetch_multiple_webcams(self, location_ids: List[str] = None, priority_filter: str = None,
+                               deadline_seconds: float = None, return_format: str = 'pil') -> Dict[str, Dict]:
+        """
+        同時獲取多個攝影機的圖片（有界並行，總時限內返回已完成的部分結果）
         
         Args:
             location_ids: 指定的攝影機ID列表，None表示全部
             priority_filter: 優先級過濾 ('high', 'medium', 'low')
+            deadline_seconds: 總時限（秒），None 使用 fetch_deadline
+            return_format: 圖片返回格式，同 fetch_webcam_image
             
         Returns:
-            攝影機ID到圖片數據的映射
+            攝影機ID到圖片數據的映射（按 location_ids 順序）
         """
         if location_ids is None:
             location_ids = list(self.WEBCAM_LOCATIONS.keys())
@@ -466,14 +906,98 @@ class HKOWebcamFetcher:
                 if self.WEBCAM_LOCATIONS[loc_id]['priority'] == priority_filter
             ]
             
-        results = {}
-        for location_id in location_ids:
-            result = self.fetch_webcam_image(location_id)
-            if result:
-                results[location_id] = result
+        if not location_ids:
+            self.last_batch_stats = {'requested': 0, 'succeeded': 0, 'failed': [], 'timed_out': [],
+                                     'circuit_open': [], 'retries': 0, 'elapsed_seconds': 0.0}
+            return {}
+            
+        started = time.monotonic()
+        deadline = started + (deadline_seconds if deadline_seconds is not None else self.fetch_deadline)
+        
+        fetched, stats = self._run_fetch_schedule(location_ids, return_format, deadline)
+        results = {location_id: fetched[location_id] for location_id in location_ids if location_id in fetched}
+        
+        self.last_batch_stats = dict(
+            stats,
+            requested=len(location_ids),
+            succeeded=len(results),
+            elapsed_seconds=round(time.monotonic() - started, 2)
+        )
+        if stats['timed_out']:
+            self.logger.warning(f"Webcam batch deadline reached, {len(stats['timed_out'])} cameras still pending")
+        if stats['circuit_open']:
+            self.logger.info(f"Skipped {len(stats['circuit_open'])} cameras with open circuit breakers")
                 
         return results
         
+    def get_sun_event(self, current_time: datetime = None, event: str = None) -> Dict:
+        """
+        計算當日日出或日落的時間及方位角
+        
+        Args:
+            current_time: 當前時間，None表示使用系統時間
+            event: 'sunrise' 或 'sunset'，None 時正午前取日出、正午後取日落
+            
+        Returns:
+            {'event', 'time', 'azimuth'}
+        """
+        current_time = current_time or datetime.now(HK_TZ)
+        if current_time.tzinfo is None:
+            current_time = HK_TZ.localize(current_time)
+        sun_times = sun(HK_LOCATION.observer, date=current_time.astimezone(HK_TZ).date(), tzinfo=HK_TZ)
+        if event is None:
+            event = 'sunrise' if current_time < sun_times['noon'] else 'sunset'
+        return {
+            'event': event,
+            'time': sun_times[event],
+            'azimuth': float(sun_azimuth(HK_LOCATION.observer, sun_times[event]))
+        }
+        
+    def select_cameras_for_sun(self, current_time: datetime = None, event: str = None,
+                               control_count: int = 3) -> Dict:
+        """
+        按日出／日落方位角選擇視野覆蓋相關地平線的攝影機，另加少量對照攝影機
+        
+        攝影機朝向與太陽方位角相差不超過 CAMERA_HALF_FOV 即視為覆蓋；
+        方位差相同時，位置較接近太陽方向（前景遮擋較少）的攝影機排前
+        
+        Args:
+            current_time: 當前時間，None表示使用系統時間
+            event: 'sunrise' 或 'sunset'，None 自動判斷
+            control_count: 對照攝影機數量（朝向其他方向的高優先級攝影機，作為整體天空參考）
+            
+        Returns:
+            {'event', 'event_time', 'azimuth', 'selected', 'control'}
+        """
+        sun_event = self.get_sun_event(current_time, event)
+        azimuth_rad = np.radians(sun_event['azimuth'])
+        toward_sun = np.array([np.sin(azimuth_rad), np.cos(azimuth_rad)])
+        
+        candidates = []
+        others = []
+        for location_id, info in self.WEBCAM_LOCATIONS.items():
+            bearing = self.DIRECTION_BEARINGS.get(info['direction'])
+            if bearing is None:
+                continue
+            # 攝影機位置在太陽方向上的投影（經緯度差，只用於排序）
+            offset = np.array([info['longitude'] - HK_LOCATION.longitude, info['latitude'] - HK_LOCATION.latitude])
+            exposure = float(offset @ toward_sun)
+            angle_diff = abs((bearing - sun_event['azimuth'] + 180) % 360 - 180)
+            if angle_diff <= self.CAMERA_HALF_FOV:
+                candidates.append((angle_diff, -exposure, location_id))
+            else:
+                others.append((self.PRIORITY_RANK.get(info['priority'], 3), -exposure, location_id))
+        
+        selected = [location_id for _, _, location_id in sorted(candidates)]
+        control = [location_id for _, _, location_id in sorted(others)[:control_count]]
+        return {
+            'event': sun_event['event'],
+            'event_time': sun_event['time'].isoformat(),
+            'azimuth': round(sun_event['azimuth'], 1),
+            'selected': selected,
+            'control': control
+        }
+        
     def get_best_sunset_webcams(self, current_time: datetime = None) -> List[str]:
         """
         根據當前時間和日照方向，推薦最適合觀測燒天的攝影機
@@ -485,20 +1009,14 @@ class HKOWebcamFetcher:
             推薦的攝影機ID列表（按優先順序排列）
         """
         if current_time is None:
-            current_time = datetime.now()
-            
-        # 根據時間和季節調整推薦
-        hour = current_time.hour
-        month = current_time.month
+            current_time = datetime.now(HK_TZ)
         
-        # 黃昏時段（下午4點-晚上8點）
-        if 16 <= hour <= 20:
-            if month in [12, 1, 2]:  # 冬季，太陽偏南
-                return ['HK_HKO', 'HK_VPA', 'HK_WGL', 'HK_TM2']
-            elif month in [6, 7, 8]:  # 夏季，太陽偏北  
-                return ['HK_HK2', 'HK_VPB', 'HK_TM3', 'HK_SLW']
-            else:  # 春秋季
-                return ['HK_HKO', 'HK_HK2', 'HK_VPA', 'HK_VPB']
+        # 黃昏時段（下午4點-晚上8點）按日落方位角選擇
+        if 16 <= current_time.hour <= 20:
+            try:
+                return self.select_cameras_for_sun(current_time, event='sunset', control_count=0)['selected']
+            except Exception as e:
+                self.logger.warning(f"Sun azimuth camera selection failed: {e}")
         
         # 其他時段使用高優先級攝影機
         return [
@@ -510,24 +1028,99 @@ class HKOWebcamFetcher:
 class WebcamImageAnalyzer:
     """網路攝影機圖片分析器"""
     
-    def __init__(self):
+    def __init__(self, metrics_cache_size: int = 256, decode_scale: int = DEFAULT_DECODE_SCALE,
+                 sky_masks: Dict[str, np.ndarray] = None, frame_diff_threshold: float = FRAME_DIFF_THRESHOLD):
+        """
+        Args:
+            metrics_cache_size: 像素指標快取容量
+            decode_scale: WebcamImage 的解碼縮放比例（1/2/4/8），見 benchmark_webcam_decode.py
+            sky_masks: 攝影機ID → 天空布林遮罩，None 時從 SKY_MASK_PATH 載入
+            frame_diff_threshold: 畫面差異低於此值時沿用上次指標，0 表示停用快速路徑
+        """
+        if decode_scale not in SUPPORTED_DECODE_SCALES:
+            raise ValueError(f"decode_scale 必須為 {SUPPORTED_DECODE_SCALES} 之一")
         self.logger = logging.getLogger(__name__)
+        self.decode_scale = decode_scale
+        # 像素指標快取（以圖片內容雜湊為鍵）；燒天潛力依賴當前時間，每次重新計算
+        self.metrics_cache_size = metrics_cache_size
+        self._metrics_cache = OrderedDict()
+        self._metrics_lock = threading.Lock()
+        self.metrics_cache_hits = 0
+        self.metrics_cache_misses = 0
+        
+        self.sky_masks = load_sky_masks() if sky_masks is None else sky_masks
+        self._resized_masks = {}
         
-    def analyze_sky_conditions(self, image: Image.Image) -> Dict:
+        # 攝影機ID → (灰階簽名, 平均顏色, 像素指標)，記錄上次完整分析的畫面
+        self.frame_diff_threshold = frame_diff_threshold
+        self._frame_signatures = {}
+        self.frame_diff_skips = 0
+        
+    def _get_sky_mask(self, location_id: Optional[str], height: int, width: int) -> Optional[Dict]:
         """
-        分析天空狀況
+        取得縮放到圖片尺寸的天空遮罩，連同其外接矩形（只需處理矩形內的像素）
         
-        Args:
-            image: PIL圖片對象
-            
         Returns:
-            天空分析結果
+            {'mask': 外接矩形內的 uint8 遮罩, 'inner': 侵蝕後的遮罩（排除天際線邊緣）, 'rows': slice, 'cols': slice}，
+            或 None（沒有遮罩）
         """
-        try:
-            # 轉換為numpy數組進行分析
+        if location_id is None or location_id not in self.sky_masks:
+            return None
+        key = (location_id, height, width)
+        cached = self._resized_masks.get(key)
+        if cached is not None:
+            return cached
+        
+        mask = self.sky_masks[location_id]
+        if mask.shape != (height, width):
+            mask = cv2.resize(mask.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST).astype(bool)
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if rows.size == 0:
+            # 遮罩縮放後沒有任何天空像素（遮罩過細或設定錯誤），改為統計整個畫面
+            self.logger.warning(f"Sky mask for {location_id} is empty at {width}x{height}, using the full frame")
+            mask = np.ones((height, width), dtype=bool)
+            rows = np.arange(height)
+            cols = np.arange(width)
+        row_slice = slice(rows[0], rows[-1] + 1)
+        col_slice = slice(cols[0], cols[-1] + 1)
+        cropped = mask[row_slice, col_slice]
+        # OpenCV 的帶遮罩統計函數使用 uint8 遮罩
+        cropped = cropped.astype(np.uint8)
+        inner = cv2.erode(cropped, np.ones((3, 3), np.uint8))
+        
+        cached = {'mask': cropped, 'inner': inner if inner.any() else cropped, 'rows': row_slice, 'cols': col_slice}
+        self._resized_masks[key] = cached
+        return cached
+        
+    def compute_pixel_metrics(self, image, location_id: Optional[str] = None) -> Dict:
+        """
+        計算只取決於圖片內容的像素指標（平均顏色、雲覆蓋度、能見度）
+        
+        有該攝影機的天空遮罩時只統計遮罩內像素，否則以圖片上半部作為天空
+        """
+        # 轉換為numpy數組進行分析（WebcamImage 按 decode_scale 以低解析度直接解碼）
+        if isinstance(image, WebcamImage):
+            img_array = image.array_at(self.decode_scale)
+        elif isinstance(image, np.ndarray):
+            img_array = image
+        else:
             img_array = np.array(image.convert('RGB'))
-            height, width = img_array.shape[:2]
-            
+        height, width = img_array.shape[:2]
+        
+        sky_mask = self._get_sky_mask(location_id, height, width)
+        if sky_mask is not None:
+            # 只處理遮罩外接矩形，再以帶遮罩的統計函數計算（不複製遮罩內像素）
+            sky_region = img_array[sky_mask['rows'], sky_mask['cols']]
+            mask = sky_mask['mask']
+            mean_rgb = np.array(cv2.mean(sky_region, mask=mask)[:3])
+            gray_sky = cv2.cvtColor(sky_region, cv2.COLOR_RGB2GRAY)
+            cloud_variance = cv2.meanStdDev(gray_sky, mask=mask)[1][0, 0]
+            # Laplacian 在天際線邊緣反應強烈，只取侵蝕後的內部像素
+            laplacian = cv2.Laplacian(gray_sky, cv2.CV_64F)
+            visibility = min(100, max(0, cv2.meanStdDev(laplacian, mask=sky_mask['inner'])[1][0, 0] ** 2 / 10))
+            sky_region_type = 'mask'
+        else:
             # 分析天空區域（通常是圖片上半部）
             sky_region = img_array[:height//2, :]
             
@@ -538,11 +1131,164 @@ class WebcamImageAnalyzer:
             gray_sky = cv2.cvtColor(sky_region, cv2.COLOR_RGB2GRAY)
             cloud_variance = np.std(gray_sky)
             
-            # 估算雲覆蓋度（0-100%）
-            cloud_coverage = min(100, max(0, (cloud_variance - 10) * 2))
-            
             # 能見度估算（基於對比度）
             visibility = self._estimate_visibility(gray_sky)
+            sky_region_type = 'top_half'
+        
+        # 估算雲覆蓋度（0-100%）
+        cloud_coverage = min(100, max(0, (cloud_variance - 10) * 2))
+        
+        return {
+            'mean_rgb': mean_rgb,
+            'cloud_coverage': float(cloud_coverage),
+            'visibility': float(visibility),
+            'sky_region': sky_region_type
+        }
+        
+    def _frame_signature(self, image) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        計算畫面簽名：32×18 灰階縮圖及平均顏色
+        
+        WebcamImage 以 1/8 解析度解碼（遠比完整分析便宜）；
+        平均顏色用於捕捉亮度不變但色調轉紅的燒天變化
+        """
+        if isinstance(image, WebcamImage):
+            small = image.array_at(8)
+        elif isinstance(image, np.ndarray):
+            small = image
+        else:
+            small = np.asarray(image.convert('RGB'))
+        thumbnail = cv2.resize(small, FRAME_SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(thumbnail, cv2.COLOR_RGB2GRAY).astype(np.float32)
+        return gray, thumbnail.reshape(-1, 3).mean(axis=0)
+        
+    def _match_previous_frame(self, image, location_id: Optional[str]):
+        """
+        與該攝影機上次完整分析的畫面比較
+        
+        比較對象固定為上次完整分析的畫面（而非上一張），緩慢累積的變化最終仍會觸發重新分析
+        
+        Returns:
+            (沿用的像素指標或 None, 新畫面簽名或 None)
+        """
+        if not location_id or not self.frame_diff_threshold:
+            return None, None
+        try:
+            signature = self._frame_signature(image)
+        except Exception as e:
+            self.logger.warning(f"Frame signature failed for {location_id}: {e}")
+            return None, None
+        
+        with self._metrics_lock:
+            previous = self._frame_signatures.get(location_id)
+        if previous is None:
+            return None, signature
+        previous_gray, previous_color, previous_metrics = previous
+        gray, color = signature
+        if (float(np.mean(np.abs(gray - previous_gray))) < self.frame_diff_threshold
+                and float(np.max(np.abs(color - previous_color))) < self.frame_diff_threshold):
+            self.frame_diff_skips += 1
+            return dict(previous_metrics, reused=True), signature
+        return None, signature
+        
+    def _remember_frame(self, location_id: Optional[str], signature, metrics: Dict):
+        if location_id and signature is not None:
+            with self._metrics_lock:
+                self._frame_signatures[location_id] = (signature[0], signature[1], metrics)
+        
+    def _get_pixel_metrics(self, image, content_hash: Optional[str], location_id: Optional[str] = None) -> Dict:
+        """讀取像素指標快取，未命中時計算並寫入"""
+        if content_hash is None:
+            return self.compute_pixel_metrics(image, location_id)
+        
+        cache_key = (content_hash, location_id)
+        with self._metrics_lock:
+            metrics = self._metrics_cache.get(cache_key)
+            if metrics is not None:
+                self._metrics_cache.move_to_end(cache_key)
+                self.metrics_cache_hits += 1
+                return metrics
+            self.metrics_cache_misses += 1
+        
+        metrics, signature = self._match_previous_frame(image, location_id)
+        if metrics is None:
+            metrics = self.compute_pixel_metrics(image, location_id)
+            self._remember_frame(location_id, signature, metrics)
+        with self._metrics_lock:
+            self._metrics_cache[cache_key] = metrics
+            while len(self._metrics_cache) > self.metrics_cache_size:
+                self._metrics_cache.popitem(last=False)
+        return metrics
+        
+    def precompute_metrics(self, images: List[Tuple[str, 'WebcamImage']], analysis_pool=None) -> int:
+        """
+        批量計算多部攝影機的像素指標並寫入快取，之後的 analyze_sky_conditions 直接命中
+        
+        Args:
+            images: [(攝影機ID, WebcamImage), ...]
+            analysis_pool: 可選的並行分析後端（見 webcam_analysis_pool.WebcamAnalysisPool）
+            
+        Returns:
+            實際計算（快取未命中）的圖片數
+        """
+        with self._metrics_lock:
+            pending = [
+                (location_id, image) for location_id, image in images
+                if (image.content_hash, location_id) not in self._metrics_cache
+            ]
+        if not pending:
+            return 0
+        
+        # 畫面與上次完整分析相比沒有明顯變化的攝影機直接沿用指標，不送往分析後端
+        results = {}
+        signatures = {}
+        changed = []
+        for location_id, image in pending:
+            key = (image.content_hash, location_id)
+            metrics, signatures[key] = self._match_previous_frame(image, location_id)
+            if metrics is not None:
+                results[key] = metrics
+            else:
+                changed.append((location_id, image))
+        
+        frames = [((image.content_hash, location_id), location_id, image.array_at(self.decode_scale))
+                  for location_id, image in changed]
+        if frames:
+            if analysis_pool is not None:
+                computed = analysis_pool.compute_metrics(frames)
+            else:
+                computed = {key: self.compute_pixel_metrics(frame, location_id) for key, location_id, frame in frames}
+            for key, metrics in computed.items():
+                self._remember_frame(key[1], signatures.get(key), metrics)
+            results.update(computed)
+        
+        with self._metrics_lock:
+            for key, metrics in results.items():
+                self._metrics_cache[key] = metrics
+            while len(self._metrics_cache) > self.metrics_cache_size:
+                self._metrics_cache.popitem(last=False)
+        return len(pending)
+        
+    def analyze_sky_conditions(self, image, content_hash: Optional[str] = None,
+                               location_id: Optional[str] = None) -> Dict:
+        """
+        分析天空狀況
+        
+        Args:
+            image: PIL圖片對象或 WebcamImage
+            content_hash: 圖片內容雜湊；提供時重用相同圖片的像素指標，不再解碼及計算
+            location_id: 攝影機ID，用於套用該攝影機的天空遮罩
+            
+        Returns:
+            天空分析結果
+        """
+        try:
+            if isinstance(image, WebcamImage) and content_hash is None:
+                content_hash = image.content_hash
+            metrics = self._get_pixel_metrics(image, content_hash, location_id)
+            mean_rgb = metrics['mean_rgb']
+            cloud_coverage = metrics['cloud_coverage']
+            visibility = metrics['visibility']
             
             # 燒天潛力評估
             sunset_potential = self._evaluate_sunset_potential(mean_rgb, cloud_coverage, visibility)
@@ -556,6 +1302,8 @@ class WebcamImageAnalyzer:
                 'cloud_coverage': float(cloud_coverage),
                 'visibility': float(visibility),
                 'brightness': float((mean_rgb[0] + mean_rgb[1] + mean_rgb[2]) / 3),
+                'sky_region': metrics['sky_region'],
+                'metrics_reused': metrics.get('reused', False),
                 'sunset_potential': sunset_potential,
                 'analysis_time': datetime.now().isoformat()
             }
@@ -750,9 +1498,16 @@ class WebcamImageAnalyzer:
 class RealTimeWebcamMonitor:
     """即時攝影機監控系統"""
     
-    def __init__(self):
+    def __init__(self, analysis_pool=None, metrics_store=None):
+        """
+        Args:
+            analysis_pool: 可選的並行分析後端，None 時在本執行緒逐張分析
+            metrics_store: 可選的指標時間序列存儲，每次詳細分析後追加記錄
+        """
         self.fetcher = HKOWebcamFetcher()
         self.analyzer = WebcamImageAnalyzer()
+        self.analysis_pool = analysis_pool
+        self.metrics_store = metrics_store
         self.logger = logging.getLogger(__name__)
         
     def get_current_conditions(self, detailed: bool = True, all_cameras: bool = True) -> Dict:
@@ -761,20 +1516,25 @@ class RealTimeWebcamMonitor:
         
         Args:
             detailed: 是否進行詳細分析
-            all_cameras: 是否獲取所有32個攝影機（默認True）
+            all_cameras: 是否獲取所有32個攝影機；False 時只獲取視野覆蓋日出／日落方向的攝影機及對照組
             
         Returns:
             當前狀況報告
         """
+        camera_selection = None
         if all_cameras:
             # 獲取所有32個攝影機
             location_ids = list(self.fetcher.WEBCAM_LOCATIONS.keys())
         else:
-            # 只獲取推薦的攝影機
-            location_ids = self.fetcher.get_best_sunset_webcams()[:3]
+            try:
+                camera_selection = self.fetcher.select_cameras_for_sun()
+                location_ids = camera_selection['selected'] + camera_selection['control']
+            except Exception as e:
+                self.logger.warning(f"Sun azimuth camera selection failed, using recommended cameras: {e}")
+                location_ids = self.fetcher.get_best_sunset_webcams()[:3]
         
         # 獲取圖片
-        webcam_data = self.fetcher.fetch_multiple_webcams(location_ids)
+        webcam_data = self.fetcher.fetch_multiple_webcams(location_ids, return_format='image')
         
         if not webcam_data:
             return {
@@ -787,14 +1547,26 @@ class RealTimeWebcamMonitor:
         analysis_results = {}
         overall_scores = []
         
+        if detailed:
+            # 一次過計算所有新圖片的像素指標（有並行後端時分派到工作進程）
+            try:
+                self.analyzer.precompute_metrics(
+                    [(cam_id, cam_data['image']) for cam_id, cam_data in webcam_data.items()
+                     if isinstance(cam_data.get('image'), WebcamImage)],
+                    self.analysis_pool
+                )
+            except Exception as e:
+                self.logger.warning(f"Batch metrics computation failed, analyzing individually: {e}")
+        
         for cam_id, cam_data in webcam_data.items():
             if detailed and 'image' in cam_data:
-                analysis = self.analyzer.analyze_sky_conditions(cam_data['image'])
+                analysis = self.analyzer.analyze_sky_conditions(cam_data['image'], cam_data.get('content_hash'), cam_id)
                 analysis_results[cam_id] = {
                     'location': cam_data['location_name'],
                     'direction': cam_data['direction'],
                     'region': cam_data.get('region', '其他'),  # 添加地區信息
                     'capture_time': cam_data.get('capture_time', datetime.now()).isoformat(),
+                    'content_hash': cam_data.get('content_hash'),
                     'analysis': analysis
                 }
                 
@@ -804,16 +1576,166 @@ class RealTimeWebcamMonitor:
         # 計算整體評分
         overall_score = np.mean(overall_scores) if overall_scores else 0
         
-        return {
+        result = {
             'status': 'success',
             'overall_sunset_potential': float(overall_score),
             'webcam_count': len(webcam_data),
             'total_cameras': len(self.fetcher.WEBCAM_LOCATIONS),
+            'fetch_stats': dict(self.fetcher.last_batch_stats,
+                                conditional=self.fetcher.get_conditional_stats(),
+                                metrics_cache_hits=self.analyzer.metrics_cache_hits,
+                                frame_diff_skips=self.analyzer.frame_diff_skips),
             'individual_analyses': analysis_results,
+            'camera_selection': camera_selection,
             'timestamp': datetime.now().isoformat(),
             'analysis_time': datetime.now().isoformat(),
             'recommended_locations': self.fetcher.get_best_sunset_webcams()[:5]
         }
+        
+        if self.metrics_store is not None and analysis_results:
+            try:
+                self.metrics_store.record_conditions(result)
+            except Exception as e:
+                self.logger.warning(f"Failed to record webcam metrics: {e}")
+        
+        return result
+
+
+class BackgroundWebcamMonitor(RealTimeWebcamMonitor):
+    """
+    背景攝影機監控：按日出日落時間自適應輪詢，最新分析結果存於快照，
+    API 端點直接讀取快照而不需即時下載及分析
+    """
+    
+    HK_LOCATION = HK_LOCATION
+    HK_TZ = HK_TZ
+    
+    def __init__(self, dense_interval: int = 120, normal_interval: int = 600,
+                 night_interval: int = 1800, window_minutes: int = 90, analysis_pool=None,
+                 metrics_store=None, all_cameras: bool = True):
+        """
+        Args:
+            dense_interval: 日出日落前後時段的輪詢間隔（秒）
+            normal_interval: 白天其他時段的輪詢間隔（秒）
+            night_interval: 夜間輪詢間隔（秒）
+            window_minutes: 日出日落前後視為密集時段的分鐘數
+            analysis_pool: 可選的並行分析後端
+            metrics_store: 可選的指標時間序列存儲
+            all_cameras: 每次輪詢獲取全部攝影機；False 時只獲取覆蓋日出／日落方向的攝影機及對照組
+        """
+        super().__init__(analysis_pool, metrics_store)
+        self.all_cameras = all_cameras
+        self.dense_interval = dense_interval
+        self.normal_interval = normal_interval
+        self.night_interval = night_interval
+        self.window = timedelta(minutes=window_minutes)
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.refresh_count = 0
+        self.last_error = None
+        
+    def _sun_times(self, now: datetime) -> Dict:
+        """計算當日香港日出日落時間"""
+        return sun(self.HK_LOCATION.observer, date=now.date(), tzinfo=self.HK_TZ)
+        
+    def next_interval(self, now: datetime = None) -> Tuple[int, str]:
+        """
+        根據當前時間決定下一次輪詢間隔
+        
+        Returns:
+            (間隔秒數, 時段名稱 'dense' / 'normal' / 'night')
+        """
+        now = now or datetime.now(self.HK_TZ)
+        try:
+            sun_times = self._sun_times(now)
+        except Exception as e:
+            self.logger.warning(f"Sun time calculation failed: {e}")
+            return self.normal_interval, 'normal'
+        
+        for event in ('sunrise', 'sunset'):
+            if abs(now - sun_times[event]) <= self.window:
+                return self.dense_interval, 'dense'
+        if sun_times['sunrise'] + self.window < now < sun_times['sunset'] - self.window:
+            return self.normal_interval, 'normal'
+        return self.night_interval, 'night'
+        
+    def refresh(self) -> bool:
+        """執行一次完整輪詢，成功時以新快照替換舊快照"""
+        try:
+            conditions = self.get_current_conditions(detailed=True, all_cameras=self.all_cameras)
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Background webcam refresh failed: {e}")
+            return False
+        
+        if conditions.get('status') != 'success':
+            self.last_error = conditions.get('message')
+            return False
+        
+        # 組裝完整的新快照後一次性替換引用，讀取端不會看到半更新的狀態
+        self._snapshot = dict(conditions, snapshot_time=datetime.now().isoformat(),
+                              snapshot_monotonic=time.monotonic())
+        self.refresh_count += 1
+        self.last_error = None
+        return True
+        
+    def get_snapshot(self, max_age: float = None) -> Optional[Dict]:
+        """
+        讀取最新快照（不進行任何網絡請求）
+        
+        Args:
+            max_age: 快照最長有效秒數，None 表示目前時段輪詢間隔的兩倍
+            
+        Returns:
+            快照字典，沒有可用快照或已過期時返回 None
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        max_age = max_age if max_age is not None else self.next_interval()[0] * 2
+        if time.monotonic() - snapshot['snapshot_monotonic'] > max_age:
+            return None
+        return snapshot
+        
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            refreshed_at = time.monotonic()
+            interval, period = self.next_interval()
+            self.logger.info(f"Next webcam refresh in {interval}s ({period})")
+            # 每個密集間隔重新計算時段：由夜間進入日出日落時段時提早輪詢，快照不會超過新時段的有效期
+            while True:
+                remaining = refreshed_at + self.next_interval()[0] - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self._stop_event.wait(min(remaining, self.dense_interval)):
+                    return
+        
+    def start(self):
+        """啟動背景輪詢執行緒（重複呼叫無副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='webcam-monitor', daemon=True)
+        self._thread.start()
+        
+    def stop(self):
+        """停止背景輪詢"""
+        self._stop_event.set()
+        
+    def status(self) -> Dict:
+        """背景監控狀態"""
+        snapshot = self._snapshot
+        interval, period = self.next_interval()
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'refresh_count': self.refresh_count,
+            'snapshot_time': snapshot['snapshot_time'] if snapshot else None,
+            'current_period': period,
+            'current_interval_seconds': interval,
+            'last_error': self.last_error
+        }
 
 
 # 測試函數
@@ -0,0 +1,102 @@
+"""
+機器學習推論快取模組
+以量化後的特徵向量及模型版本為鍵的有界 LRU 快取，
+避免相同（或極相近）的天氣特徵重複經過 Random Forest 推論
+"""
+
+import threading
+from collections import OrderedDict
+
+# 各特徵的量化步長（HKO 數據本身精度有限，步長內的差異對模型輸出影響極微）
+QUANTIZATION_STEPS = {
+    'temperature': 0.5,
+    'humidity': 1,
+    'uv_index': 0.5,
+    'rainfall': 0.5,
+    'wind_speed': 0.5,
+    'time_factor': 0.02,
+    'cloud_score': 1
+}
+
+
+def quantize_features(features):
+    """將特徵字典量化，返回與輸入相同鍵順序的新字典"""
+    quantized = {}
+    for name, value in features.items():
+        step = QUANTIZATION_STEPS.get(name)
+        if step is None:
+            quantized[name] = value
+        else:
+            quantized[name] = round(round(float(value) / step) * step, 4)
+    return quantized
+
+
+class MLPredictionCache:
+    """有界 LRU 推論快取（執行緒安全）"""
+
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def make_key(self, quantized_features, model_version):
+        """建立快取鍵：量化特徵元組 + 模型版本"""
+        return (model_version,) + tuple(quantized_features.values())
+
+    def get(self, key):
+        """讀取快取，命中時移到最近使用位置"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """寫入快取，超出容量時淘汰最久未使用的項目"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, model_version):
+        """登記目前模型版本；版本改變（模型被替換）時自動清空快取"""
+        with self._lock:
+            if self.model_version is not None and model_version != self.model_version:
+                self._entries.clear()
+                self.invalidations += 1
+                print(f"🔄 ML推論快取已失效: 模型版本 {self.model_version} → {model_version}")
+            self.model_version = model_version
+
+    def clear(self):
+        """手動清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """快取命中率統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'model_version': self.model_version
+            }
+
+
+# 全域共用實例（多個 AdvancedBurnskyPredictor 實例共享同一快取）
+ml_prediction_cache = MLPredictionCache()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+燒天ML模型蒸餾模組
+將 models/regression_model.pkl（Random Forest，約3.2MB）蒸餾為淺層 GBDT 代理模型，
+並以緊湊的 numpy 陣列格式儲存（.npz），供統一計分器、排程及批量端點快速評分
+
+用法:
+    python model_distiller.py                 # 使用預設網格蒸餾並輸出保真度報告
+    python model_distiller.py --points 7      # 每個特徵7個網格點
+
+保真度未達 SURROGATE_MAX_ABS_ERROR / SURROGATE_MAX_MAE 門檻時不保存代理模型（以非零狀態結束）
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+import warnings
+warnings.filterwarnings('ignore')
+
+from advanced_predictor import AdvancedBurnskyPredictor, compute_model_version
+
+FEATURE_NAMES = AdvancedBurnskyPredictor.FEATURE_NAMES
+
+# 各特徵的取值範圍（涵蓋 extract_features 的實際輸出及訓練數據分佈）
+FEATURE_RANGES = {
+    'temperature': (10.0, 40.0),
+    'humidity': (20.0, 100.0),
+    'uv_index': (0.0, 15.0),
+    'rainfall': (0.0, 30.0),
+    'wind_speed': (0.0, 12.0),
+    'time_factor': (0.0, 1.0),
+    'cloud_score': (0.0, 30.0)
+}
+
+DEFAULT_SURROGATE_PATH = 'models/surrogate_model.npz'
+
+# 代理模型驗收門檻（各保真度評估集的最大絕對誤差及平均絕對誤差，單位為分數點）：
+# 未達標的代理模型不會保存，統一計分器亦拒絕載入並使用完整模型
+SURROGATE_MAX_ABS_ERROR = float(os.getenv('ML_SURROGATE_MAX_ABS_ERROR', '10'))
+SURROGATE_MAX_MAE = float(os.getenv('ML_SURROGATE_MAX_MAE', '2'))
+
+
+class CompactTreeEnsemble:
+    """緊湊樹集成模型 - 以固定形狀陣列儲存所有樹，向量化批量評估"""
+
+    def __init__(self, feature, threshold, left, right, value, base_score, depth, metadata=None):
+        self.feature = feature          # (n_trees, n_nodes) int8
+        self.threshold = threshold      # (n_trees, n_nodes) float32，葉節點為 +inf
+        self.left = left                # (n_trees, n_nodes) int16，葉節點指向自己
+        self.right = right              # (n_trees, n_nodes) int16，葉節點指向自己
+        self.value = value              # (n_trees, n_nodes) float32，已乘以學習率
+        self.base_score = float(base_score)
+        self.depth = int(depth)
+        self.metadata = metadata or {}
+        self._tree_index = np.arange(self.feature.shape[0])
+
+    @classmethod
+    def from_sklearn(cls, model, metadata=None):
+        """從 GradientBoostingRegressor 匯出"""
+        trees = [est[0].tree_ for est in model.estimators_]
+        n_trees = len(trees)
+        n_nodes = max(tree.node_count for tree in trees)
+
+        feature = np.zeros((n_trees, n_nodes), dtype=np.int8)
+        threshold = np.full((n_trees, n_nodes), np.inf, dtype=np.float32)
+        left = np.tile(np.arange(n_nodes, dtype=np.int16), (n_trees, 1))
+        right = left.copy()
+        value = np.zeros((n_trees, n_nodes), dtype=np.float32)
+
+        for i, tree in enumerate(trees):
+            count = tree.node_count
+            is_split = tree.children_left[:count] >= 0
+            feature[i, :count][is_split] = tree.feature[:count][is_split]
+            threshold[i, :count][is_split] = tree.threshold[:count][is_split]
+            left[i, :count][is_split] = tree.children_left[:count][is_split]
+            right[i, :count][is_split] = tree.children_right[:count][is_split]
+            value[i, :count] = tree.value[:count, 0, 0] * model.learning_rate
+
+        base_score = float(np.ravel(model.init_.constant_)[0])
+        return cls(feature, threshold, left, right, value, base_score, model.max_depth, metadata)
+
+    def predict(self, X):
+        """批量預測（X 為原始未標準化特徵，形狀 (n, 7)）"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.zeros((X.shape[0], self.feature.shape[0]), dtype=np.int16)
+        for _ in range(self.depth):
+            split_feature = self.feature[self._tree_index, node]
+            go_left = X[rows, split_feature] <= self.threshold[self._tree_index, node]
+            node = np.where(go_left,
+                            self.left[self._tree_index, node],
+                            self.right[self._tree_index, node])
+
+        return self.base_score + self.value[self._tree_index, node].sum(axis=1)
+
+    def predict_score(self, features):
+        """單筆評分，輸入 extract_features 的字典，輸出與 predict_ml 相同的0-100整數分數"""
+        row = [features.get(name, 0) for name in FEATURE_NAMES]
+        return round(max(0, min(100, float(self.predict(row)[0]))))
+
+    def save(self, path=DEFAULT_SURROGATE_PATH):
+        """以壓縮 npz 格式保存（不使用 pickle）"""
+        np.savez_compressed(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            base_score=np.float64(self.base_score),
+            depth=np.int64(self.depth),
+            metadata=np.array(json.dumps(self.metadata, ensure_ascii=False))
+        )
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_SURROGATE_PATH):
+        """載入已保存的代理模型"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                value=data['value'],
+                base_score=float(data['base_score']),
+                depth=int(data['depth']),
+                metadata=json.loads(str(data['metadata']))
+            )
+
+
+def load_surrogate(path=DEFAULT_SURROGATE_PATH):
+    """載入代理模型，檔案不存在或損壞時返回 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return CompactTreeEnsemble.load(path)
+    except Exception as e:
+        print(f"⚠️ 載入代理模型失敗: {e}")
+        return None
+
+
+def check_fidelity(metadata, max_abs_error=SURROGATE_MAX_ABS_ERROR, max_mae=SURROGATE_MAX_MAE):
+    """
+    檢查代理模型的保真度報告是否達到驗收門檻
+
+    Args:
+        metadata: 代理模型的 metadata（distill 返回的報告）
+
+    Returns:
+        list: 未達標項目的說明，空列表表示通過（沒有保真度報告視為未達標）
+    """
+    fidelity = metadata.get('fidelity') or {}
+    if not fidelity:
+        return ['缺少保真度報告']
+    failures = []
+    for name, metrics in fidelity.items():
+        if metrics['max_abs_error'] > max_abs_error:
+            failures.append(f"{name} 最大誤差 {metrics['max_abs_error']} > {max_abs_error}")
+        if metrics['mae'] > max_mae:
+            failures.append(f"{name} MAE {metrics['mae']} > {max_mae}")
+    return failures
+
+
+class ModelDistiller:
+    """模型蒸餾器 - 在特徵空間的密集網格上擬合教師模型輸出"""
+
+    def __init__(self, regression_model_path='models/regression_model.pkl', scaler_path='models/scaler.pkl'):
+        with open(regression_model_path, 'rb') as f:
+            self.teacher = pickle.load(f)
+        with open(scaler_path, 'rb') as f:
+            self.scaler = pickle.load(f)
+        # 教師模型版本（與 AdvancedBurnskyPredictor.model_version 相同算法），載入代理模型時據此檢查是否過時
+        self.teacher_version = compute_model_version(os.path.dirname(regression_model_path) or '.')
+
+    def teacher_predict(self, X):
+        """教師模型預測（與 predict_ml 相同的標準化及0-100截斷）"""
+        return np.clip(self.teacher.predict(self.scaler.transform(X)), 0, 100)
+
+    @staticmethod
+    def build_grid(points_per_feature=6):
+        """建立覆蓋所有特徵範圍的笛卡兒網格"""
+        axes = [np.linspace(*FEATURE_RANGES[name], points_per_feature) for name in FEATURE_NAMES]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        return np.stack([m.ravel() for m in mesh], axis=1)
+
+    @staticmethod
+    def sample_uniform(n_samples, rng):
+        """在特徵範圍內均勻抽樣"""
+        low = np.array([FEATURE_RANGES[name][0] for name in FEATURE_NAMES])
+        high = np.array([FEATURE_RANGES[name][1] for name in FEATURE_NAMES])
+        return rng.uniform(low, high, size=(n_samples, len(FEATURE_NAMES)))
+
+    def sample_realistic(self, n_samples, rng):
+        """按教師模型訓練時的特徵分佈（scaler 的均值及標準差）抽樣，加密常見輸入區域"""
+        low = np.array([FEATURE_RANGES[name][0] for name in FEATURE_NAMES])
+        high = np.array([FEATURE_RANGES[name][1] for name in FEATURE_NAMES])
+        samples = rng.normal(self.scaler.mean_, self.scaler.scale_, size=(n_samples, len(FEATURE_NAMES)))
+        return np.clip(samples, low, high)
+
+    @staticmethod
+    def sample_training_distribution(n_samples):
+        """直接使用合成訓練數據生成器抽樣（評估保真度用）"""
+        df = AdvancedBurnskyPredictor().generate_training_data(n_samples)
+        return df[FEATURE_NAMES].to_numpy(dtype=float)
+
+    def fidelity_metrics(self, surrogate, X):
+        """計算代理模型相對教師模型的保真度指標"""
+        teacher = self.teacher_predict(X)
+        student = np.clip(surrogate.predict(X), 0, 100)
+        error = student - teacher
+        abs_error = np.abs(error)
+        ss_res = float(np.sum(error ** 2))
+        ss_tot = float(np.sum((teacher - teacher.mean()) ** 2))
+        return {
+            'samples': int(len(X)),
+            'mae': round(float(abs_error.mean()), 3),
+            'rmse': round(float(np.sqrt(np.mean(error ** 2))), 3),
+            'max_abs_error': round(float(abs_error.max()), 3),
+            'r2': round(1 - ss_res / ss_tot, 4) if ss_tot > 0 else 1.0,
+            'within_2_points': round(float(np.mean(abs_error <= 2)), 4),
+            'rounded_score_agreement': round(float(np.mean(np.round(student) == np.round(teacher))), 4)
+        }
+
+    def benchmark_latency(self, surrogate, repeats=200):
+        """比較單筆評估延遲（毫秒）"""
+        row = self.sample_uniform(1, np.random.default_rng(0))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            self.teacher_predict(row)
+        teacher_ms = (time.perf_counter() - start) / repeats * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            surrogate.predict(row)
+        surrogate_ms = (time.perf_counter() - start) / repeats * 1000
+
+        return {'teacher_ms': round(teacher_ms, 3), 'surrogate_ms': round(surrogate_ms, 3)}
+
+    def distill(self, points_per_feature=6, random_samples=50000, realistic_samples=30000,
+                n_estimators=150, max_depth=4, learning_rate=0.1, seed=42):
+        """
+        執行蒸餾
+
+        Args:
+            points_per_feature: 每個特徵的網格點數（總點數為其7次方）
+            random_samples: 額外均勻隨機樣本數（填補網格點之間的區域）
+            realistic_samples: 按教師模型訓練分佈抽取的樣本數
+            n_estimators: 代理模型樹數量
+            max_depth: 代理模型樹深度
+            learning_rate: 學習率
+            seed: 隨機種子
+
+        Returns:
+            (CompactTreeEnsemble, 保真度報告)，report['acceptance']['failures'] 為未達驗收門檻的項目
+        """
+        rng = np.random.default_rng(seed)
+        X_train = np.vstack([
+            self.build_grid(points_per_feature),
+            self.sample_uniform(random_samples, rng),
+            self.sample_realistic(realistic_samples, rng)
+        ])
+        y_train = self.teacher_predict(X_train)
+
+        print(f"🧪 正在蒸餾代理模型: {len(X_train)} 個樣本, {n_estimators} 棵深度 {max_depth} 的樹...")
+        model = GradientBoostingRegressor(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            learning_rate=learning_rate,
+            random_state=seed
+        )
+        model.fit(X_train, y_train)
+
+        surrogate = CompactTreeEnsemble.from_sklearn(model)
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'teacher_version': self.teacher_version,
+            'feature_names': FEATURE_NAMES,
+            'feature_ranges': FEATURE_RANGES,
+            'training_samples': int(len(X_train)),
+            'params': {
+                'n_estimators': n_estimators,
+                'max_depth': max_depth,
+                'learning_rate': learning_rate,
+                'points_per_feature': points_per_feature
+            },
+            'fidelity': {
+                'uniform_holdout': self.fidelity_metrics(surrogate, self.sample_uniform(20000, rng)),
+                'training_distribution': self.fidelity_metrics(surrogate, self.sample_training_distribution(5000))
+            },
+            'latency': self.benchmark_latency(surrogate)
+        }
+        report['acceptance'] = {
+            'max_abs_error': SURROGATE_MAX_ABS_ERROR,
+            'max_mae': SURROGATE_MAX_MAE,
+            'failures': check_fidelity(report)
+        }
+        surrogate.metadata = report
+        return surrogate, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='蒸餾燒天ML模型為輕量代理模型')
+    parser.add_argument('--points', type=int, default=6, help='每個特徵的網格點數')
+    parser.add_argument('--random-samples', type=int, default=50000, help='額外均勻隨機樣本數')
+    parser.add_argument('--realistic-samples', type=int, default=30000, help='按訓練分佈抽取的樣本數')
+    parser.add_argument('--trees', type=int, default=150, help='代理模型樹數量')
+    parser.add_argument('--depth', type=int, default=4, help='代理模型樹深度')
+    parser.add_argument('--output', default=DEFAULT_SURROGATE_PATH, help='輸出路徑')
+    args = parser.parse_args()
+
+    distiller = ModelDistiller()
+    surrogate, report = distiller.distill(
+        points_per_feature=args.points,
+        random_samples=args.random_samples,
+        realistic_samples=args.realistic_samples,
+        n_estimators=args.trees,
+        max_depth=args.depth
+    )
+
+    print(json.dumps(report['fidelity'], indent=2, ensure_ascii=False))
+    print(f"⏱️ 單筆評估: 教師 {report['latency']['teacher_ms']}ms, 代理 {report['latency']['surrogate_ms']}ms")
+    failures = report['acceptance']['failures']
+    if failures:
+        print(f"❌ 代理模型保真度未達驗收門檻，不保存: {'；'.join(failures)}")
+        raise SystemExit(1)
+    surrogate.save(args.output)
+    print(f"💾 代理模型已保存: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
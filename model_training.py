@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+燒天ML模型訓練工具
+提供重新訓練及並行超參數搜索，搜索勝出的模型直接寫入 models/ 供
+AdvancedBurnskyPredictor.load_models 載入
+
+用法:
+    python model_training.py train --samples 5000
+    python model_training.py search --samples 20000 --folds 5
+    python model_training.py search --no-promote          # 只輸出排行榜，不替換模型
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.ensemble import (
+    ExtraTreesRegressor, GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+import warnings
+warnings.filterwarnings('ignore')
+
+from advanced_predictor import AdvancedBurnskyPredictor
+
+SEARCH_CACHE_DIR = os.path.join('models', 'search_cache')
+LEADERBOARD_PATH = os.path.join('models', 'search_leaderboard.json')
+
+# 搜索空間：任務 → 估計器名稱 → (估計器類別, 參數網格)
+SEARCH_SPACE = {
+    'regression': {
+        'random_forest': (RandomForestRegressor, {
+            'n_estimators': [100, 200],
+            'max_depth': [6, 10, 14, None],
+            'min_samples_leaf': [1, 5]
+        }),
+        'extra_trees': (ExtraTreesRegressor, {
+            'n_estimators': [100, 200],
+            'max_depth': [10, None],
+            'min_samples_leaf': [1, 5]
+        }),
+        'gradient_boosting': (GradientBoostingRegressor, {
+            'n_estimators': [100, 200],
+            'max_depth': [3, 4],
+            'learning_rate': [0.05, 0.1]
+        })
+    },
+    'classification': {
+        'logistic_regression': (LogisticRegression, {
+            'C': [0.01, 0.1, 1.0, 10.0],
+            'max_iter': [1000]
+        }),
+        'random_forest': (RandomForestClassifier, {
+            'n_estimators': [100, 200],
+            'max_depth': [6, 10, None]
+        })
+    }
+}
+
+# 工作進程內的共享數據（由 _init_worker 以 mmap 方式載入，避免逐任務序列化大陣列）
+_WORKER_DATA = {}
+
+
+def prepare_fold_cache(num_samples, n_folds, seed, cache_dir=SEARCH_CACHE_DIR):
+    """
+    生成訓練數據並預先計算每個折的標準化矩陣，保存為 .npy 檔案
+
+    相同 (樣本數, 折數, 種子) 的快取會被重用，重複搜索無需重新生成及標準化
+
+    Returns:
+        str: 快取目錄路徑
+    """
+    fold_dir = os.path.join(cache_dir, f"n{num_samples}_k{n_folds}_s{seed}")
+    marker = os.path.join(fold_dir, 'ready.json')
+    if os.path.exists(marker):
+        print(f"♻️ 使用已快取的折分割: {fold_dir}")
+        return fold_dir
+
+    os.makedirs(fold_dir, exist_ok=True)
+    df = AdvancedBurnskyPredictor().generate_training_data(num_samples, seed=seed)
+    X = df[AdvancedBurnskyPredictor.FEATURE_NAMES].to_numpy(dtype=np.float64)
+    y_score = df['burnsky_score'].to_numpy(dtype=np.float64)
+    y_class = df['burnsky_class'].to_numpy(dtype=np.int64)
+
+    np.save(os.path.join(fold_dir, 'X.npy'), X)
+    np.save(os.path.join(fold_dir, 'y_score.npy'), y_score)
+    np.save(os.path.join(fold_dir, 'y_class.npy'), y_class)
+
+    folds = KFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for index, (train_idx, val_idx) in enumerate(folds.split(X)):
+        scaler = StandardScaler().fit(X[train_idx])
+        np.save(os.path.join(fold_dir, f'fold{index}_train_idx.npy'), train_idx)
+        np.save(os.path.join(fold_dir, f'fold{index}_val_idx.npy'), val_idx)
+        np.save(os.path.join(fold_dir, f'fold{index}_X_train.npy'), scaler.transform(X[train_idx]))
+        np.save(os.path.join(fold_dir, f'fold{index}_X_val.npy'), scaler.transform(X[val_idx]))
+
+    with open(marker, 'w') as f:
+        json.dump({'num_samples': num_samples, 'n_folds': n_folds, 'seed': seed}, f)
+    print(f"💾 已快取 {n_folds} 折標準化矩陣: {fold_dir}")
+    return fold_dir
+
+
+def _init_worker(fold_dir, n_folds):
+    """工作進程初始化：以唯讀 mmap 載入快取矩陣"""
+    def load(name):
+        return np.load(os.path.join(fold_dir, name), mmap_mode='r')
+
+    _WORKER_DATA['y_score'] = load('y_score.npy')
+    _WORKER_DATA['y_class'] = load('y_class.npy')
+    _WORKER_DATA['folds'] = [
+        {
+            'train_idx': load(f'fold{i}_train_idx.npy'),
+            'val_idx': load(f'fold{i}_val_idx.npy'),
+            'X_train': load(f'fold{i}_X_train.npy'),
+            'X_val': load(f'fold{i}_X_val.npy')
+        }
+        for i in range(n_folds)
+    ]
+
+
+def _evaluate_candidate(task, estimator_name, params, seed):
+    """在所有折上評估單一候選參數組合（於工作進程內執行）"""
+    estimator_class = SEARCH_SPACE[task][estimator_name][0]
+    target = _WORKER_DATA['y_score'] if task == 'regression' else _WORKER_DATA['y_class']
+
+    scores = []
+    r2_scores = []
+    start = time.perf_counter()
+    for fold in _WORKER_DATA['folds']:
+        model = estimator_class(random_state=seed, **params)
+        model.fit(fold['X_train'], target[fold['train_idx']])
+        y_true = target[fold['val_idx']]
+        y_pred = model.predict(fold['X_val'])
+        if task == 'regression':
+            scores.append(mean_squared_error(y_true, y_pred))
+            r2_scores.append(r2_score(y_true, y_pred))
+        else:
+            scores.append(accuracy_score(y_true, y_pred))
+
+    result = {
+        'task': task,
+        'estimator': estimator_name,
+        'params': params,
+        'mean_score': float(np.mean(scores)),
+        'std_score': float(np.std(scores)),
+        'metric': 'mse' if task == 'regression' else 'accuracy',
+        'fit_seconds': round(time.perf_counter() - start, 2)
+    }
+    if r2_scores:
+        result['mean_r2'] = float(np.mean(r2_scores))
+    return result
+
+
+def iter_candidates(tasks=('regression', 'classification')):
+    """展開搜索空間為 (任務, 估計器名稱, 參數) 列表"""
+    for task in tasks:
+        for estimator_name, (_, grid) in SEARCH_SPACE[task].items():
+            keys = list(grid.keys())
+            for values in itertools.product(*(grid[key] for key in keys)):
+                yield task, estimator_name, dict(zip(keys, values))
+
+
+def run_search(num_samples=20000, n_folds=5, seed=42, workers=None):
+    """
+    在進程池上並行執行交叉驗證超參數搜索
+
+    Returns:
+        dict: 任務 → 按分數排序的排行榜
+    """
+    workers = workers or os.cpu_count() or 1
+    fold_dir = prepare_fold_cache(num_samples, n_folds, seed)
+    candidates = list(iter_candidates())
+    print(f"🔍 共 {len(candidates)} 組候選參數, {n_folds} 折交叉驗證, {workers} 個工作進程")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(fold_dir, n_folds)) as executor:
+        futures = [executor.submit(_evaluate_candidate, task, name, params, seed)
+                   for task, name, params in candidates]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            print(f"  [{done}/{len(candidates)}] {result['task']}/{result['estimator']} "
+                  f"{result['params']} → {result['metric']}={result['mean_score']:.4f}")
+
+    leaderboard = {
+        'regression': sorted([r for r in results if r['task'] == 'regression'],
+                             key=lambda r: r['mean_score']),
+        'classification': sorted([r for r in results if r['task'] == 'classification'],
+                                 key=lambda r: -r['mean_score'])
+    }
+    print(f"⏱️ 搜索完成，用時 {time.perf_counter() - start:.1f} 秒")
+    return leaderboard
+
+
+def write_leaderboard(leaderboard, settings, path=LEADERBOARD_PATH):
+    """寫入排行榜 JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'settings': settings,
+            'leaderboard': leaderboard
+        }, f, ensure_ascii=False, indent=2)
+    print(f"📋 排行榜已寫入: {path}")
+
+
+def promote_winners(leaderboard, num_samples, seed, settings):
+    """以勝出參數在全部數據上重新擬合，並保存為 load_models 使用的模型檔案"""
+    predictor = AdvancedBurnskyPredictor()
+    df = predictor.generate_training_data(num_samples, seed=seed)
+    X = df[predictor.FEATURE_NAMES]
+
+    predictor.scaler = StandardScaler()
+    X_scaled = predictor.scaler.fit_transform(X)
+
+    best_reg = leaderboard['regression'][0]
+    best_cls = leaderboard['classification'][0]
+    predictor.regression_model = SEARCH_SPACE['regression'][best_reg['estimator']][0](
+        random_state=seed, **best_reg['params']).fit(X_scaled, df['burnsky_score'])
+    predictor.classification_model = SEARCH_SPACE['classification'][best_cls['estimator']][0](
+        random_state=seed, **best_cls['params']).fit(X_scaled, df['burnsky_class'])
+
+    predictor.save_models(metadata={
+        'source': 'hyperparameter_search',
+        'regression': {key: best_reg[key] for key in ['estimator', 'params', 'metric', 'mean_score']},
+        'classification': {key: best_cls[key] for key in ['estimator', 'params', 'metric', 'mean_score']},
+        'search_settings': settings
+    })
+    predictor.load_models()
+    print(f"🏆 勝出模型已部署: {best_reg['estimator']} (MSE {best_reg['mean_score']:.2f}), "
+          f"{best_cls['estimator']} (準確率 {best_cls['mean_score']:.3f}), 版本 {predictor.model_version}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='燒天ML模型訓練工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='使用預設參數重新訓練')
+    train_parser.add_argument('--samples', type=int, default=1000, help='訓練樣本數')
+
+    search_parser = subparsers.add_parser('search', help='並行交叉驗證超參數搜索')
+    search_parser.add_argument('--samples', type=int, default=20000, help='訓練樣本數')
+    search_parser.add_argument('--folds', type=int, default=5, help='交叉驗證折數')
+    search_parser.add_argument('--seed', type=int, default=42, help='隨機種子')
+    search_parser.add_argument('--workers', type=int, default=None, help='工作進程數（預設為全部核心）')
+    search_parser.add_argument('--no-promote', action='store_true', help='只輸出排行榜，不替換現有模型')
+
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        result = AdvancedBurnskyPredictor().train_models(args.samples)
+        print(f"✅ 訓練完成: MSE {result['regression_mse']:.2f}, 準確率 {result['classification_accuracy']:.3f}")
+        return
+
+    settings = {'samples': args.samples, 'folds': args.folds, 'seed': args.seed}
+    leaderboard = run_search(args.samples, args.folds, args.seed, args.workers)
+    write_leaderboard(leaderboard, settings)
+    if not args.no_promote:
+        promote_winners(leaderboard, args.samples, args.seed, settings)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,9 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 AUTO_SAVE_PHOTOS = False  # 預設不自動儲存照片
 PHOTO_RETENTION_DAYS = 30  # 照片保留30天
+PHOTO_STORAGE_DB = 'photo_storage.db'  # 上傳照片索引（內容雜湊、大小、拍攝時間、保留期限）
+PHOTO_MAX_PIXELS = 50_000_000  # 上傳照片的最大像素數（解碼前以檔頭檢查）
+PHOTO_ANALYSIS_SIZE = (800, 600)  # 上傳照片分析解析度（最大寬高）
 
 # 預測歷史數據庫配置
 PREDICTION_HISTORY_DB = 'prediction_history.db'
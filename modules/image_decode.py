@@ -0,0 +1,129 @@
+# image_decode.py - 照片解碼管線
+#
+# 上傳照片只解碼一次：先讀取檔頭檢查格式及尺寸，拒絕過大的圖片，
+# JPEG 以 draft 模式在解碼階段直接縮小（1/2、1/4、1/8），其他格式解碼後以 reduce() 縮小，
+# 最後得到的 RGB 陣列供所有指標共用。每張上傳的峰值記憶體只取決於分析解析度，
+# 與原圖像素數無關（非 JPEG 格式受 PHOTO_MAX_PIXELS 限制）
+
+import io
+from datetime import datetime
+import numpy as np
+from PIL import Image
+from .config import PHOTO_MAX_PIXELS, PHOTO_ANALYSIS_SIZE
+
+# 可接受的圖片格式（PIL 格式名稱；HEIF 需要 pillow-heif）
+SUPPORTED_FORMATS = {'JPEG', 'MPO', 'PNG', 'GIF', 'WEBP', 'HEIF'}
+
+# EXIF 拍攝時間標籤（DateTimeOriginal 位於 Exif IFD，DateTime 位於主 IFD）
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_ORIENTATION = 0x0112
+
+
+class PhotoDecodeError(ValueError):
+    """照片無法解碼或不符合限制（訊息可直接返回給用戶）"""
+
+
+class DecodedPhoto:
+    """解碼後的照片：分析解析度的 RGB 陣列及原圖資訊"""
+
+    def __init__(self, pixels, format, original_size, capture_time=None, orientation=1):
+        self.pixels = pixels
+        self.format = format
+        self.original_size = original_size
+        self.capture_time = capture_time
+        # EXIF 方向（1 = 正常；分析使用未旋轉的陣列，生成顯示用圖片時才套用）
+        self.orientation = orientation
+
+    @property
+    def size(self):
+        return (self.pixels.shape[1], self.pixels.shape[0])
+
+    @property
+    def scale(self):
+        """原圖相對分析解析度的縮小倍數"""
+        return self.original_size[0] / self.pixels.shape[1]
+
+    def info(self):
+        return {
+            'format': self.format,
+            'original_size': list(self.original_size),
+            'analysis_size': list(self.size)
+        }
+
+
+def read_capture_time(image):
+    """從 EXIF 讀取拍攝時間（只需檔頭），返回 datetime 或 None"""
+    try:
+        exif = image.getexif()
+        value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if value:
+            return datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+    except Exception:
+        pass
+    return None
+
+
+def probe_image(photo_data):
+    """
+    只讀取檔頭，返回 (PIL 圖片物件, 格式, 尺寸)；格式不支援或像素過多時拋出 PhotoDecodeError
+    """
+    try:
+        image = Image.open(io.BytesIO(photo_data))
+    except Exception:
+        raise PhotoDecodeError("檔案損壞或不是有效的圖片格式")
+    if image.format not in SUPPORTED_FORMATS:
+        raise PhotoDecodeError(f"不支援的圖片格式: {image.format}")
+    width, height = image.size
+    if width <= 0 or height <= 0:
+        raise PhotoDecodeError("圖片尺寸無效")
+    if width * height > PHOTO_MAX_PIXELS:
+        raise PhotoDecodeError(
+            f"圖片解析度過高（{width}×{height}），最大支援 {PHOTO_MAX_PIXELS // 1_000_000} 百萬像素"
+        )
+    return image, image.format, (width, height)
+
+
+def decode_photo(photo_data, target_size=PHOTO_ANALYSIS_SIZE):
+    """
+    解碼照片到分析解析度
+
+    Args:
+        photo_data: 圖片位元組
+        target_size: (最大寬度, 最大高度)，保持長寬比縮小；None 表示不限制
+
+    Returns:
+        DecodedPhoto
+
+    Raises:
+        PhotoDecodeError: 格式不支援、像素過多、檔案損壞或截斷
+    """
+    image, image_format, original_size = probe_image(photo_data)
+    capture_time = read_capture_time(image)
+    try:
+        orientation = int(image.getexif().get(EXIF_ORIENTATION, 1))
+    except Exception:
+        orientation = 1
+    width, height = original_size
+    ratio = 1.0
+    if target_size:
+        ratio = min(ratio, target_size[0] / width, target_size[1] / height)
+    final_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+
+    try:
+        if ratio < 1.0 and image_format in ('JPEG', 'MPO'):
+            # 解碼器直接輸出不小於目標尺寸的最小 DCT 縮放版本
+            image.draft('RGB', final_size)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if ratio < 0.5 and image.width >= 2 * final_size[0]:
+            # 其他格式只能完整解碼，再以整數倍區域平均縮小（不經過 LANCZOS）
+            image = image.reduce(max(1, min(image.width // final_size[0], image.height // final_size[1])))
+        if image.size != final_size:
+            image = image.resize(final_size, Image.Resampling.BILINEAR)
+        # 在此完成解碼，截斷或損壞的檔案會拋出錯誤
+        pixels = np.asarray(image)
+    except Exception as e:
+        raise PhotoDecodeError(f"檔案損壞或不是有效的圖片格式: {e}")
+    return DecodedPhoto(pixels, image_format, original_size, capture_time, orientation)
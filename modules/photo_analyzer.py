@@ -1,15 +1,33 @@
 # photo_analyzer.py - 照片分析模塊
 
 import base64
-import io
-from PIL import Image
-import numpy as np
-import cv2
 from datetime import datetime
-from .config import BURNSKY_PHOTO_CASES, LAST_CASE_UPDATE
+from .config import BURNSKY_PHOTO_CASES, LAST_CASE_UPDATE, PHOTO_ANALYSIS_SIZE
+from .image_decode import DecodedPhoto, decode_photo
+from .photo_features import count_unique_colors, extract_photo_features, score_photo_quality
+
+def load_photo_rgb(image_data, target_size=PHOTO_ANALYSIS_SIZE):
+    """
+    解碼照片為 RGB 陣列（經 image_decode 管線，JPEG 直接以不超過 target_size 的縮小解析度解碼，
+    平均值類指標誤差很小，顏色多樣性會隨縮放偏移）
+
+    Returns:
+        (RGB uint8 陣列, 縮放比例)
+    """
+    if isinstance(image_data, DecodedPhoto):
+        decoded = image_data
+    else:
+        decoded = decode_photo(image_data, target_size=target_size)
+    return decoded.pixels, decoded.scale ** 2
+
+def analyze_photo_quality(image_data, target_size=PHOTO_ANALYSIS_SIZE):
+    """
+    分析照片品質（統計量由 photo_features 引擎一次提取，評分見 score_photo_quality）
 
-def analyze_photo_quality(image_data):
-    """分析照片品質"""
+    Args:
+        image_data: 圖片位元組、data:image base64 字串或已解碼的 DecodedPhoto
+        target_size: 分析解析度（最大寬高），預設 PHOTO_ANALYSIS_SIZE；None 為全解析度
+    """
     try:
         # 解碼 base64 圖片
         if isinstance(image_data, str) and image_data.startswith('data:image'):
@@ -17,92 +35,12 @@ def analyze_photo_quality(image_data):
             header, encoded = image_data.split(',', 1)
             image_data = base64.b64decode(encoded)
 
-        # 打開圖片
-        image = Image.open(io.BytesIO(image_data))
-        img_array = np.array(image)
-
-        # 轉換為 HSV 色彩空間進行分析
-        if len(img_array.shape) == 3:
-            hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
-        else:
-            # 灰度圖片
-            hsv = cv2.cvtColor(cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB), cv2.COLOR_RGB2HSV)
-
-        # 分析色彩
-        hue, saturation, value = cv2.split(hsv)
-
-        # 計算各種指標
-        avg_hue = np.mean(hue)
-        avg_saturation = np.mean(saturation)
-        avg_value = np.mean(value)
-
-        # 檢測橙色/紅色區域（燒天特徵色彩）
-        orange_mask = ((hue >= 5) & (hue <= 25) & (saturation > 50) & (value > 100))
-        orange_pixels = np.sum(orange_mask)
-        total_pixels = hue.size
-        orange_ratio = orange_pixels / total_pixels
-
-        # 計算對比度
-        contrast = np.std(value) / np.mean(value) if np.mean(value) > 0 else 0
-
-        # 計算顏色多樣性
-        unique_colors = len(np.unique(img_array.reshape(-1, img_array.shape[-1]), axis=0))
-        color_diversity = unique_colors / (img_array.shape[0] * img_array.shape[1])
-
-        # 計算天空區域（假設上半部分是天空）
-        height = img_array.shape[0]
-        sky_region = img_array[:height//2, :, :]
-        sky_hsv = cv2.cvtColor(sky_region, cv2.COLOR_RGB2HSV) if len(sky_region.shape) == 3 else cv2.cvtColor(cv2.cvtColor(sky_region, cv2.COLOR_GRAY2RGB), cv2.COLOR_RGB2HSV)
-
-        sky_hue, sky_saturation, sky_value = cv2.split(sky_hsv)
-        sky_brightness = np.mean(sky_value)
-
-        # 雲層分析（基於亮度和對比）
-        cloud_score = min(1.0, (sky_brightness / 200) * (np.std(sky_value) / 50))
-
-        # 大氣條件評估
-        atmospheric_score = min(1.0, (avg_saturation / 100) * (contrast / 0.5))
-
-        # 顏色潛力評估
-        color_potential = min(1.0, orange_ratio * 2 + color_diversity * 0.5)
-
-        # 綜合品質評分 (0-10)
-        quality_score = (
-            orange_ratio * 3 +          # 橙色比例 (0-3分)
-            contrast * 2 +              # 對比度 (0-2分)
-            color_diversity * 2 +       # 顏色多樣性 (0-2分)
-            cloud_score * 2 +           # 雲層品質 (0-2分)
-            atmospheric_score * 1       # 大氣條件 (0-1分)
-        )
-
-        # 限制在 0-10 範圍
-        quality_score = min(10.0, max(0.0, quality_score))
-
-        # 生成分析詳情
-        analysis = {
-            'quality_score': round(quality_score, 1),
-            'color_analysis': {
-                'orange_ratio': round(orange_ratio, 3),
-                'avg_hue': round(avg_hue, 1),
-                'avg_saturation': round(avg_saturation, 1),
-                'color_diversity': round(color_diversity, 3)
-            },
-            'cloud_analysis': {
-                'cloud_score': round(cloud_score, 2),
-                'sky_brightness': round(sky_brightness, 1),
-                'variation': round(np.std(sky_value) / 255, 3)
-            },
-            'lighting_analysis': {
-                'contrast': round(contrast, 3),
-                'avg_brightness': round(avg_value, 1),
-                'golden_ratio': round(min(1.0, quality_score / 8), 2)
-            },
-            'atmospheric_conditions': {
-                'visibility_score': round(atmospheric_score, 2),
-                'haze_level': round(1 - atmospheric_score, 2)
-            },
-            'recommendations': generate_photo_recommendations(quality_score, orange_ratio, contrast)
-        }
+        # 打開圖片（灰度及帶透明通道的圖片統一轉為 RGB）
+        img_array, downscale = load_photo_rgb(image_data, target_size)
+
+        features = extract_photo_features(img_array, rgb_stats=False)
+        analysis = score_photo_quality(features, recommend=generate_photo_recommendations)
+        analysis['analysis_scale'] = round(downscale, 2)
 
         return analysis
 
@@ -0,0 +1,281 @@
+# photo_features.py - 照片特徵提取引擎
+#
+# 兩套照片評分（app.analyze_photo_quality 的顏色／雲層／光線評分，及 photo_analyzer 的 HSV 品質評分）
+# 所需的統計量在此一次提取：RGB 部分以 uint8 比較及各通道直方圖取得平均值及標準差，
+# 灰階以 R+G+B 的 int16 整數和表示，直方圖、標準差及梯度都以整數計算，不再把天空區域
+# 及整張圖片反覆轉為 float 陣列；HSV 部分只做一次 cv2 色彩轉換。
+# 評分層只讀取這些統計量，輸出與原本兩套分析器相同（見 benchmark_photo_features.py）
+
+import math
+import numpy as np
+import cv2
+
+# R+G+B 的所有可能值 0-765，除以 3 即原本 np.mean(pixels, axis=2) 的灰階值
+GRAY_LEVELS = np.arange(766) / 3.0
+GRAY_HIST_BINS = 50
+
+# 燒天色彩（天空區域）：R > 120、G > 60、B < 120
+WARM_RED_MIN, WARM_GREEN_MIN, WARM_BLUE_MAX = 120, 60, 120
+# 橙色／紅色 HSV 範圍：H 5-25、S > 50、V > 100
+ORANGE_HSV_LOWER, ORANGE_HSV_UPPER = (5, 51, 101), (25, 255, 255)
+# cv2.calcHist 以 float32 計數，像素數低於 2^24 時計數準確（分析解析度遠低於此）
+CALC_HIST_MAX_PIXELS = 1 << 24
+
+
+def count_unique_colors(rgb):
+    """
+    計算 RGB 陣列的不重複顏色數
+
+    將每個像素打包為 24 位元整數，以 2^24 位元的標記表（16MB）記錄出現過的顏色，
+    時間與像素數成正比，取代 np.unique(axis=0) 對所有像素的字典序排序
+    """
+    flat = rgb.reshape(-1, 3)
+    packed = (flat[:, 0].astype(np.uint32) << 16) | (flat[:, 1].astype(np.uint32) << 8) | flat[:, 2]
+    seen = np.zeros(1 << 24, dtype=bool)
+    seen[packed] = True
+    return int(np.count_nonzero(seen))
+
+
+def _channel_moments(region):
+    """各通道的 (像素值總和, 平方和)，以 256 級直方圖計算（Python 整數，不會溢位）"""
+    levels = np.arange(256, dtype=np.int64)
+    sums, sumsqs = [], []
+    for channel in range(3):
+        if region.shape[0] * region.shape[1] < CALC_HIST_MAX_PIXELS:
+            counts = cv2.calcHist([region], [channel], None, [256], [0, 256]).ravel().astype(np.int64)
+        else:
+            counts = np.bincount(region[:, :, channel].ravel(), minlength=256)
+        sums.append(int(counts @ levels))
+        sumsqs.append(int(counts @ (levels * levels)))
+    return sums, sumsqs
+
+
+def _population_std(total, total_sq, count):
+    """以整數和計算母體標準差（與 np.std 相同定義）"""
+    return math.sqrt(max(0, count * total_sq - total * total)) / count
+
+
+def _gradient_abs_sum(values, axis):
+    """np.gradient（edge_order=1）在指定軸的絕對值總和，以整數差分計算（結果為 2 倍內部差分）"""
+    values = np.moveaxis(values, axis, 0)
+    central = np.abs(values[2:] - values[:-2]).sum(dtype=np.int64)
+    edges = np.abs(values[1] - values[0]).sum(dtype=np.int64) + np.abs(values[-1] - values[-2]).sum(dtype=np.int64)
+    # 內部點為 (f[i+1] - f[i-1]) / 2，邊界點為一階差分
+    return central / 2 + edges
+
+
+def extract_photo_features(pixels, rgb_stats=True, hsv_stats=True):
+    """
+    提取照片評分所需的統計量
+
+    Args:
+        pixels: RGB uint8 陣列 (H, W, 3)
+        rgb_stats: 提取 score_burnsky_photo 所需的 RGB／灰階統計
+        hsv_stats: 提取 score_photo_quality 所需的 HSV 統計及顏色數
+
+    Returns:
+        dict: 統計量（像素值總和、直方圖、遮罩像素數等）
+    """
+    height, width = pixels.shape[:2]
+    sky = pixels[:height // 2]
+    features = {
+        'height': height,
+        'width': width,
+        'pixel_count': height * width,
+        'sky_pixel_count': sky.shape[0] * width
+    }
+
+    if rgb_stats:
+        if height < 2 or width < 2:
+            raise ValueError("圖片尺寸太小，無法計算梯度")
+        sky_sums, sky_sumsqs = _channel_moments(sky)
+        ground_sums, ground_sumsqs = _channel_moments(pixels[height // 2:])
+
+        # 燒天色彩遮罩直接以 uint8 比較
+        warm_mask = ((sky[:, :, 0] > WARM_RED_MIN) & (sky[:, :, 1] > WARM_GREEN_MIN)
+                     & (sky[:, :, 2] < WARM_BLUE_MAX))
+
+        # 灰階以 R+G+B 整數和表示（0-765）
+        gray_sum = pixels[:, :, 0].astype(np.int16)
+        gray_sum += pixels[:, :, 1]
+        gray_sum += pixels[:, :, 2]
+        gray_counts = np.bincount(gray_sum.ravel(), minlength=766)
+        gray_hist, _ = np.histogram(GRAY_LEVELS, bins=GRAY_HIST_BINS, range=(0, 255), weights=gray_counts)
+        levels = np.arange(766, dtype=np.int64)
+
+        features.update({
+            'sky_channel_sums': sky_sums,
+            'sky_channel_sumsqs': sky_sumsqs,
+            'channel_sums': [a + b for a, b in zip(sky_sums, ground_sums)],
+            'channel_sumsqs': [a + b for a, b in zip(sky_sumsqs, ground_sumsqs)],
+            'warm_pixels': int(np.count_nonzero(warm_mask)),
+            'gray_hist': gray_hist,
+            'gray_sum_total': int(gray_counts @ levels),
+            'gray_sumsq_total': int(gray_counts @ (levels * levels)),
+            'gray_gradient_abs_sum': _gradient_abs_sum(gray_sum, 0) + _gradient_abs_sum(gray_sum, 1)
+        })
+
+    if hsv_stats:
+        # 只轉換一次，天空區域直接取上半部切片
+        hsv = cv2.cvtColor(pixels, cv2.COLOR_RGB2HSV)
+        (avg_hue, avg_saturation, avg_value), (_, _, value_std) = (
+            channel.ravel() for channel in cv2.meanStdDev(hsv)
+        )
+        sky_mean, sky_std = (float(stat[0, 0]) for stat in cv2.meanStdDev(hsv[:height // 2, :, 2]))
+        features.update({
+            'avg_hue': float(avg_hue),
+            'avg_saturation': float(avg_saturation),
+            'avg_value': float(avg_value),
+            'value_std': float(value_std),
+            'orange_pixels': cv2.countNonZero(cv2.inRange(hsv, ORANGE_HSV_LOWER, ORANGE_HSV_UPPER)),
+            'unique_colors': count_unique_colors(pixels),
+            'sky_value_mean': sky_mean,
+            'sky_value_std': sky_std
+        })
+
+    return features
+
+
+def score_burnsky_photo(features, recommend=None):
+    """
+    燒天顏色／雲層變化／光線質量評分（原 app.analyze_photo_quality 的評分方式）
+
+    Args:
+        features: extract_photo_features(rgb_stats=True) 的結果
+        recommend: recommend(總分, 顏色分析, 雲層分析) → 建議文字
+
+    Returns:
+        dict: quality_score (0-10)、color_analysis、cloud_analysis、lighting_analysis
+    """
+    pixel_count = features['pixel_count']
+    sky_count = features['sky_pixel_count']
+    sky_sums = features['sky_channel_sums']
+    channel_sums = features['channel_sums']
+
+    # 顏色：天空區域暖色比例、三通道合併標準差、紅藍差
+    warm_ratio = features['warm_pixels'] / sky_count
+    saturation = _population_std(sum(sky_sums), sum(features['sky_channel_sumsqs']), 3 * sky_count)
+    warm_cool_contrast = (sky_sums[0] / sky_count - sky_sums[2] / sky_count) / 255.0
+    color_analysis = {
+        'warm_ratio': warm_ratio,
+        'saturation': saturation / 100.0,
+        'contrast': max(0, warm_cool_contrast),
+        'intensity': min(1.0, warm_ratio * 2 + warm_cool_contrast * 0.5)
+    }
+
+    # 雲層：灰階標準差、直方圖峰值數、梯度強度（灰階 = (R+G+B) / 3）
+    gray_std = _population_std(features['gray_sum_total'], features['gray_sumsq_total'], pixel_count) / 3
+    cloud_variation = gray_std / 127.5
+    hist = features['gray_hist']
+    contrast_peaks = int(np.count_nonzero(hist > hist.mean() * 1.5))
+    layer_complexity = min(1.0, contrast_peaks / 10.0)
+    edge_strength = features['gray_gradient_abs_sum'] / (2 * pixel_count) / 3 / 50.0
+    cloud_analysis = {
+        'variation': min(1.0, cloud_variation),
+        'layers': layer_complexity,
+        'edge_definition': min(1.0, edge_strength),
+        'overall_quality': min(1.0, (cloud_variation + layer_complexity + edge_strength) / 3)
+    }
+
+    # 光線：整體亮度、紅藍差、所有通道合併標準差
+    brightness = sum(channel_sums) / (3 * pixel_count) / 255.0
+    golden_ratio = min(1.0, (channel_sums[0] / pixel_count - channel_sums[2] / pixel_count + 50) / 100.0)
+    brightness_std = _population_std(sum(channel_sums), sum(features['channel_sumsqs']), 3 * pixel_count) / 127.5
+    softness = 1.0 - min(1.0, brightness_std)
+    lighting_analysis = {
+        'brightness': brightness,
+        'golden_ratio': max(0, golden_ratio),
+        'softness': softness,
+        'quality': (brightness * 0.3 + golden_ratio * 0.5 + softness * 0.2)
+    }
+
+    total_score = min(10, color_analysis['intensity'] * 4 + cloud_analysis['variation'] * 3
+                      + lighting_analysis['golden_ratio'] * 3)
+    result = {
+        'quality_score': total_score,
+        'color_analysis': color_analysis,
+        'cloud_analysis': cloud_analysis,
+        'lighting_analysis': lighting_analysis
+    }
+    if recommend:
+        result['recommendation'] = recommend(total_score, color_analysis, cloud_analysis)
+    return result
+
+
+def generate_photo_recommendation(score, color_analysis, cloud_analysis):
+    """score_burnsky_photo 的建議文字（單張上傳及批次分析共用）"""
+    if score >= 8:
+        return "🔥 極佳燒天！顏色濃烈，雲層層次豐富，建議記錄當時天氣條件"
+    elif score >= 6:
+        if color_analysis['intensity'] > 0.7:
+            return "🌅 色彩不錯！雲層可以更豐富一些"
+        elif cloud_analysis['variation'] > 0.7:
+            return "☁️ 雲層層次很好！可以等待更強烈的色彩"
+        else:
+            return "✨ 不錯的燒天，各方面都有改善空間"
+    elif score >= 4:
+        return "🌤️ 普通燒天，建議等待更好的條件"
+    else:
+        return "😐 非燒天條件，建議下次嘗試"
+
+
+def score_photo_quality(features, recommend=None):
+    """
+    HSV 品質評分（原 photo_analyzer.analyze_photo_quality 的評分方式）
+
+    Args:
+        features: extract_photo_features(hsv_stats=True) 的結果
+        recommend: recommend(品質分數, 橙色比例, 對比度) → 建議列表
+
+    Returns:
+        dict: quality_score (0-10) 及各項分析
+    """
+    pixel_count = features['pixel_count']
+    avg_saturation = features['avg_saturation']
+    avg_value = features['avg_value']
+
+    orange_ratio = features['orange_pixels'] / pixel_count
+    contrast = features['value_std'] / avg_value if avg_value > 0 else 0
+    color_diversity = features['unique_colors'] / pixel_count
+    sky_brightness = features['sky_value_mean']
+    sky_std = features['sky_value_std']
+
+    # 雲層（天空亮度及對比）、大氣條件、顏色潛力
+    cloud_score = min(1.0, (sky_brightness / 200) * (sky_std / 50))
+    atmospheric_score = min(1.0, (avg_saturation / 100) * (contrast / 0.5))
+
+    quality_score = (
+        orange_ratio * 3 +          # 橙色比例 (0-3分)
+        contrast * 2 +              # 對比度 (0-2分)
+        color_diversity * 2 +       # 顏色多樣性 (0-2分)
+        cloud_score * 2 +           # 雲層品質 (0-2分)
+        atmospheric_score * 1       # 大氣條件 (0-1分)
+    )
+    quality_score = min(10.0, max(0.0, quality_score))
+
+    result = {
+        'quality_score': round(quality_score, 1),
+        'color_analysis': {
+            'orange_ratio': round(orange_ratio, 3),
+            'avg_hue': round(features['avg_hue'], 1),
+            'avg_saturation': round(avg_saturation, 1),
+            'color_diversity': round(color_diversity, 3)
+        },
+        'cloud_analysis': {
+            'cloud_score': round(cloud_score, 2),
+            'sky_brightness': round(sky_brightness, 1),
+            'variation': round(sky_std / 255, 3)
+        },
+        'lighting_analysis': {
+            'contrast': round(contrast, 3),
+            'avg_brightness': round(avg_value, 1),
+            'golden_ratio': round(min(1.0, quality_score / 8), 2)
+        },
+        'atmospheric_conditions': {
+            'visibility_score': round(atmospheric_score, 2),
+            'haze_level': round(1 - atmospheric_score, 2)
+        }
+    }
+    if recommend:
+        result['recommendations'] = recommend(quality_score, orange_ratio, contrast)
+    return result
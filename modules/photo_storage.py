@@ -0,0 +1,451 @@
+# photo_storage.py - 內容定址照片儲存
+#
+# 照片以 SHA-256 命名，按雜湊前綴分兩層子目錄存放（uploads/ab/cd/<雜湊>.jpg），
+# 相同內容只保存一份。檔案資訊（大小、拍攝時間、保留期限）記錄在 SQLite 索引，
+# 同一照片可對應多個ML訓練案例（連結表）。
+# 清理只需以 expires_at 索引做範圍刪除，儲存統計由觸發器維護的總計列直接讀取，
+# 不再需要對上傳目錄 listdir 及逐一 stat。
+# 縮圖及預覽圖在分析時以已縮小的解碼陣列生成，與原圖放在同一目錄（<雜湊>_thumb.jpg），
+# 瀏覽照片案例時不需傳送數 MB 的原圖
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from PIL import Image
+from .config import UPLOAD_FOLDER, PHOTO_RETENTION_DAYS, PHOTO_STORAGE_DB
+from .image_decode import decode_photo
+
+# 子目錄層數及每層使用的十六進位字元數（256 × 256 個目錄）
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+# 衍生圖片的最大寬度（預覽圖不超過分析解析度，因為兩者都由同一個解碼陣列生成）
+DERIVED_WIDTHS = {
+    'thumb': 320,
+    'preview': 800
+}
+DERIVED_JPEG_QUALITY = 82
+# 可公開提供的版本：衍生圖片不含 EXIF；原圖保留完整 EXIF（包括 GPS 位置），不公開提供
+PUBLIC_VARIANTS = tuple(DERIVED_WIDTHS)
+# 刪除照片時每次查詢案例連結的照片數（低於 SQLite 預設的參數上限 999）
+DELETE_BATCH_SIZE = 500
+
+# EXIF 方向 → 轉正所需的變換（與 ImageOps.exif_transpose 相同）
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+
+def build_derived_images(pixels, orientation=1):
+    """
+    由解碼陣列生成縮圖及預覽圖
+
+    Args:
+        pixels: RGB uint8 陣列（上傳時已縮小到分析解析度）
+        orientation: EXIF 方向，生成的圖片會轉正（衍生圖片不含 EXIF）
+
+    Returns:
+        dict: 名稱 → JPEG 位元組
+    """
+    image = Image.fromarray(pixels)
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    derived = {}
+    # 由大到小依次縮放，縮圖以預覽圖為來源
+    for name, width in sorted(DERIVED_WIDTHS.items(), key=lambda item: -item[1]):
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=DERIVED_JPEG_QUALITY, optimize=True)
+        derived[name] = output.getvalue()
+    return derived
+
+
+class PhotoStorage:
+    """內容定址照片儲存及其 SQLite 索引"""
+
+    def __init__(self, root=UPLOAD_FOLDER, db_path=PHOTO_STORAGE_DB, retention_days=PHOTO_RETENTION_DAYS):
+        self.root = root
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._delete_listeners = []
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._initialized:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS stored_photos (
+                    content_hash TEXT PRIMARY KEY,  -- SHA-256
+                    rel_path TEXT NOT NULL,         -- 相對 root 的路徑
+                    size INTEGER NOT NULL,
+                    original_filename TEXT,
+                    capture_time TEXT,              -- EXIF 拍攝時間
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,       -- 保留期限 (Unix 秒)
+                    derived_bytes INTEGER NOT NULL DEFAULT 0  -- 縮圖及預覽圖大小（0 = 未生成）
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_stored_photos_expires ON stored_photos(expires_at);
+                CREATE INDEX IF NOT EXISTS idx_stored_photos_stored ON stored_photos(stored_at);
+
+                -- 單列總計表，由觸發器維護
+                CREATE TABLE IF NOT EXISTS stored_photo_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    file_count INTEGER NOT NULL,
+                    total_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stored_photo_totals (id, file_count, total_bytes) VALUES (1, 0, 0);
+
+                -- 照片 → ML訓練案例（相同內容以多個案例上傳時各自保留連結）
+                CREATE TABLE IF NOT EXISTS stored_photo_cases (
+                    content_hash TEXT NOT NULL,
+                    case_id TEXT NOT NULL,
+                    linked_at REAL NOT NULL,
+                    PRIMARY KEY (content_hash, case_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_stored_photo_cases_case ON stored_photo_cases(case_id);
+            ''')
+            # 舊版索引沒有 derived_bytes 欄位
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(stored_photos)')]
+            if 'derived_bytes' not in columns:
+                conn.execute('ALTER TABLE stored_photos ADD COLUMN derived_bytes INTEGER NOT NULL DEFAULT 0')
+            # 舊版索引每張照片只有一個 case_id 欄位，搬到連結表（欄位保留但不再使用）
+            if 'case_id' in columns:
+                conn.execute('INSERT OR IGNORE INTO stored_photo_cases (content_hash, case_id, linked_at) '
+                             'SELECT content_hash, case_id, stored_at FROM stored_photos WHERE case_id IS NOT NULL')
+                conn.execute('UPDATE stored_photos SET case_id = NULL WHERE case_id IS NOT NULL')
+            conn.executescript('''
+                DROP TRIGGER IF EXISTS trg_stored_photos_insert;
+                DROP TRIGGER IF EXISTS trg_stored_photos_delete;
+                DROP TRIGGER IF EXISTS trg_stored_photos_derived;
+                CREATE TRIGGER trg_stored_photos_insert AFTER INSERT ON stored_photos BEGIN
+                    UPDATE stored_photo_totals SET file_count = file_count + 1,
+                        total_bytes = total_bytes + NEW.size + NEW.derived_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER trg_stored_photos_delete AFTER DELETE ON stored_photos BEGIN
+                    UPDATE stored_photo_totals SET file_count = file_count - 1,
+                        total_bytes = total_bytes - OLD.size - OLD.derived_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER trg_stored_photos_derived AFTER UPDATE OF derived_bytes ON stored_photos BEGIN
+                    UPDATE stored_photo_totals SET total_bytes = total_bytes + NEW.derived_bytes - OLD.derived_bytes
+                        WHERE id = 1;
+                END;
+            ''')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _relative_path(content_hash, filename):
+        ext = os.path.splitext(filename or '')[1].lower() or '.jpg'
+        shards = [content_hash[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+        return os.path.join(*shards, f'{content_hash}{ext}')
+
+    def full_path(self, rel_path):
+        return os.path.join(self.root, rel_path)
+
+    def derived_path(self, rel_path, name):
+        """衍生圖片與原圖同一目錄：<雜湊>_<名稱>.jpg"""
+        return self.full_path(f'{os.path.splitext(rel_path)[0]}_{name}.jpg')
+
+    def _write_derived(self, rel_path, pixels, orientation):
+        """生成並寫入衍生圖片，返回總大小"""
+        total = 0
+        for name, data in build_derived_images(pixels, orientation).items():
+            path = self.derived_path(rel_path, name)
+            with open(f'{path}.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(f'{path}.tmp', path)
+            total += len(data)
+        return total
+
+    def store(self, photo_data, filename=None, capture_time=None, case_id=None, pixels=None, orientation=1):
+        """
+        儲存照片（相同內容已存在時只延長保留期限）
+
+        Args:
+            pixels: 上傳時的解碼陣列，提供時一併生成縮圖及預覽圖
+            orientation: EXIF 方向（用於衍生圖片）
+
+        Returns:
+            dict: {'content_hash', 'path', 'size', 'deduplicated'}
+        """
+        content_hash = hashlib.sha256(photo_data).hexdigest()
+        now = time.time()
+        expires_at = now + self.retention_days * 86400
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute('SELECT rel_path, derived_bytes FROM stored_photos WHERE content_hash = ?',
+                                   (content_hash,)).fetchone()
+                if row and os.path.exists(self.full_path(row[0])):
+                    derived_bytes = row[1]
+                    if not derived_bytes and pixels is not None:
+                        derived_bytes = self._write_derived(row[0], pixels, orientation)
+                    with conn:
+                        conn.execute('UPDATE stored_photos SET expires_at = MAX(expires_at, ?), '
+                                     'derived_bytes = ? WHERE content_hash = ?',
+                                     (expires_at, derived_bytes, content_hash))
+                        self._insert_case_link(conn, content_hash, case_id, now)
+                    return {'content_hash': content_hash, 'path': self.full_path(row[0]),
+                            'size': len(photo_data), 'deduplicated': True}
+
+                rel_path = row[0] if row else self._relative_path(content_hash, filename)
+                path = self.full_path(rel_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 先寫入暫存檔再改名，讀取者不會看到寫到一半的檔案
+                temp_path = f'{path}.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(photo_data)
+                os.replace(temp_path, path)
+                derived_bytes = self._write_derived(rel_path, pixels, orientation) if pixels is not None else 0
+
+                with conn:
+                    conn.execute('DELETE FROM stored_photos WHERE content_hash = ?', (content_hash,))
+                    conn.execute(
+                        'INSERT INTO stored_photos (content_hash, rel_path, size, original_filename, '
+                        'capture_time, stored_at, expires_at, derived_bytes) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (content_hash, rel_path, len(photo_data), filename,
+                         capture_time.isoformat() if isinstance(capture_time, datetime) else capture_time,
+                         now, expires_at, derived_bytes)
+                    )
+                    self._insert_case_link(conn, content_hash, case_id, now)
+            finally:
+                conn.close()
+        return {'content_hash': content_hash, 'path': path, 'size': len(photo_data), 'deduplicated': False}
+
+    @staticmethod
+    def _insert_case_link(conn, content_hash, case_id, linked_at):
+        if case_id is not None:
+            conn.execute('INSERT OR IGNORE INTO stored_photo_cases (content_hash, case_id, linked_at) '
+                         'VALUES (?, ?, ?)', (content_hash, case_id, linked_at))
+
+    def link_case(self, content_hash, case_id):
+        """記錄照片對應的ML訓練案例（同一照片的其他案例連結保持不變）"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    if conn.execute('SELECT 1 FROM stored_photos WHERE content_hash = ?',
+                                    (content_hash,)).fetchone():
+                        self._insert_case_link(conn, content_hash, case_id, time.time())
+            finally:
+                conn.close()
+
+    def add_delete_listener(self, callback):
+        """
+        登記照片刪除後的回調（例如清除其他數據庫中指向已刪除檔案的 saved_path）
+
+        Args:
+            callback: callback(deleted)，deleted 為 _delete_range 返回的照片資訊列表
+        """
+        self._delete_listeners.append(callback)
+
+    def _delete_range(self, column, cutoff, limit=None):
+        """
+        刪除 column < cutoff 的照片（以索引範圍查詢），連同案例連結
+
+        Returns:
+            list: [{'content_hash', 'filename', 'path', 'size', 'case_ids'}, ...]
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                sql = (f'SELECT content_hash, rel_path, size FROM stored_photos WHERE {column} < ? '
+                       f'ORDER BY {column}')
+                params = [cutoff]
+                if limit:
+                    sql += ' LIMIT ?'
+                    params.append(limit)
+                rows = conn.execute(sql, params).fetchall()
+                hashes = [content_hash for content_hash, _, _ in rows]
+                case_ids = {}
+                # 只查詢本次選取的照片的案例連結（分批以免超過 SQLite 參數上限）
+                for start in range(0, len(hashes), DELETE_BATCH_SIZE):
+                    batch = hashes[start:start + DELETE_BATCH_SIZE]
+                    for content_hash, case_id in conn.execute(
+                            f'SELECT content_hash, case_id FROM stored_photo_cases WHERE content_hash IN '
+                            f'({", ".join("?" * len(batch))})', batch):
+                        case_ids.setdefault(content_hash, []).append(case_id)
+                # 先刪除並提交數據庫記錄，再刪除檔案：中途失敗只會留下無記錄的孤立檔案，
+                # 不會出現指向已刪除檔案的記錄
+                with conn:
+                    conn.executemany('DELETE FROM stored_photos WHERE content_hash = ?',
+                                     [(content_hash,) for content_hash in hashes])
+                    conn.executemany('DELETE FROM stored_photo_cases WHERE content_hash = ?',
+                                     [(content_hash,) for content_hash in hashes])
+                for _, rel_path, _ in rows:
+                    paths = [self.full_path(rel_path)] + [self.derived_path(rel_path, name) for name in DERIVED_WIDTHS]
+                    for path in paths:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            print(f"清理檔案失敗: {path} - {e}")
+            finally:
+                conn.close()
+        deleted = [{'content_hash': content_hash, 'filename': rel_path, 'path': self.full_path(rel_path),
+                    'size': size, 'case_ids': case_ids.get(content_hash, [])}
+                   for content_hash, rel_path, size in rows]
+        if deleted:
+            for callback in self._delete_listeners:
+                try:
+                    callback(deleted)
+                except Exception as e:
+                    print(f"⚠️ 照片刪除回調失敗: {e}")
+        return deleted
+
+    def variant_path(self, content_hash, variant='original'):
+        """
+        取得照片指定版本的路徑；衍生圖片不存在時（例如搬移的舊照片）由原圖生成一次
+
+        Returns:
+            str 或 None（照片不存在）
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute('SELECT rel_path, derived_bytes FROM stored_photos WHERE content_hash = ?',
+                                   (content_hash,)).fetchone()
+            finally:
+                conn.close()
+        if row is None or not os.path.exists(self.full_path(row[0])):
+            return None
+        rel_path, derived_bytes = row
+        if variant == 'original':
+            return self.full_path(rel_path)
+
+        path = self.derived_path(rel_path, variant)
+        if not derived_bytes or not os.path.exists(path):
+            with open(self.full_path(rel_path), 'rb') as f:
+                decoded = decode_photo(f.read())
+            self.store_derived(content_hash, rel_path, decoded.pixels, decoded.orientation)
+        return path
+
+    def store_derived(self, content_hash, rel_path, pixels, orientation=1):
+        """生成衍生圖片並更新索引"""
+        with self._lock:
+            derived_bytes = self._write_derived(rel_path, pixels, orientation)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute('UPDATE stored_photos SET derived_bytes = ? WHERE content_hash = ?',
+                                 (derived_bytes, content_hash))
+            finally:
+                conn.close()
+
+    def cleanup_expired(self, now=None, limit=None):
+        """刪除已過保留期限的照片"""
+        return self._delete_range('expires_at', now or time.time(), limit)
+
+    def delete_stored_before(self, cutoff):
+        """刪除在 cutoff（Unix 秒）之前儲存的照片"""
+        return self._delete_range('stored_at', cutoff)
+
+    def clear(self):
+        """刪除所有照片"""
+        return self._delete_range('stored_at', float('inf'))
+
+    def stats(self):
+        """儲存統計（總計列及索引端點，不掃描檔案）"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                file_count, total_bytes = conn.execute(
+                    'SELECT file_count, total_bytes FROM stored_photo_totals WHERE id = 1'
+                ).fetchone()
+                oldest, newest = conn.execute(
+                    'SELECT MIN(stored_at), MAX(stored_at) FROM stored_photos'
+                ).fetchone()
+                next_expiry = conn.execute('SELECT MIN(expires_at) FROM stored_photos').fetchone()[0]
+            finally:
+                conn.close()
+        to_iso = lambda ts: datetime.fromtimestamp(ts).isoformat() if ts else None
+        return {
+            'total_files': file_count,
+            'total_size_bytes': total_bytes,
+            'total_size_mb': round(total_bytes / (1024 * 1024), 2),
+            'oldest_stored': to_iso(oldest),
+            'newest_stored': to_iso(newest),
+            'next_expiry': to_iso(next_expiry)
+        }
+
+    def list_photos(self, page=1, per_page=50):
+        """按儲存時間由新到舊分頁列出照片"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    'SELECT content_hash, rel_path, size, original_filename, capture_time, '
+                    '(SELECT GROUP_CONCAT(case_id, char(10)) FROM stored_photo_cases c '
+                    ' WHERE c.content_hash = p.content_hash), '
+                    'stored_at, expires_at, derived_bytes FROM stored_photos p '
+                    'ORDER BY stored_at DESC LIMIT ? OFFSET ?',
+                    (per_page, (page - 1) * per_page)
+                ).fetchall()
+            finally:
+                conn.close()
+        now = time.time()
+        return [{
+            'content_hash': content_hash,
+            'filename': rel_path,
+            'size': size,
+            'original_filename': original_filename,
+            'capture_time': capture_time,
+            'case_ids': case_ids.split('\n') if case_ids else [],
+            'created': datetime.fromtimestamp(stored_at).isoformat(),
+            'expires': datetime.fromtimestamp(expires_at).isoformat(),
+            'age_days': (now - stored_at) / (24 * 60 * 60),
+            'has_derived': derived_bytes > 0
+        } for (content_hash, rel_path, size, original_filename, capture_time, case_ids,
+               stored_at, expires_at, derived_bytes) in rows]
+
+    def import_flat_files(self):
+        """把舊版直接存放在上傳目錄根層的照片搬到分層目錄並加入索引，返回搬移數量"""
+        if not os.path.isdir(self.root):
+            return 0
+        imported = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or entry.name.endswith('.tmp') or entry.name.startswith('.'):
+                continue
+            try:
+                with open(entry.path, 'rb') as f:
+                    photo_data = f.read()
+                stat = entry.stat()
+                result = self.store(photo_data, entry.name)
+                # 保留原本的儲存時間，保留期限由原檔案時間起計
+                with self._lock:
+                    conn = self._connect()
+                    try:
+                        with conn:
+                            conn.execute('UPDATE stored_photos SET stored_at = ?, expires_at = ? '
+                                         'WHERE content_hash = ?',
+                                         (stat.st_mtime, stat.st_mtime + self.retention_days * 86400,
+                                          result['content_hash']))
+                    finally:
+                        conn.close()
+                os.remove(entry.path)
+                imported += 1
+            except OSError as e:
+                print(f"⚠️ 搬移舊照片失敗: {entry.name} - {e}")
+        if imported:
+            print(f"📁 已將 {imported} 張舊照片搬到內容定址儲存")
+        return imported
+
+
+# 全域共用實例
+photo_storage = PhotoStorage()
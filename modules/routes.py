@@ -6,9 +6,10 @@ import os
 from .prediction_core import predict_burnsky_core
 from .file_handler import allowed_file, validate_image_content, cleanup_old_photos, save_uploaded_photo, get_photo_storage_info
 from .photo_analyzer import analyze_photo_quality, record_burnsky_photo_case, analyze_photo_case_patterns
+from .image_decode import PhotoDecodeError, decode_photo
 from .cache import clear_prediction_cache, trigger_prediction_update
 from .database import init_prediction_history_db
-from .config import UPLOAD_FOLDER, MAX_FILE_SIZE, PHOTO_RETENTION_DAYS, PREDICTION_HISTORY_DB, warning_analysis_available, warning_analyzer
+from .config import UPLOAD_FOLDER, MAX_FILE_SIZE, PHOTO_ANALYSIS_SIZE, PHOTO_RETENTION_DAYS, PREDICTION_HISTORY_DB, warning_analysis_available, warning_analyzer
 from .utils import convert_numpy_types
 
 def register_routes(app):
@@ -198,18 +199,20 @@ def register_routes(app):
                     "message": f"檔案太大，最大支援 {MAX_FILE_SIZE // (1024*1024)}MB"
                 }), 400
 
-            # 讀取並驗證照片
+            # 讀取照片
             photo_data = file.read()
 
-            # 驗證檔案確實是有效圖片
-            if not validate_image_content(photo_data):
+            # 檢查檔頭並解碼（損壞、格式不符或像素過多的圖片在此拒絕）
+            try:
+                decoded_photo = decode_photo(photo_data, target_size=PHOTO_ANALYSIS_SIZE)
+            except PhotoDecodeError as e:
                 return jsonify({
                     "status": "error",
-                    "message": "檔案損壞或不是有效的圖片格式"
+                    "message": str(e)
                 }), 400
 
-            # 分析照片
-            photo_analysis = analyze_photo_quality(photo_data)
+            # 分析照片（重用已解碼的陣列）
+            photo_analysis = analyze_photo_quality(decoded_photo)
 
             # 獲取表單數據
             location = request.form.get('location', '未知地點')
@@ -222,7 +225,8 @@ def register_routes(app):
 
             # 保存照片（如果選擇）
             if save_photo:
-                saved_path = save_uploaded_photo(photo_data, file.filename)
+                saved_path = save_uploaded_photo(photo_data, file.filename, decoded_photo.capture_time,
+                                                 decoded_photo.pixels, decoded_photo.orientation)
 
             # 記錄案例到ML訓練數據庫
             case_id = record_burnsky_photo_case(
@@ -255,7 +259,9 @@ def register_routes(app):
     def photo_storage_info():
         """照片儲存資訊"""
         try:
-            storage_info = get_photo_storage_info()
+            page = max(1, request.args.get('page', 1, type=int))
+            per_page = min(200, max(1, request.args.get('per_page', 50, type=int)))
+            storage_info = get_photo_storage_info(page, per_page)
             return jsonify({
                 "status": "success",
                 "storage_info": {
@@ -265,7 +271,12 @@ def register_routes(app):
                     "max_file_size_mb": MAX_FILE_SIZE // (1024*1024),
                     "allowed_extensions": ['png', 'jpg', 'jpeg', 'gif', 'webp']
                 },
-                "current_storage": storage_info
+                "current_storage": storage_info,
+                "pagination": {
+                    "page": page,
+                    "per_page": per_page,
+                    "total_pages": max(1, -(-storage_info['total_files'] // per_page))
+                }
             })
 
         except Exception as e:
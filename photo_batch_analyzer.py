@@ -0,0 +1,216 @@
+"""
+照片批次分析模組
+同一場日落連拍的多張照片由進程池並行解碼及分析：上傳檔案逐一寫入暫存檔後
+只把路徑交給工作進程，網頁進程不需同時保存所有照片；每張照片只解碼一次，
+所有指標共用同一陣列。最後彙總整組照片的最佳一張、色彩高峰時間及評分走勢。
+預設共用攝影機分析的工作進程，不另外啟動一組進程
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+
+from modules.image_decode import PhotoDecodeError, decode_photo
+from modules.photo_features import extract_photo_features, generate_photo_recommendation, score_burnsky_photo
+
+PHOTO_BATCH_MAX_FILES = int(os.getenv('PHOTO_BATCH_MAX_FILES', '30'))
+
+# 不共用進程池時的預設工作進程數
+DEFAULT_BATCH_WORKERS = 2
+
+# 評分斜率（每分鐘或每張）絕對值低於此值視為持平
+STABLE_SCORE_SLOPE = 0.05
+
+
+def analyze_photo_file(path):
+    """
+    分析暫存的照片檔案（在工作進程內執行），評分方式與單張上傳（app.analyze_photo_quality）相同
+
+    Returns:
+        dict: 評分、天空暖色比例、拍攝時間及完整分析；無法解碼或分析時只有 'error'
+    """
+    with open(path, 'rb') as f:
+        photo_data = f.read()
+    try:
+        decoded = decode_photo(photo_data)
+    except PhotoDecodeError as e:
+        return {'error': str(e)}
+    del photo_data
+
+    try:
+        features = extract_photo_features(decoded.pixels, hsv_stats=False)
+        analysis = score_burnsky_photo(features, recommend=generate_photo_recommendation)
+    except Exception as e:
+        return {'error': f"照片分析失敗: {e}"}
+    if 'error' in analysis:
+        return {'error': analysis['error']}
+    return {
+        'quality_score': analysis['quality_score'],
+        'warm_ratio': analysis['color_analysis']['warm_ratio'],
+        'capture_time': decoded.capture_time.isoformat() if decoded.capture_time else None,
+        'image': decoded.info(),
+        'analysis': analysis
+    }
+
+
+def summarize_session(photos):
+    """
+    彙總同一組照片：最佳一張、色彩高峰及評分走勢
+
+    所有照片都有 EXIF 拍攝時間時按時間排序並以每分鐘斜率計算走勢，否則按上傳順序以每張斜率計算
+
+    Args:
+        photos: [{'index', 'filename', 'quality_score', 'warm_ratio', 'capture_time', ...}, ...]
+    """
+    analyzed = [photo for photo in photos if 'error' not in photo and photo.get('quality_score') is not None]
+    if not analyzed:
+        return None
+
+    timed = all(photo['capture_time'] for photo in analyzed)
+    if timed:
+        analyzed = sorted(analyzed, key=lambda photo: photo['capture_time'])
+    scores = np.array([photo['quality_score'] for photo in analyzed], dtype=np.float64)
+
+    best = analyzed[int(np.argmax(scores))]
+    peak = max(analyzed, key=lambda photo: photo['warm_ratio'])
+    summary = {
+        'photo_count': len(analyzed),
+        'ordered_by': 'capture_time' if timed else 'upload_order',
+        'best_frame': {
+            'index': best['index'],
+            'filename': best['filename'],
+            'quality_score': best['quality_score'],
+            'capture_time': best['capture_time']
+        },
+        'color_peak': {
+            'index': peak['index'],
+            'filename': peak['filename'],
+            'warm_ratio': peak['warm_ratio'],
+            'capture_time': peak['capture_time']
+        },
+        'score_stats': {
+            'mean': round(float(scores.mean()), 2),
+            'min': round(float(scores.min()), 2),
+            'max': round(float(scores.max()), 2)
+        },
+        'score_trend': None
+    }
+
+    if timed:
+        times = [datetime.fromisoformat(photo['capture_time']) for photo in analyzed]
+        positions = np.array([(t - times[0]).total_seconds() / 60 for t in times])
+        summary['duration_minutes'] = round(float(positions[-1]), 1)
+    else:
+        positions = np.arange(len(analyzed), dtype=np.float64)
+
+    if len(analyzed) >= 2 and np.ptp(positions) > 0:
+        slope = float(np.polyfit(positions, scores, 1)[0])
+        if slope > STABLE_SCORE_SLOPE:
+            trend = 'rising'
+        elif slope < -STABLE_SCORE_SLOPE:
+            trend = 'falling'
+        else:
+            trend = 'stable'
+        summary['score_trend'] = {
+            'trend': trend,
+            'slope': round(slope, 3) + 0.0,
+            'slope_unit': 'per_minute' if timed else 'per_photo',
+            'scores': [photo['quality_score'] for photo in analyzed]
+        }
+    return summary
+
+
+class PhotoBatchPool:
+    """照片批次分析的進程池"""
+
+    def __init__(self, workers: int = None, shared_pool=None):
+        """
+        Args:
+            workers: 工作進程數，None 使用 DEFAULT_BATCH_WORKERS；小於 2 時直接在本進程計算
+            shared_pool: 共用其工作進程的 WebcamAnalysisPool（提供時忽略 workers）
+        """
+        self.shared_pool = shared_pool
+        if shared_pool is not None:
+            self.workers = shared_pool.workers
+        else:
+            self.workers = DEFAULT_BATCH_WORKERS if workers is None else workers
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self.enabled = self.workers >= 2
+        self.batches = 0
+        self.photos = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls, shared_pool=None):
+        """根據 PHOTO_BATCH_WORKERS 建立獨立進程池；未設定時共用 shared_pool 的工作進程"""
+        workers = os.getenv('PHOTO_BATCH_WORKERS')
+        if workers:
+            return cls(int(workers))
+        return cls(shared_pool=shared_pool)
+
+    def _get_executor(self):
+        if self.shared_pool is not None:
+            return self.shared_pool.get_executor()
+        if self._executor is None:
+            # 使用 spawn 啟動，避免在多執行緒的 Flask 進程中 fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def analyze_files(self, paths):
+        """
+        分析多個照片檔案
+
+        Args:
+            paths: 照片路徑的可迭代物件（可為逐一寫入暫存檔的產生器，每個路徑產生後立即提交）
+
+        Returns:
+            list: 與輸入順序相同的分析結果
+        """
+        if self.enabled and (self.shared_pool is None or self.shared_pool.enabled):
+            submitted = []
+            try:
+                executor = self._get_executor()
+                futures = []
+                for path in paths:
+                    submitted.append(path)
+                    futures.append(executor.submit(analyze_photo_file, path))
+                results = [future.result() for future in futures]
+            except BrokenExecutor as e:
+                # 進程池故障（例如工作進程被終止）時改為本進程計算
+                self.logger.warning(f"Photo batch pool failed, falling back to in-process analysis: {e}")
+                self.fallbacks += 1
+                if self.shared_pool is not None:
+                    # 共用的進程池已損壞，關閉後由攝影機分析下次使用時重新建立
+                    self.shared_pool.shutdown()
+                self.shutdown()
+                self.enabled = False
+                results = [analyze_photo_file(path) for path in submitted]
+                results.extend(analyze_photo_file(path) for path in paths)
+        else:
+            results = [analyze_photo_file(path) for path in paths]
+        self.batches += 1
+        self.photos += len(results)
+        return results
+
+    def shutdown(self):
+        """關閉工作進程（共用的進程池由擁有者關閉）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'enabled': self.enabled,
+            'shared': self.shared_pool is not None,
+            'batches': self.batches,
+            'photos': self.photos,
+            'fallbacks': self.fallbacks
+        }
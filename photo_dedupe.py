@@ -0,0 +1,240 @@
+"""
+照片感知雜湊去重模組
+以縮小解碼後的照片計算 64 位元 dHash，寫入分段索引的 SQLite 表；
+重複上傳的照片（重新壓縮、縮放後雜湊僅有少數位元不同）在漢明距離閾值內
+直接返回之前的分析結果，不再重複儲存照片或寫入ML訓練數據。
+天空佔大部分畫面的照片灰階梯度平緩、雜湊資訊較少，因此同時比較平均顏色，
+避免構圖相近但色彩不同的兩場日落被誤判為重複
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from PIL import Image
+
+PHOTO_HASH_DB = os.getenv('PHOTO_HASH_DB', 'photo_hashes.db')
+PHOTO_DUPLICATE_MAX_DISTANCE = int(os.getenv('PHOTO_DUPLICATE_MAX_DISTANCE', '6'))
+# 平均顏色各通道最大差異（0-255）
+PHOTO_DUPLICATE_MAX_COLOR_DIFF = float(os.getenv('PHOTO_DUPLICATE_MAX_COLOR_DIFF', '6'))
+# 只分析（未記錄為ML訓練案例）的照片記錄保留天數，逾期記錄在新增記錄時清除
+PHOTO_HASH_ANALYSIS_TTL_DAYS = float(os.getenv('PHOTO_HASH_ANALYSIS_TTL_DAYS', '7'))
+
+# dHash 分成 8 段，每段 8 位元：距離不超過 7 的兩個雜湊至少有一段完全相同（鴿巢原理），
+# 因此只需以各段的索引找出候選，再逐一計算漢明距離
+HASH_BANDS = 8
+BAND_BITS = 64 // HASH_BANDS
+BAND_COLUMNS = [f'band{index}' for index in range(HASH_BANDS)]
+
+
+def compute_dhash(pixels):
+    """
+    計算 64 位元差異雜湊（dHash）
+
+    Args:
+        pixels: RGB uint8 陣列（上傳時已解碼的分析解析度陣列）
+
+    Returns:
+        int: 灰階 9×8 縮圖中每個像素是否比右方相鄰像素亮
+    """
+    gray = np.asarray(Image.fromarray(pixels).convert('L').resize((9, 8), Image.Resampling.BOX), dtype=np.int16)
+    bits = (gray[:, :-1] > gray[:, 1:]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def mean_color(pixels):
+    """分析陣列的平均 RGB"""
+    return [round(float(value), 2) for value in pixels.reshape(-1, 3).mean(axis=0)]
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def split_bands(phash):
+    return [(phash >> (index * BAND_BITS)) & ((1 << BAND_BITS) - 1) for index in range(HASH_BANDS)]
+
+
+class PhotoDedupeIndex:
+    """照片感知雜湊索引（SQLite，每段雜湊各有索引）"""
+
+    def __init__(self, db_path=PHOTO_HASH_DB, max_distance=PHOTO_DUPLICATE_MAX_DISTANCE,
+                 max_color_diff=PHOTO_DUPLICATE_MAX_COLOR_DIFF, analysis_ttl_days=PHOTO_HASH_ANALYSIS_TTL_DAYS):
+        """
+        Args:
+            db_path: SQLite 檔案路徑
+            max_distance: 視為重複的最大漢明距離（須小於 HASH_BANDS 才能保證找到所有重複）
+            max_color_diff: 視為重複的平均顏色最大通道差異
+            analysis_ttl_days: 只分析的照片記錄保留天數
+        """
+        self.db_path = db_path
+        self.max_distance = min(max_distance, HASH_BANDS - 1)
+        self.max_color_diff = max_color_diff
+        self.analysis_ttl_days = analysis_ttl_days
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.lookups = 0
+        self.duplicates_found = 0
+        self.pruned = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._initialized:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS photo_hashes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    phash TEXT NOT NULL,        -- 64 位元 dHash（16 位十六進位）
+                    {', '.join(f'{column} INTEGER NOT NULL' for column in BAND_COLUMNS)},
+                    mean_red REAL,
+                    mean_green REAL,
+                    mean_blue REAL,
+                    case_id TEXT,               -- ML訓練案例ID（只分析未記錄的照片為 NULL）
+                    saved_path TEXT,
+                    analysis TEXT,              -- 分析結果 JSON
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            for column in BAND_COLUMNS:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS idx_photo_hashes_{column} ON photo_hashes({column})')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_photo_hashes_created_at ON photo_hashes(created_at)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def find(self, phash, color, require_case=False):
+        """
+        尋找漢明距離及平均顏色差異都在閾值內、雜湊最接近的已索引照片
+
+        Args:
+            phash: compute_dhash 的結果
+            color: mean_color 的結果
+            require_case: 只匹配已記錄為ML訓練案例的照片
+
+        Returns:
+            dict 或 None: {'id', 'phash', 'distance', 'case_id', 'saved_path', 'analysis', 'created_at'}
+        """
+        bands = split_bands(phash)
+        sql = (f"SELECT id, phash, mean_red, mean_green, mean_blue, case_id, saved_path, analysis, created_at "
+               f"FROM photo_hashes "
+               f"WHERE ({' OR '.join(f'{column} = ?' for column in BAND_COLUMNS)})")
+        if require_case:
+            sql += " AND case_id IS NOT NULL"
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(sql, bands).fetchall()
+            finally:
+                conn.close()
+        self.lookups += 1
+
+        best = None
+        for row_id, row_hash, red, green, blue, case_id, saved_path, analysis, created_at in rows:
+            distance = hamming_distance(phash, int(row_hash, 16))
+            if distance > self.max_distance or (best is not None and distance >= best['distance']):
+                continue
+            if max(abs(a - b) for a, b in zip(color, (red, green, blue))) > self.max_color_diff:
+                continue
+            best = {
+                'id': row_id,
+                'phash': row_hash,
+                'distance': distance,
+                'case_id': case_id,
+                'saved_path': saved_path,
+                'analysis': json.loads(analysis) if analysis else None,
+                'created_at': created_at
+            }
+        if best:
+            self.duplicates_found += 1
+        return best
+
+    def add(self, phash, color, analysis=None, case_id=None, saved_path=None):
+        """索引一張照片，返回記錄ID（同時清除逾期的只分析記錄）"""
+        now = datetime.now()
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    self.pruned += conn.execute(
+                        'DELETE FROM photo_hashes WHERE case_id IS NULL AND created_at < ?',
+                        ((now - timedelta(days=self.analysis_ttl_days)).isoformat(),)
+                    ).rowcount
+                    cursor = conn.execute(
+                        f"INSERT INTO photo_hashes (phash, {', '.join(BAND_COLUMNS)}, mean_red, mean_green, "
+                        f"mean_blue, case_id, saved_path, analysis, created_at) "
+                        f"VALUES ({', '.join(['?'] * (HASH_BANDS + 8))})",
+                        [f'{phash:016x}', *split_bands(phash), *color, case_id, saved_path,
+                         json.dumps(analysis, ensure_ascii=False, default=float) if analysis else None,
+                         now.isoformat()]
+                    )
+                return cursor.lastrowid
+            finally:
+                conn.close()
+
+    def clear(self, cases_only=False):
+        """
+        清除索引記錄（清理照片案例時一併調用，避免重新上傳的照片匹配已刪除的案例）
+
+        Args:
+            cases_only: 只清除已記錄為ML訓練案例的照片
+
+        Returns:
+            int: 刪除的記錄數
+        """
+        sql = 'DELETE FROM photo_hashes' + (' WHERE case_id IS NOT NULL' if cases_only else '')
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute(sql).rowcount
+            finally:
+                conn.close()
+
+    def clear_saved_paths(self, paths):
+        """照片檔案被刪除後清除指向它們的 saved_path（記錄及分析結果保留），返回更新數量"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.executemany('UPDATE photo_hashes SET saved_path = NULL WHERE saved_path = ?',
+                                            [(path,) for path in paths]).rowcount
+            finally:
+                conn.close()
+
+    def delete_before(self, cutoff):
+        """刪除在 cutoff（datetime）之前索引的記錄，返回刪除數量"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute('DELETE FROM photo_hashes WHERE created_at < ?',
+                                        (cutoff.isoformat(),)).rowcount
+            finally:
+                conn.close()
+
+    def stats(self):
+        """索引統計"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                indexed, cases = conn.execute(
+                    'SELECT COUNT(*), COUNT(case_id) FROM photo_hashes'
+                ).fetchone()
+            finally:
+                conn.close()
+        return {
+            'indexed_photos': indexed,
+            'indexed_cases': cases,
+            'max_distance': self.max_distance,
+            'max_color_diff': self.max_color_diff,
+            'analysis_ttl_days': self.analysis_ttl_days,
+            'lookups': self.lookups,
+            'duplicates_found': self.duplicates_found,
+            'pruned': self.pruned
+        }
+
+
+# 全域共用實例
+photo_dedupe_index = PhotoDedupeIndex()
@@ -0,0 +1,246 @@
+"""
+照片分析工作佇列模組
+上傳請求只需暫存照片並取得工作ID，分析、ML案例記錄及重新訓練檢查由有界的
+背景執行緒池處理；排隊工作數達到上限時拒絕新工作，避免照片分析佔用預測請求的資源。
+工作狀態及結果記錄在暫存目錄的 SQLite 表中，同一主機上的多個 gunicorn 工作進程
+共用排隊上限，任一進程都能查詢其他進程接收的工作
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+PHOTO_JOB_WORKERS = int(os.getenv('PHOTO_JOB_WORKERS', '2'))
+PHOTO_JOB_MAX_PENDING = int(os.getenv('PHOTO_JOB_MAX_PENDING', '20'))
+PHOTO_JOB_RESULT_TTL = int(os.getenv('PHOTO_JOB_RESULT_TTL', '3600'))
+PHOTO_JOB_SPOOL_DIR = os.getenv('PHOTO_JOB_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'burnsky_photo_jobs'))
+PHOTO_JOB_DB_NAME = 'photo_jobs.db'
+
+
+class PhotoQueueFull(Exception):
+    """排隊中的工作已達上限"""
+
+
+class PhotoJobQueue:
+    """照片分析工作佇列（照片先暫存到磁碟，工作執行時才讀取）"""
+
+    def __init__(self, workers=PHOTO_JOB_WORKERS, max_pending=PHOTO_JOB_MAX_PENDING,
+                 result_ttl=PHOTO_JOB_RESULT_TTL, spool_dir=PHOTO_JOB_SPOOL_DIR):
+        """
+        Args:
+            workers: 同時進行分析的執行緒數
+            max_pending: 排隊及執行中工作數上限（超過時 submit 拋出 PhotoQueueFull）
+            result_ttl: 完成的工作結果保留秒數
+            spool_dir: 上傳照片暫存目錄（工作狀態數據庫亦位於此目錄）
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.spool_dir = spool_dir
+        self.db_path = os.path.join(spool_dir, PHOTO_JOB_DB_NAME)
+        self._executor = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='photo-job')
+        return self._executor
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.spool_dir, exist_ok=True)
+        # 自動提交模式：submit 以 BEGIN IMMEDIATE 明確開始交易，跨進程檢查排隊上限
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._initialized:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS photo_jobs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- 提交順序（計算排隊位置）
+                    job_id TEXT NOT NULL UNIQUE,
+                    status TEXT NOT NULL,                   -- queued / running / done / failed
+                    created_at TEXT NOT NULL,
+                    created_ts REAL NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    finished_ts REAL,
+                    result TEXT,                            -- 結果 JSON
+                    error TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_photo_jobs_status ON photo_jobs(status)')
+            self._initialized = True
+        return conn
+
+    def _prune(self, conn):
+        """
+        移除過期的已完成工作
+
+        超過保留時間仍未完成的工作視為已遺失（接收工作的進程已結束），一併移除以釋放排隊名額
+        """
+        cutoff = time.time() - self.result_ttl
+        conn.execute('''
+            DELETE FROM photo_jobs
+            WHERE finished_ts < ? OR (finished_ts IS NULL AND created_ts < ?)
+        ''', (cutoff, cutoff))
+
+    def submit(self, photo_data, handler, **kwargs):
+        """
+        暫存照片並提交分析工作
+
+        Args:
+            photo_data: 照片位元組
+            handler: handler(photo_data, **kwargs) → 結果字典（在背景執行緒執行，須可序列化為 JSON）
+
+        Returns:
+            str: 工作ID
+
+        Raises:
+            PhotoQueueFull: 排隊工作數已達上限
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._prune(conn)
+                active = conn.execute(
+                    "SELECT COUNT(*) FROM photo_jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()[0]
+                if active >= self.max_pending:
+                    conn.execute('ROLLBACK')
+                    with self._lock:
+                        self.rejected += 1
+                    raise PhotoQueueFull(f"照片分析佇列已滿（{self.max_pending} 個工作），請稍後再試")
+                conn.execute('''
+                    INSERT INTO photo_jobs (job_id, status, created_at, created_ts)
+                    VALUES (?, 'queued', ?, ?)
+                ''', (job_id, datetime.now().isoformat(), time.time()))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+
+        spool_path = None
+        try:
+            executor = self._get_executor()
+            fd, spool_path = tempfile.mkstemp(prefix=f'{job_id}_', dir=self.spool_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(photo_data)
+            executor.submit(self._run, job_id, spool_path, handler, kwargs)
+        except Exception as e:
+            # 暫存或提交失敗：工作標記為失敗（不再佔用排隊名額）並刪除暫存檔
+            self._finish(job_id, error=f"提交工作失敗: {e}")
+            self._remove_spool(spool_path)
+            raise
+        return job_id
+
+    def _finish(self, job_id, result=None, error=None):
+        """記錄工作結果（狀態及完成時間一併更新）"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE photo_jobs SET status = ?, finished_at = ?, finished_ts = ?, result = ?, error = ?
+                WHERE job_id = ?
+            ''', ('failed' if error is not None else 'done', datetime.now().isoformat(), time.time(),
+                  json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id))
+        finally:
+            conn.close()
+        with self._lock:
+            if error is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    @staticmethod
+    def _remove_spool(spool_path):
+        if spool_path is None:
+            return
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
+
+    def _run(self, job_id, spool_path, handler, kwargs):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE photo_jobs SET status = 'running', started_at = ? WHERE job_id = ?",
+                         (datetime.now().isoformat(), job_id))
+        finally:
+            conn.close()
+        try:
+            with open(spool_path, 'rb') as f:
+                photo_data = f.read()
+            result = handler(photo_data, **kwargs)
+            # 結果須能寫入數據庫，序列化失敗時工作記為失敗
+            json.dumps(result, ensure_ascii=False)
+        except Exception as e:
+            print(f"❌ 照片分析工作失敗 {job_id}: {e}")
+            self._finish(job_id, error=str(e))
+        else:
+            self._finish(job_id, result=result)
+        finally:
+            self._remove_spool(spool_path)
+
+    def get(self, job_id):
+        """查詢工作狀態，不存在或已過期時返回 None"""
+        conn = self._connect()
+        try:
+            self._prune(conn)
+            row = conn.execute('''
+                SELECT seq, status, created_at, started_at, finished_at, result, error
+                FROM photo_jobs WHERE job_id = ?
+            ''', (job_id,)).fetchone()
+            if row is None:
+                return None
+            seq, status, created_at, started_at, finished_at, result, error = row
+            job = {
+                'status': status,
+                'created_at': created_at,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'result': json.loads(result) if result is not None else None,
+                'error': error
+            }
+            if status == 'queued':
+                # 排在此工作之前（含此工作）的排隊工作數
+                job['queue_position'] = conn.execute(
+                    "SELECT COUNT(*) FROM photo_jobs WHERE status = 'queued' AND seq <= ?", (seq,)
+                ).fetchone()[0]
+            return job
+        finally:
+            conn.close()
+
+    def stats(self):
+        """佇列統計（排隊及執行中為所有進程合計，完成、失敗及拒絕數為本進程計數）"""
+        conn = self._connect()
+        try:
+            self._prune(conn)
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM photo_jobs WHERE status IN ('queued', 'running') GROUP BY status"
+            ).fetchall())
+        finally:
+            conn.close()
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected
+        }
+
+
+# 全域共用實例
+photo_job_queue = PhotoJobQueue()
@@ -1,8 +1,11 @@
 """
 pytest 配置和共用 fixtures
 """
+import atexit
 import os
+import shutil
 import sys
+import tempfile
 import pytest
 from pathlib import Path
 
@@ -14,7 +17,26 @@ sys.path.insert(0, str(project_root))
 os.environ['FLASK_ENV'] = 'testing'
 os.environ['TESTING'] = 'true'
 os.environ['RATE_LIMIT_ENABLED'] = 'false'  # 測試時禁用速率限制
-os.environ['CACHE_TYPE'] = 'null'  # 測試時禁用Flask-Caching快取
+os.environ['CACHE_TYPE'] = 'NullCache'  # 測試時禁用Flask-Caching快取
+os.environ['WEBCAM_BACKGROUND_MONITOR'] = 'false'  # 測試時不啟動背景輪詢（避免實時請求天文台）
+
+# 數據庫、日誌及上傳檔案寫入臨時目錄，避免測試修改倉庫內的數據庫
+# （部分數據庫以相對路徑開啟，因此同時切換工作目錄，並複製已訓練模型）
+test_data_dir = tempfile.mkdtemp(prefix='burnsky_tests_')
+atexit.register(shutil.rmtree, test_data_dir, ignore_errors=True)
+shutil.copytree(project_root / 'models', os.path.join(test_data_dir, 'models'))
+for env_name, filename in {
+    'LOG_FILE': 'app.log',
+    'PREDICTION_HISTORY_DB': 'prediction_history.db',
+    'FEATURE_STORE_DB': 'prediction_history.db',
+    'PHOTO_HASH_DB': 'photo_hashes.db',
+    'WEBCAM_METRICS_DB': 'webcam_metrics.db',
+    'UPLOAD_FOLDER': 'uploads',
+    'PHOTO_JOB_SPOOL_DIR': 'photo_jobs',
+    'CACHE_DIR': 'cache',
+}.items():
+    os.environ[env_name] = os.path.join(test_data_dir, filename)
+os.chdir(test_data_dir)
 
 from app import app as flask_app
 
@@ -0,0 +1,101 @@
+"""
+攝影機斷路器測試
+"""
+import pytest
+
+from hko_webcam_fetcher import CameraCircuitBreaker
+
+
+def expire_cooldown(breaker):
+    """把斷開時間往前推，模擬冷卻期已過"""
+    breaker.opened_at -= breaker.cooldown + 1
+
+
+@pytest.mark.unit
+class TestCameraCircuitBreaker:
+
+    def test_opens_after_threshold_failures(self):
+        breaker = CameraCircuitBreaker(failure_threshold=3, cooldown=60)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CameraCircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == CameraCircuitBreaker.OPEN
+        assert breaker.open_count == 1
+
+    def test_success_resets_failure_streak(self):
+        breaker = CameraCircuitBreaker(failure_threshold=3)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success(0.5)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CameraCircuitBreaker.CLOSED
+
+    def test_rejects_during_cooldown(self):
+        breaker = CameraCircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record_failure()
+        assert not breaker.allow_request()
+        assert not breaker.allow_request()
+        assert breaker.rejected == 2
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CameraCircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record_failure()
+        expire_cooldown(breaker)
+
+        assert breaker.allow_request()
+        assert breaker.state == CameraCircuitBreaker.HALF_OPEN
+        assert not breaker.allow_request()
+
+        breaker.release_probe()
+        assert breaker.allow_request()
+
+    def test_successful_probe_closes(self):
+        breaker = CameraCircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record_failure()
+        expire_cooldown(breaker)
+        assert breaker.allow_request()
+        breaker.record_success(0.3)
+        assert breaker.state == CameraCircuitBreaker.CLOSED
+        assert breaker.cooldown == 60
+        assert breaker.allow_request()
+
+    def test_failed_probe_doubles_cooldown_up_to_max(self):
+        breaker = CameraCircuitBreaker(failure_threshold=1, cooldown=60, max_cooldown=200)
+        breaker.record_failure()
+        for expected in (120, 200, 200):
+            expire_cooldown(breaker)
+            assert breaker.allow_request()
+            breaker.record_failure()
+            assert breaker.state == CameraCircuitBreaker.OPEN
+            assert breaker.cooldown == expected
+        assert breaker.open_count == 4
+
+    def test_timeout_uses_max_until_enough_samples(self):
+        breaker = CameraCircuitBreaker(max_timeout=10, min_timeout=2)
+        for _ in range(4):
+            breaker.record_success(1.0)
+        assert breaker.timeout() == 10
+        breaker.record_success(1.0)
+        assert breaker.timeout() == pytest.approx(3.0)
+
+    def test_timeout_is_clamped(self):
+        fast = CameraCircuitBreaker(max_timeout=10, min_timeout=2)
+        slow = CameraCircuitBreaker(max_timeout=10, min_timeout=2)
+        for _ in range(5):
+            fast.record_success(0.1)
+            slow.record_success(8.0)
+        assert fast.timeout() == 2
+        assert slow.timeout() == 10
+
+    def test_status_reports_retry_in(self):
+        breaker = CameraCircuitBreaker(failure_threshold=1, cooldown=60)
+        assert breaker.status()['state'] == CameraCircuitBreaker.CLOSED
+        breaker.record_failure()
+        status = breaker.status()
+        assert status['state'] == CameraCircuitBreaker.OPEN
+        assert 0 < status['retry_in_seconds'] <= 60
+        assert status['rejected_requests'] == 0
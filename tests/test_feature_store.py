@@ -0,0 +1,126 @@
+"""
+預測特徵庫測試
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from feature_store import ML_FEATURE_COLUMNS, MATRIX_COLUMNS, FeatureStore
+
+
+UNIFIED_RESULT = {
+    'ml_features': {name: float(index) for index, name in enumerate(ML_FEATURE_COLUMNS)},
+    'factor_scores': {'time': 10, 'cloud': 8},
+    'weights_used': {'traditional': 0.4, 'ml': 0.6},
+    'traditional_score': 50,
+    'ml_score': 60,
+    'final_score': 56
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(db_path=str(tmp_path / 'features.db'), batch_size=1000, flush_interval=60)
+    yield store
+    store.close()
+
+
+def count_rows(store, table):
+    conn = sqlite3.connect(store.db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.unit
+class TestBackgroundWriter:
+
+    def test_records_are_queued_until_flush(self, store):
+        feature_uid = store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0, 'abc123')
+        assert store.stats()['writer_alive']
+        assert count_rows(store, 'prediction_features') == 0
+
+        assert store.flush()
+        matrix = store.load_feature_matrix()
+        assert matrix['uids'] == [feature_uid]
+        assert matrix['X'].shape == (1, len(MATRIX_COLUMNS))
+        row = dict(zip(matrix['columns'], matrix['X'][0]))
+        assert row['factor_time'] == 10
+        assert np.isnan(row['factor_uv'])
+        assert row['final_score'] == 57
+
+    def test_close_flushes_and_stops_writer(self, store):
+        store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        writer = store._writer
+        assert store.close()
+        assert not writer.is_alive()
+        assert count_rows(store, 'prediction_features') == 1
+        assert store.stats()['written'] == 1
+
+    def test_writer_restarts_after_close(self, store):
+        store.close()
+        store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        assert store.close()
+        assert count_rows(store, 'prediction_features') == 1
+
+    def test_full_queue_drops_records(self, tmp_path):
+        store = FeatureStore(db_path=str(tmp_path / 'f.db'), max_queue=1, flush_interval=60)
+        store._ensure_writer = lambda: None
+        store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        assert store.stats()['dropped'] == 1
+
+
+@pytest.mark.unit
+class TestLabelJoin:
+
+    def test_each_serve_gets_its_own_uid(self, store):
+        feature_uid = store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        first, second = store.record_serve(feature_uid), store.record_serve(feature_uid)
+        assert first != second and feature_uid not in (first, second)
+        assert store.record_serve(None) is None
+
+    def test_labels_join_through_served_uid(self, store):
+        feature_uid = store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        other_uid = store.record_prediction(UNIFIED_RESULT, 30, 'sunrise', 0)
+        served_a = store.record_serve(feature_uid)
+        served_b = store.record_serve(feature_uid)
+        store.record_serve(other_uid)
+
+        assert store.link_label(served_a, 'user_feedback', 'fb1', 80)
+        assert store.link_label(served_b, 'photo_case', 'case1', 7)
+        # 直接連結到特徵記錄的舊標籤仍然有效
+        assert store.link_label(other_uid, 'user_feedback', 'fb2', 20)
+        assert not store.link_label(None, 'user_feedback', 'fb3', 50)
+        store.flush()
+
+        matrix = store.load_feature_matrix(labeled_only=True)
+        labels = sorted(zip(matrix['uids'], matrix['y']), key=lambda item: item[1])
+        assert labels == [(other_uid, 20.0), (feature_uid, 70.0), (feature_uid, 80.0)]
+        assert len(store.load_feature_matrix()['uids']) == 2
+
+    def test_unknown_uid_label_is_not_joined(self, store):
+        store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+        store.link_label('missing', 'user_feedback', 'fb1', 80)
+        store.flush()
+        assert store.load_feature_matrix(labeled_only=True)['uids'] == []
+
+
+@pytest.mark.unit
+def test_predict_routes_issue_uid_per_response(client, store, monkeypatch):
+    import app as app_module
+    feature_uid = store.record_prediction(UNIFIED_RESULT, 57, 'sunset', 0)
+    cached = {'status': 'success', 'burnsky_score': 57, '_feature_uid': feature_uid}
+    monkeypatch.setattr(app_module, 'feature_store', store)
+    monkeypatch.setattr(app_module, 'predict_burnsky_core', lambda *args, **kwargs: cached)
+
+    responses = [client.get('/predict?type=sunset').get_json(), client.get('/predict/sunset').get_json()]
+    uids = [response['prediction_uid'] for response in responses]
+    assert uids[0] and uids[0] != uids[1]
+    assert all('_feature_uid' not in response for response in responses)
+
+    store.link_label(uids[1], 'user_feedback', 'fb1', 90)
+    store.flush()
+    assert store.load_feature_matrix(labeled_only=True)['uids'] == [feature_uid]
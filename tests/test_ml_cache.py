@@ -0,0 +1,90 @@
+"""
+ML推論快取測試
+"""
+import pytest
+
+from ml_cache import MLPredictionCache, quantize_features
+from advanced_predictor import AdvancedBurnskyPredictor
+
+
+WEATHER_DATA = {
+    'temperature': {'data': [{'place': '香港天文台', 'value': 28.34}]},
+    'humidity': {'data': [{'place': '香港天文台', 'value': 71}]}
+}
+
+
+@pytest.mark.unit
+class TestQuantizeFeatures:
+    """特徵量化"""
+
+    def test_rounds_to_step_and_keeps_order(self):
+        features = {'temperature': 28.34, 'humidity': 70.6, 'time_factor': 0.513, 'unknown': 1.234}
+        quantized = quantize_features(features)
+        assert list(quantized) == list(features)
+        assert quantized == {'temperature': 28.5, 'humidity': 71, 'time_factor': 0.52, 'unknown': 1.234}
+
+    def test_nearby_values_share_key(self):
+        cache = MLPredictionCache()
+        a = cache.make_key(quantize_features({'temperature': 28.3, 'humidity': 70.8}), 'v1')
+        b = cache.make_key(quantize_features({'temperature': 28.6, 'humidity': 71.2}), 'v1')
+        assert a == b
+
+
+@pytest.mark.unit
+class TestMLPredictionCache:
+    """有界 LRU 快取"""
+
+    def test_hit_and_miss_counters(self):
+        cache = MLPredictionCache(max_size=4)
+        assert cache.get(('v1', 1)) is None
+        cache.put(('v1', 1), {'score': 10})
+        assert cache.get(('v1', 1)) == {'score': 10}
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+    def test_evicts_least_recently_used(self):
+        cache = MLPredictionCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')  # a 變為最近使用
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_model_version_change_invalidates(self):
+        cache = MLPredictionCache()
+        cache.set_model_version('v1')
+        cache.put(('v1', 1), 'old')
+        cache.set_model_version('v1')
+        assert cache.stats()['size'] == 1
+        cache.set_model_version('v2')
+        assert cache.stats()['size'] == 0
+        assert cache.stats()['invalidations'] == 1
+
+
+@pytest.mark.unit
+class TestPredictMLCaching:
+    """predict_ml 的快取行為"""
+
+    @pytest.fixture
+    def predictor(self):
+        predictor = AdvancedBurnskyPredictor()
+        if predictor.regression_model is None:
+            pytest.skip('models/ 沒有已訓練的模型')
+        return predictor
+
+    def test_model_input_is_not_quantized(self, predictor):
+        result = predictor.predict_ml(WEATHER_DATA, {})
+        assert result['input_features']['temperature'] == 28.34
+
+    def test_caller_mutation_does_not_leak_into_cache(self, predictor):
+        first = predictor.predict_ml(WEATHER_DATA, {})
+        expected = dict(first['ml_class_probabilities'])
+        first['ml_class_probabilities']['low'] = 99
+        first['feature_importance'].clear()
+
+        second = predictor.predict_ml(WEATHER_DATA, {})
+        assert second['ml_class_probabilities'] == expected
+        assert second['feature_importance']
@@ -0,0 +1,100 @@
+"""
+ML代理模型驗收門檻測試
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+import model_distiller
+from model_distiller import CompactTreeEnsemble, check_fidelity
+from unified_scorer import UnifiedBurnskyScorer
+
+
+def fidelity(mae, max_abs_error):
+    return {'mae': mae, 'max_abs_error': max_abs_error}
+
+
+def constant_surrogate(metadata, score=42.0):
+    """只有一個葉節點的代理模型（固定輸出 score）"""
+    return CompactTreeEnsemble(
+        feature=np.zeros((1, 1), dtype=np.int8),
+        threshold=np.full((1, 1), np.inf, dtype=np.float32),
+        left=np.zeros((1, 1), dtype=np.int16),
+        right=np.zeros((1, 1), dtype=np.int16),
+        value=np.zeros((1, 1), dtype=np.float32),
+        base_score=score,
+        depth=1,
+        metadata=metadata
+    )
+
+
+@pytest.mark.unit
+class TestCheckFidelity:
+
+    def test_passes_within_thresholds(self):
+        metadata = {'fidelity': {'uniform_holdout': fidelity(1.0, 6.0), 'training_distribution': fidelity(1.5, 9.0)}}
+        assert check_fidelity(metadata, max_abs_error=10, max_mae=2) == []
+
+    def test_any_evaluation_set_over_threshold_fails(self):
+        metadata = {'fidelity': {'uniform_holdout': fidelity(1.0, 6.0), 'training_distribution': fidelity(2.8, 20.5)}}
+        failures = check_fidelity(metadata, max_abs_error=10, max_mae=2)
+        assert len(failures) == 2
+        assert all(failure.startswith('training_distribution') for failure in failures)
+
+    def test_missing_report_fails(self):
+        assert check_fidelity({}) == ['缺少保真度報告']
+
+
+@pytest.mark.unit
+class TestSurrogateLoading:
+
+    @pytest.fixture
+    def scorer(self, tmp_path):
+        scorer = UnifiedBurnskyScorer()
+        scorer.SCORING_CONFIG['ml_backend'] = 'surrogate'
+        scorer.SCORING_CONFIG['surrogate_path'] = str(tmp_path / 'surrogate.npz')
+        scorer.advanced_predictor.model_version = 'v1'
+        return scorer
+
+    def save(self, scorer, teacher_version='v1', max_abs_error=5.0):
+        metadata = {'teacher_version': teacher_version,
+                    'fidelity': {'training_distribution': fidelity(1.0, max_abs_error)}}
+        constant_surrogate(metadata).save(scorer.SCORING_CONFIG['surrogate_path'])
+
+    def test_accepted_surrogate_is_used(self, scorer):
+        self.save(scorer)
+        assert scorer._get_surrogate() is not None
+        assert scorer._get_ml_score({}, {}) == 42
+
+    def test_low_fidelity_surrogate_is_refused(self, scorer):
+        self.save(scorer, max_abs_error=model_distiller.SURROGATE_MAX_ABS_ERROR + 1)
+        assert scorer._get_surrogate() is None
+
+    def test_teacher_version_mismatch_falls_back(self, scorer):
+        self.save(scorer, teacher_version='v0')
+        assert scorer._get_surrogate() is None
+        # 模型版本與代理模型一致後重新使用代理模型
+        scorer.advanced_predictor.model_version = 'v0'
+        assert scorer._get_surrogate() is not None
+
+
+@pytest.mark.unit
+def test_distillation_below_threshold_is_not_saved(tmp_path, monkeypatch):
+    """保真度未達門檻時 main 以非零狀態結束且不寫入代理模型"""
+    output = tmp_path / 'surrogate.npz'
+
+    def weak_distill(self, **kwargs):
+        metadata = {'fidelity': {'training_distribution': fidelity(2.8, 20.5)}}
+        metadata['acceptance'] = {'failures': check_fidelity(metadata)}
+        metadata['latency'] = {'teacher_ms': 1.0, 'surrogate_ms': 0.1}
+        return constant_surrogate(metadata), metadata
+
+    monkeypatch.setattr(model_distiller.ModelDistiller, '__init__', lambda self: None)
+    monkeypatch.setattr(model_distiller.ModelDistiller, 'distill', weak_distill)
+    monkeypatch.setattr(sys, 'argv', ['model_distiller.py', '--output', str(output)])
+    with pytest.raises(SystemExit) as exc:
+        model_distiller.main()
+    assert exc.value.code == 1
+    assert not os.path.exists(output)
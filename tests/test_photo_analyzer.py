@@ -0,0 +1,40 @@
+"""
+照片分析模組解碼解析度測試
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules.config import PHOTO_ANALYSIS_SIZE
+from modules.photo_analyzer import analyze_photo_quality, load_photo_rgb
+
+
+@pytest.fixture
+def large_jpeg():
+    rng = np.random.default_rng(5)
+    output = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (1500, 2000, 3), dtype=np.uint8)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+@pytest.mark.unit
+def test_load_photo_rgb_decodes_at_analysis_size(large_jpeg):
+    pixels, scale = load_photo_rgb(large_jpeg)
+    assert pixels.shape[1] <= PHOTO_ANALYSIS_SIZE[0] and pixels.shape[0] <= PHOTO_ANALYSIS_SIZE[1]
+    assert scale == pytest.approx((2000 / 800) ** 2)
+
+
+@pytest.mark.unit
+def test_full_resolution_only_when_requested(large_jpeg):
+    pixels, scale = load_photo_rgb(large_jpeg, target_size=None)
+    assert pixels.shape[:2] == (1500, 2000)
+    assert scale == 1
+
+
+@pytest.mark.unit
+def test_analyze_photo_quality_reports_scale(large_jpeg):
+    analysis = analyze_photo_quality(large_jpeg)
+    assert 'error' not in analysis
+    assert analysis['analysis_scale'] == 6.25
@@ -0,0 +1,135 @@
+"""
+照片批次分析測試
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules.image_decode import decode_photo
+from modules.photo_features import extract_photo_features, generate_photo_recommendation, score_burnsky_photo
+from photo_batch_analyzer import PhotoBatchPool, analyze_photo_file, summarize_session
+
+
+def photo(index, score, warm=0.1, capture_time=None):
+    return {'index': index, 'filename': f'{index}.jpg', 'quality_score': score,
+            'warm_ratio': warm, 'capture_time': capture_time}
+
+
+@pytest.mark.unit
+class TestSummarizeSession:
+
+    def test_returns_none_when_all_failed(self):
+        assert summarize_session([]) is None
+        assert summarize_session([{'index': 0, 'filename': 'a.jpg', 'error': '無法解碼'}]) is None
+
+    def test_upload_order_without_capture_time(self):
+        summary = summarize_session([photo(0, 40), photo(1, 60, warm=0.5), photo(2, 80)])
+        assert summary['ordered_by'] == 'upload_order'
+        assert summary['best_frame']['index'] == 2
+        assert summary['color_peak']['index'] == 1
+        assert summary['score_stats'] == {'mean': 60.0, 'min': 40.0, 'max': 80.0}
+        assert summary['score_trend']['trend'] == 'rising'
+        assert summary['score_trend']['slope'] == 20.0
+        assert summary['score_trend']['slope_unit'] == 'per_photo'
+        assert 'duration_minutes' not in summary
+
+    def test_capture_time_reorders_and_uses_minutes(self):
+        # 上傳順序與拍攝順序相反：按時間排序後評分下降
+        summary = summarize_session([
+            photo(0, 30, capture_time='2025-07-01T19:10:00'),
+            photo(1, 50, capture_time='2025-07-01T19:05:00'),
+            photo(2, 70, capture_time='2025-07-01T19:00:00')
+        ])
+        assert summary['ordered_by'] == 'capture_time'
+        assert summary['duration_minutes'] == 10.0
+        assert summary['score_trend']['trend'] == 'falling'
+        assert summary['score_trend']['slope'] == -4.0
+        assert summary['score_trend']['slope_unit'] == 'per_minute'
+        assert summary['score_trend']['scores'] == [70, 50, 30]
+
+    def test_partial_capture_time_falls_back_to_upload_order(self):
+        summary = summarize_session([photo(0, 50, capture_time='2025-07-01T19:00:00'), photo(1, 50)])
+        assert summary['ordered_by'] == 'upload_order'
+        assert summary['score_trend']['trend'] == 'stable'
+
+    def test_errors_are_excluded(self):
+        summary = summarize_session([photo(0, 40), {'index': 1, 'filename': '1.jpg', 'error': '無法解碼'},
+                                     photo(2, 90)])
+        assert summary['photo_count'] == 2
+        assert summary['best_frame']['index'] == 2
+
+    def test_scoreless_results_are_excluded(self):
+        summary = summarize_session([photo(0, 40), {'index': 1, 'filename': '1.jpg', 'quality_score': None},
+                                     photo(2, 90)])
+        assert summary['photo_count'] == 2
+
+    def test_single_photo_has_no_trend(self):
+        summary = summarize_session([photo(0, 55)])
+        assert summary['score_trend'] is None
+
+    def test_identical_capture_times_have_no_trend(self):
+        summary = summarize_session([photo(0, 40, capture_time='2025-07-01T19:00:00'),
+                                     photo(1, 60, capture_time='2025-07-01T19:00:00')])
+        assert summary['score_trend'] is None
+
+
+@pytest.mark.unit
+class TestPhotoBatchPool:
+
+    def test_from_env_shares_pool_unless_configured(self, monkeypatch):
+        class SharedPool:
+            workers = 3
+            enabled = True
+
+        monkeypatch.delenv('PHOTO_BATCH_WORKERS', raising=False)
+        shared = PhotoBatchPool.from_env(shared_pool=SharedPool())
+        assert shared.stats()['shared'] and shared.workers == 3
+
+        monkeypatch.setenv('PHOTO_BATCH_WORKERS', '1')
+        own = PhotoBatchPool.from_env(shared_pool=SharedPool())
+        assert not own.stats()['shared'] and not own.enabled
+
+    def test_in_process_analysis_keeps_order(self, tmp_path):
+        bad = tmp_path / 'bad.jpg'
+        bad.write_bytes(b'not a photo')
+        pool = PhotoBatchPool(workers=1)
+        results = pool.analyze_files([str(bad), str(bad)])
+        assert len(results) == 2
+        assert all('error' in result for result in results)
+        assert pool.stats()['photos'] == 2
+        assert analyze_photo_file(str(bad)).keys() == {'error'}
+
+
+@pytest.mark.unit
+class TestAnalyzePhotoFile:
+
+    def test_uses_single_photo_scorer(self, tmp_path):
+        """批次評分與 /api/analyze-photo 相同（score_burnsky_photo）"""
+        rng = np.random.default_rng(3)
+        output = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)).save(output, format='JPEG')
+        path = tmp_path / 'sunset.jpg'
+        path.write_bytes(output.getvalue())
+
+        expected = score_burnsky_photo(extract_photo_features(decode_photo(output.getvalue()).pixels,
+                                                              hsv_stats=False),
+                                       recommend=generate_photo_recommendation)
+        result = analyze_photo_file(str(path))
+        assert result['quality_score'] == expected['quality_score']
+        assert result['warm_ratio'] == expected['color_analysis']['warm_ratio']
+        assert result['analysis']['recommendation'] == expected['recommendation']
+
+    def test_analysis_error_is_top_level_failure(self, tmp_path, monkeypatch):
+        output = io.BytesIO()
+        Image.new('RGB', (40, 30), (200, 100, 50)).save(output, format='JPEG')
+        path = tmp_path / 'a.jpg'
+        path.write_bytes(output.getvalue())
+
+        def broken(*args, **kwargs):
+            raise ValueError('boom')
+        monkeypatch.setattr('photo_batch_analyzer.extract_photo_features', broken)
+        result = analyze_photo_file(str(path))
+        assert set(result) == {'error'}
+        assert summarize_session([{'index': 0, 'filename': 'a.jpg', **result}]) is None
@@ -0,0 +1,131 @@
+"""
+照片感知雜湊去重測試
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from photo_dedupe import (
+    HASH_BANDS, PhotoDedupeIndex, compute_dhash, hamming_distance, mean_color, split_bands
+)
+
+
+HASH = 0x0123456789ABCDEF
+COLOR = [200.0, 120.0, 60.0]
+
+
+def flip_bits(phash, count):
+    """翻轉最低的 count 個段各一個位元（距離為 count）"""
+    for band in range(count):
+        phash ^= 1 << (band * 8)
+    return phash
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PhotoDedupeIndex(db_path=str(tmp_path / 'hashes.db'), max_distance=6, max_color_diff=6,
+                            analysis_ttl_days=7)
+
+
+@pytest.mark.unit
+class TestHashing:
+
+    def test_split_bands_roundtrip(self):
+        bands = split_bands(HASH)
+        assert len(bands) == HASH_BANDS
+        assert sum(band << (index * 8) for index, band in enumerate(bands)) == HASH
+
+    def test_dhash_tolerates_brightness_shift(self):
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 200, (120, 160, 3)).astype(np.uint8)
+        brighter = (pixels.astype(np.int16) + 20).clip(0, 255).astype(np.uint8)
+        assert hamming_distance(compute_dhash(pixels), compute_dhash(brighter)) <= 2
+        assert mean_color(brighter)[0] == pytest.approx(mean_color(pixels)[0] + 20, abs=0.5)
+
+    def test_max_distance_capped_below_band_count(self, tmp_path):
+        assert PhotoDedupeIndex(db_path=str(tmp_path / 'h.db'), max_distance=20).max_distance == HASH_BANDS - 1
+
+
+@pytest.mark.unit
+class TestFind:
+
+    def test_within_distance_matches(self, index):
+        row_id = index.add(HASH, COLOR, analysis={'score': 70})
+        match = index.find(flip_bits(HASH, 6), COLOR)
+        assert match['id'] == row_id
+        assert match['distance'] == 6
+        assert match['analysis'] == {'score': 70}
+
+    def test_beyond_distance_is_not_duplicate(self, index):
+        index.add(HASH, COLOR)
+        assert index.find(flip_bits(HASH, 7), COLOR) is None
+
+    def test_returns_closest_match(self, index):
+        index.add(flip_bits(HASH, 4), COLOR)
+        closest = index.add(flip_bits(HASH, 1), COLOR)
+        assert index.find(HASH, COLOR)['id'] == closest
+
+    def test_color_difference_guard(self, index):
+        index.add(HASH, COLOR)
+        assert index.find(HASH, [206.0, 120.0, 60.0]) is not None
+        assert index.find(HASH, [200.0, 120.0, 66.5]) is None
+
+    def test_require_case(self, index):
+        index.add(HASH, COLOR)
+        assert index.find(HASH, COLOR, require_case=True) is None
+        index.add(HASH, COLOR, case_id='case_1')
+        assert index.find(HASH, COLOR, require_case=True)['case_id'] == 'case_1'
+
+    def test_stats_count_lookups_and_duplicates(self, index):
+        index.add(HASH, COLOR, case_id='case_1')
+        index.find(HASH, COLOR)
+        index.find(~HASH & (2 ** 64 - 1), COLOR)
+        stats = index.stats()
+        assert (stats['indexed_photos'], stats['indexed_cases']) == (1, 1)
+        assert (stats['lookups'], stats['duplicates_found']) == (2, 1)
+
+
+@pytest.mark.unit
+class TestMaintenance:
+
+    def backdate(self, index, row_id, days):
+        conn = sqlite3.connect(index.db_path)
+        with conn:
+            conn.execute('UPDATE photo_hashes SET created_at = ? WHERE id = ?',
+                         ((datetime.now() - timedelta(days=days)).isoformat(), row_id))
+        conn.close()
+
+    def test_add_prunes_expired_analysis_only_rows(self, index):
+        expired = index.add(HASH, COLOR)
+        case_row = index.add(flip_bits(HASH, 1), COLOR, case_id='case_1')
+        self.backdate(index, expired, 8)
+        self.backdate(index, case_row, 8)
+
+        index.add(flip_bits(HASH, 3), [0.0, 0.0, 0.0])
+        assert index.pruned == 1
+        assert index.find(HASH, COLOR)['id'] == case_row
+
+    def test_clear_cases_only(self, index):
+        index.add(HASH, COLOR, case_id='case_1')
+        index.add(HASH, COLOR)
+        assert index.clear(cases_only=True) == 1
+        assert index.find(HASH, COLOR, require_case=True) is None
+        assert index.find(HASH, COLOR) is not None
+        assert index.clear() == 1
+        assert index.stats()['indexed_photos'] == 0
+
+    def test_delete_before(self, index):
+        old = index.add(HASH, COLOR, case_id='case_1')
+        index.add(flip_bits(HASH, 2), COLOR, case_id='case_2')
+        self.backdate(index, old, 30)
+        assert index.delete_before(datetime.now() - timedelta(days=10)) == 1
+        assert index.find(HASH, COLOR)['case_id'] == 'case_2'
+
+    def test_clear_saved_paths_keeps_analysis(self, index):
+        index.add(HASH, COLOR, analysis={'score': 50}, saved_path='photos/a.jpg')
+        index.clear_saved_paths(['photos/a.jpg', 'photos/missing.jpg'])
+        match = index.find(HASH, COLOR)
+        assert match['saved_path'] is None
+        assert match['analysis'] == {'score': 50}
@@ -0,0 +1,46 @@
+"""
+照片特徵引擎測試：與原本逐像素參考實作比對輸出
+"""
+import numpy as np
+import pytest
+
+from benchmark_photo_features import (
+    compare, reference_burnsky_photo, reference_photo_quality, synthetic_samples
+)
+from modules.photo_features import extract_photo_features, score_burnsky_photo, score_photo_quality
+
+
+SAMPLES = synthetic_samples()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('name', list(SAMPLES))
+def test_burnsky_score_matches_reference(name):
+    pixels = SAMPLES[name]
+    engine = score_burnsky_photo(extract_photo_features(pixels, hsv_stats=False))
+    assert compare(reference_burnsky_photo(pixels), engine) == []
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('name', list(SAMPLES))
+def test_photo_quality_matches_reference(name):
+    pixels = SAMPLES[name]
+    engine = score_photo_quality(extract_photo_features(pixels, rgb_stats=False))
+    assert compare(reference_photo_quality(pixels), engine) == []
+
+
+@pytest.mark.unit
+def test_single_pass_features_serve_both_scores():
+    """同一份特徵可同時計算兩個分數，結果與分開計算一致"""
+    pixels = SAMPLES['sunset_gradient']
+    features = extract_photo_features(pixels)
+    assert compare(reference_burnsky_photo(pixels), score_burnsky_photo(features)) == []
+    assert compare(reference_photo_quality(pixels), score_photo_quality(features)) == []
+
+
+@pytest.mark.unit
+def test_compare_reports_differences():
+    assert compare({'a': 1.0, 'b': {'c': 2}}, {'a': 1.0, 'b': {'c': 2}}) == []
+    assert compare({'a': 1.0}, {'a': 1.5})
+    assert compare({'a': 1.0}, {'a': 1.0, 'b': 2})
+    assert compare({'a': np.float64(1.0)}, {'a': 1.0 + 1e-12}) == []
@@ -0,0 +1,136 @@
+"""
+照片分析工作佇列測試
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from photo_jobs import PHOTO_JOB_DB_NAME, PhotoJobQueue, PhotoQueueFull
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = PhotoJobQueue(workers=1, max_pending=2, result_ttl=60, spool_dir=str(tmp_path / 'spool'))
+    yield queue
+    if queue._executor is not None:
+        queue._executor.shutdown(wait=True)
+
+
+def wait_finished(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'工作 {job_id} 未在 {timeout} 秒內完成')
+
+
+def spooled_files(queue):
+    return [name for name in os.listdir(queue.spool_dir) if name != PHOTO_JOB_DB_NAME]
+
+
+def expire(queue, job_id):
+    conn = sqlite3.connect(queue.db_path)
+    with conn:
+        conn.execute('UPDATE photo_jobs SET finished_ts = finished_ts - ? WHERE job_id = ?',
+                     (queue.result_ttl + 1, job_id))
+    conn.close()
+
+
+@pytest.mark.unit
+class TestPhotoJobLifecycle:
+
+    def test_done_job_returns_result_and_removes_spool(self, queue):
+        job_id = queue.submit(b'photo-bytes', lambda data, suffix: {'size': len(data), 'suffix': suffix},
+                              suffix='x')
+        job = wait_finished(queue, job_id)
+        assert job['status'] == 'done'
+        assert job['result'] == {'size': 11, 'suffix': 'x'}
+        assert job['started_at'] and job['finished_at']
+        assert 'finished_ts' not in job
+        assert spooled_files(queue) == []
+        assert queue.stats()['completed'] == 1
+
+    def test_handler_error_marks_failed(self, queue):
+        def handler(data):
+            raise ValueError('無法解碼')
+        job = wait_finished(queue, queue.submit(b'x', handler))
+        assert job['status'] == 'failed'
+        assert job['error'] == '無法解碼'
+        assert spooled_files(queue) == []
+        assert queue.stats()['failed'] == 1
+
+    def test_queue_full_and_queue_position(self, queue):
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking(data):
+            started.set()
+            release.wait(5)
+            return {}
+
+        first = queue.submit(b'a', blocking)
+        assert started.wait(5)
+        second = queue.submit(b'b', blocking)
+        assert queue.get(first)['status'] == 'running'
+        assert queue.get(second)['queue_position'] == 1
+
+        with pytest.raises(PhotoQueueFull):
+            queue.submit(b'c', blocking)
+        assert queue.stats()['rejected'] == 1
+
+        release.set()
+        assert wait_finished(queue, second)['status'] == 'done'
+        # 完成後釋放名額
+        wait_finished(queue, queue.submit(b'd', lambda data: {}))
+
+    def test_spool_failure_frees_slot_and_reraises(self, queue, monkeypatch):
+        def broken_mkstemp(*args, **kwargs):
+            raise OSError('磁碟已滿')
+        monkeypatch.setattr('photo_jobs.tempfile.mkstemp', broken_mkstemp)
+
+        with pytest.raises(OSError):
+            queue.submit(b'x', lambda data: {})
+        stats = queue.stats()
+        assert (stats['queued'], stats['running'], stats['failed']) == (0, 0, 1)
+
+        monkeypatch.undo()
+        queue.submit(b'a', lambda data: {})
+        queue.submit(b'b', lambda data: {})
+
+    def test_finished_jobs_expire_after_ttl(self, queue):
+        job_id = queue.submit(b'x', lambda data: {})
+        wait_finished(queue, job_id)
+        expire(queue, job_id)
+        # 查詢時亦會清除過期工作（不需等待下一次提交）
+        assert queue.get(job_id) is None
+
+    def test_stats_prunes_expired_jobs(self, queue):
+        job_id = queue.submit(b'x', lambda data: {})
+        wait_finished(queue, job_id)
+        expire(queue, job_id)
+        queue.stats()
+        conn = sqlite3.connect(queue.db_path)
+        assert conn.execute('SELECT COUNT(*) FROM photo_jobs').fetchone()[0] == 0
+        conn.close()
+
+    def test_jobs_are_shared_between_processes(self, queue):
+        """同一暫存目錄的另一個佇列（另一個工作進程）可查詢工作並共用排隊上限"""
+        other = PhotoJobQueue(workers=1, max_pending=2, result_ttl=60, spool_dir=queue.spool_dir)
+        release = threading.Event()
+        job_id = queue.submit(b'a', lambda data: release.wait(5) and {'ok': True})
+        queue.submit(b'b', lambda data: {})
+        try:
+            with pytest.raises(PhotoQueueFull):
+                other.submit(b'c', lambda data: {})
+        finally:
+            release.set()
+        wait_finished(queue, job_id)
+        assert other.get(job_id)['result'] == {'ok': True}
+
+    def test_unknown_job(self, queue):
+        assert queue.get('missing') is None
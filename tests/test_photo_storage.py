@@ -0,0 +1,236 @@
+"""
+內容定址照片儲存測試
+"""
+import io
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules.photo_storage import PUBLIC_VARIANTS, PhotoStorage
+
+
+def make_jpeg(seed, size=(64, 48)):
+    rng = np.random.default_rng(seed)
+    output = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return PhotoStorage(root=str(tmp_path / 'uploads'), db_path=str(tmp_path / 'storage.db'), retention_days=30)
+
+
+def case_ids(storage, content_hash):
+    return next(photo['case_ids'] for photo in storage.list_photos() if photo['content_hash'] == content_hash)
+
+
+@pytest.mark.unit
+class TestTotals:
+
+    def test_store_duplicate_and_delete(self, storage):
+        first, second = make_jpeg(1), make_jpeg(2)
+        storage.store(first, 'a.jpg')
+        assert storage.store(first, 'a-again.jpg')['deduplicated']
+        storage.store(second, 'b.jpg')
+
+        stats = storage.stats()
+        assert stats['total_files'] == 2
+        assert stats['total_size_bytes'] == len(first) + len(second)
+
+        deleted = storage.clear()
+        assert len(deleted) == 2
+        assert not any(os.path.exists(photo['path']) for photo in deleted)
+        stats = storage.stats()
+        assert (stats['total_files'], stats['total_size_bytes']) == (0, 0)
+
+    def test_cleanup_expired_uses_retention(self, storage):
+        storage.store(make_jpeg(1), 'a.jpg')
+        assert storage.cleanup_expired() == []
+        assert len(storage.cleanup_expired(now=time.time() + 31 * 86400)) == 1
+        assert storage.stats()['total_files'] == 0
+
+
+@pytest.mark.unit
+class TestCaseLinks:
+
+    def test_same_photo_links_many_cases(self, storage):
+        data = make_jpeg(1)
+        content_hash = storage.store(data, 'a.jpg', case_id='case_1')['content_hash']
+        storage.store(data, 'a.jpg', case_id='case_2')
+        storage.link_case(content_hash, 'case_3')
+        storage.link_case(content_hash, 'case_1')
+        assert sorted(case_ids(storage, content_hash)) == ['case_1', 'case_2', 'case_3']
+
+    def test_link_case_ignores_unknown_photo(self, storage):
+        storage.link_case('0' * 64, 'case_1')
+        assert storage.list_photos() == []
+
+    def test_delete_reports_cases_and_notifies_listeners(self, storage):
+        notified = []
+        storage.add_delete_listener(notified.append)
+        content_hash = storage.store(make_jpeg(1), 'a.jpg', case_id='case_1')['content_hash']
+        storage.link_case(content_hash, 'case_2')
+
+        deleted = storage.clear()
+        assert sorted(deleted[0]['case_ids']) == ['case_1', 'case_2']
+        assert notified == [deleted]
+
+        # 再次儲存相同內容時不會帶回已刪除照片的案例連結
+        storage.store(make_jpeg(1), 'a.jpg')
+        assert case_ids(storage, content_hash) == []
+
+    def test_listener_failure_does_not_abort_delete(self, storage):
+        def broken(deleted):
+            raise RuntimeError('boom')
+        storage.add_delete_listener(broken)
+        storage.store(make_jpeg(1), 'a.jpg')
+        assert len(storage.clear()) == 1
+        assert storage.stats()['total_files'] == 0
+
+    def test_limited_cleanup_only_touches_selected_photos(self, storage):
+        cases = {storage.store(make_jpeg(seed), f'{seed}.jpg', case_id=f'case_{seed}')['content_hash']: f'case_{seed}'
+                 for seed in (1, 2)}
+        deleted = storage.cleanup_expired(now=time.time() + 31 * 86400, limit=1)
+        assert len(deleted) == 1
+        assert deleted[0]['case_ids'] == [cases.pop(deleted[0]['content_hash'])]
+        kept, kept_case = cases.popitem()
+        assert case_ids(storage, kept) == [kept_case]
+
+    def test_rows_deleted_before_files(self, storage, monkeypatch):
+        """刪除檔案時數據庫記錄已提交刪除（中途失敗不會留下指向已刪除檔案的記錄）"""
+        storage.store(make_jpeg(1), 'a.jpg', case_id='case_1')
+        remaining = []
+        real_remove = os.remove
+
+        def checking_remove(path):
+            conn = sqlite3.connect(storage.db_path)
+            remaining.append(conn.execute('SELECT COUNT(*) FROM stored_photos').fetchone()[0])
+            conn.close()
+            real_remove(path)
+        monkeypatch.setattr('modules.photo_storage.os.remove', checking_remove)
+
+        assert len(storage.clear()) == 1
+        assert remaining and set(remaining) == {0}
+
+    def test_migrates_single_case_column(self, tmp_path):
+        db_path = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(db_path)
+        conn.executescript('''
+            CREATE TABLE stored_photos (
+                content_hash TEXT PRIMARY KEY, rel_path TEXT NOT NULL, size INTEGER NOT NULL,
+                original_filename TEXT, capture_time TEXT, case_id TEXT,
+                stored_at REAL NOT NULL, expires_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            INSERT INTO stored_photos VALUES ('abc', 'ab/c/abc.jpg', 10, 'a.jpg', NULL, 'case_old', 1, 2);
+        ''')
+        conn.commit()
+        conn.close()
+
+        storage = PhotoStorage(root=str(tmp_path / 'uploads'), db_path=db_path, retention_days=30)
+        assert case_ids(storage, 'abc') == ['case_old']
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT case_id FROM stored_photos').fetchone() == (None,)
+        conn.close()
+
+
+@pytest.mark.unit
+def test_import_flat_files_skips_dotfiles(storage):
+    os.makedirs(storage.root)
+    with open(os.path.join(storage.root, 'legacy.jpg'), 'wb') as f:
+        f.write(make_jpeg(1))
+    for name in ('.gitkeep', 'partial.jpg.tmp'):
+        with open(os.path.join(storage.root, name), 'wb') as f:
+            f.write(b'')
+
+    assert storage.import_flat_files() == 1
+    assert sorted(entry.name for entry in os.scandir(storage.root) if entry.is_file()) == [
+        '.gitkeep', 'partial.jpg.tmp'
+    ]
+    assert storage.stats()['total_files'] == 1
+
+
+@pytest.mark.unit
+class TestDerivedImages:
+
+    def test_public_variants_exclude_original(self):
+        assert PUBLIC_VARIANTS == ('thumb', 'preview')
+
+    def test_derived_bytes_counted_in_totals(self, storage):
+        data = make_jpeg(1, size=(1200, 900))
+        pixels = np.asarray(Image.open(io.BytesIO(data)).convert('RGB'))
+        result = storage.store(data, 'a.jpg', pixels=pixels)
+
+        thumb = storage.variant_path(result['content_hash'], 'thumb')
+        preview = storage.variant_path(result['content_hash'], 'preview')
+        assert Image.open(thumb).width == 320
+        assert Image.open(preview).width == 800
+        assert storage.stats()['total_size_bytes'] == len(data) + os.path.getsize(thumb) + os.path.getsize(preview)
+
+        storage.clear()
+        assert not os.path.exists(thumb) and not os.path.exists(preview)
+        assert storage.stats()['total_size_bytes'] == 0
+
+    def test_missing_derived_images_generated_on_request(self, storage):
+        data = make_jpeg(1, size=(400, 300))
+        content_hash = storage.store(data, 'a.jpg')['content_hash']
+        assert storage.stats()['total_size_bytes'] == len(data)
+
+        thumb = storage.variant_path(content_hash, 'thumb')
+        assert os.path.exists(thumb)
+        assert storage.stats()['total_size_bytes'] > len(data)
+        assert storage.list_photos()[0]['has_derived']
+
+    def test_migrates_index_without_derived_bytes(self, tmp_path):
+        db_path = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(db_path)
+        conn.executescript('''
+            CREATE TABLE stored_photos (
+                content_hash TEXT PRIMARY KEY, rel_path TEXT NOT NULL, size INTEGER NOT NULL,
+                original_filename TEXT, capture_time TEXT, case_id TEXT,
+                stored_at REAL NOT NULL, expires_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE stored_photo_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1), file_count INTEGER NOT NULL, total_bytes INTEGER NOT NULL
+            );
+            INSERT INTO stored_photos VALUES ('abc', 'ab/c/abc.jpg', 10, 'a.jpg', NULL, NULL, 1, 2);
+            INSERT INTO stored_photo_totals VALUES (1, 1, 10);
+        ''')
+        conn.commit()
+        conn.close()
+
+        storage = PhotoStorage(root=str(tmp_path / 'uploads'), db_path=db_path, retention_days=30)
+        assert storage.list_photos()[0]['has_derived'] is False
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("UPDATE stored_photos SET derived_bytes = 5 WHERE content_hash = 'abc'")
+        conn.close()
+        assert storage.stats()['total_size_bytes'] == 15
+
+
+@pytest.mark.unit
+class TestServeStoredPhoto:
+
+    @pytest.fixture
+    def stored(self, storage, monkeypatch):
+        import app as app_module
+        monkeypatch.setattr(app_module, 'photo_storage', storage)
+        return storage.store(make_jpeg(1, size=(400, 300)), 'a.jpg')['content_hash']
+
+    def test_original_is_not_served(self, client, stored):
+        response = client.get(f'/api/photos/{stored}/original')
+        assert response.status_code == 400
+        assert response.get_json()['status'] == 'error'
+
+    def test_thumb_is_served(self, client, stored):
+        response = client.get(f'/api/photos/{stored}/thumb')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg'
+        assert 'immutable' in response.headers['Cache-Control']
+
+    def test_unknown_photo_returns_404(self, client, stored):
+        assert client.get(f"/api/photos/{'0' * 64}/thumb").status_code == 404
@@ -0,0 +1,62 @@
+"""
+攝影機像素分析進程池測試
+"""
+import numpy as np
+import pytest
+
+import webcam_analysis_pool
+from webcam_analysis_pool import WebcamAnalysisPool
+
+
+def frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [((f'hash{index}', 'HKO'), 'HKO', rng.integers(0, 256, (60, 80, 3), dtype=np.uint8))
+            for index in range(count)]
+
+
+@pytest.mark.unit
+class TestWorkerCount:
+
+    def test_single_cpu_runs_in_process(self, monkeypatch):
+        monkeypatch.setattr(webcam_analysis_pool.os, 'cpu_count', lambda: 1)
+        pool = WebcamAnalysisPool()
+        assert pool.workers == 1 and not pool.enabled
+        assert len(pool.compute_metrics(frames(3))) == 3
+        assert pool._executor is None
+
+    def test_unknown_cpu_count_runs_in_process(self, monkeypatch):
+        monkeypatch.setattr(webcam_analysis_pool.os, 'cpu_count', lambda: None)
+        assert not WebcamAnalysisPool().enabled
+
+    def test_default_capped_on_large_hosts(self, monkeypatch):
+        monkeypatch.setattr(webcam_analysis_pool.os, 'cpu_count', lambda: 16)
+        pool = WebcamAnalysisPool()
+        assert pool.workers == webcam_analysis_pool.DEFAULT_ANALYSIS_WORKERS and pool.enabled
+
+    def test_explicit_worker_count(self, monkeypatch):
+        monkeypatch.setattr(webcam_analysis_pool.os, 'cpu_count', lambda: 1)
+        assert WebcamAnalysisPool(workers=3).workers == 3
+
+
+@pytest.mark.unit
+class TestFrameErrors:
+
+    def test_bad_frame_in_process_is_skipped(self):
+        pool = WebcamAnalysisPool(workers=1)
+        batch = frames(2) + [(('bad', 'HKO'), 'HKO', np.zeros((60, 80), dtype=np.uint8))]
+        results = pool.compute_metrics(batch)
+        assert set(results) == {('hash0', 'HKO'), ('hash1', 'HKO')}
+        assert pool.stats()['frame_errors'] == 1
+
+    @pytest.mark.slow
+    def test_bad_frame_does_not_disable_pool(self):
+        pool = WebcamAnalysisPool(workers=2)
+        try:
+            batch = frames(2) + [(('bad', 'HKO'), 'HKO', np.zeros((60, 80), dtype=np.uint8))]
+            results = pool.compute_metrics(batch)
+            assert set(results) == {('hash0', 'HKO'), ('hash1', 'HKO')}
+            stats = pool.stats()
+            assert stats['enabled'] and stats['fallbacks'] == 0 and stats['frame_errors'] == 1
+            assert len(pool.compute_metrics(frames(2, seed=1))) == 2
+        finally:
+            pool.shutdown()
@@ -0,0 +1,151 @@
+"""
+攝影機批量獲取排程測試（以假 session 取代網絡請求）
+"""
+import io
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from hko_webcam_fetcher import HKOWebcamFetcher
+
+
+def make_jpeg():
+    output = io.BytesIO()
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)).save(
+        output, format='JPEG')
+    return output.getvalue()
+
+
+JPEG = make_jpeg()
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=JPEG, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+
+class FakeSession:
+    """按網址返回預設行為：'ok'、'slow'、'error' 或 'etag'（支援 If-None-Match）"""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout, headers):
+        with self._lock:
+            self.calls.append(url)
+        behaviour = self.behaviours[url]
+        if behaviour == 'slow':
+            time.sleep(timeout)
+            raise TimeoutError('read timed out')
+        if behaviour == 'error':
+            return FakeResponse(status_code=500)
+        if behaviour == 'etag':
+            if headers.get('If-None-Match') == '"v1"':
+                return FakeResponse(status_code=304, content=b'')
+            return FakeResponse(headers={'ETag': '"v1"'})
+        return FakeResponse()
+
+
+@pytest.fixture
+def cameras():
+    return list(HKOWebcamFetcher.WEBCAM_LOCATIONS)[:4]
+
+
+def make_fetcher(cameras, behaviours, **kwargs):
+    fetcher = HKOWebcamFetcher(**kwargs)
+    fetcher.session = FakeSession({
+        fetcher.WEBCAM_LOCATIONS[location_id]['url']: behaviour
+        for location_id, behaviour in zip(cameras, behaviours)
+    })
+    fetcher._retry_delay = lambda attempt: 0.01
+    return fetcher
+
+
+@pytest.mark.unit
+class TestFetchSchedule:
+
+    def test_deadline_returns_partial_results(self, cameras):
+        fetcher = make_fetcher(cameras, ['ok', 'slow', 'ok', 'slow'], timeout=5)
+        started = time.monotonic()
+        results = fetcher.fetch_multiple_webcams(cameras, deadline_seconds=0.5, return_format='bytes')
+        assert time.monotonic() - started < 2
+        assert list(results) == [cameras[0], cameras[2]]
+        stats = fetcher.last_batch_stats
+        assert sorted(stats['timed_out']) == sorted([cameras[1], cameras[3]])
+        assert stats['failed'] == []
+        assert (stats['requested'], stats['succeeded']) == (4, 2)
+
+    def test_failures_retry_then_fail(self, cameras):
+        fetcher = make_fetcher(cameras[:2], ['ok', 'error'], retry_attempts=3, failure_threshold=5)
+        results = fetcher.fetch_multiple_webcams(cameras[:2], deadline_seconds=5, return_format='bytes')
+        assert list(results) == [cameras[0]]
+        stats = fetcher.last_batch_stats
+        assert stats['failed'] == [cameras[1]]
+        assert stats['retries'] == 2
+        assert fetcher.session.calls.count(fetcher.WEBCAM_LOCATIONS[cameras[1]]['url']) == 3
+
+    def test_open_breaker_is_skipped(self, cameras):
+        fetcher = make_fetcher(cameras[:2], ['ok', 'error'], retry_attempts=1, failure_threshold=1)
+        fetcher.fetch_multiple_webcams(cameras[:2], deadline_seconds=5, return_format='bytes')
+        fetcher.fetch_multiple_webcams(cameras[:2], deadline_seconds=5, return_format='bytes')
+        assert fetcher.last_batch_stats['circuit_open'] == [cameras[1]]
+
+    def test_conditional_requests_counted(self, cameras):
+        fetcher = make_fetcher(cameras[:1], ['etag'])
+        first = fetcher.fetch_webcam_image(cameras[0], return_format='bytes')
+        second = fetcher.fetch_webcam_image(cameras[0], return_format='bytes')
+        assert not first['not_modified'] and second['not_modified']
+        assert second['image'] == JPEG
+        assert fetcher.get_conditional_stats() == {'not_modified': 1, 'downloaded': 1, 'unchanged_content': 0}
+
+    def test_executor_is_reused(self, cameras):
+        fetcher = make_fetcher(cameras, ['ok'] * 4)
+        fetcher.fetch_webcam_image(cameras[0], return_format='bytes')
+        executor = fetcher._executor
+        fetcher.fetch_multiple_webcams(cameras, return_format='bytes')
+        fetcher.fetch_webcam_image(cameras[1], return_format='bytes')
+        assert fetcher._executor is executor
+
+    def test_concurrent_batches_count_every_download(self, cameras):
+        fetcher = make_fetcher(cameras, ['ok'] * 4, max_workers=8)
+        threads = [threading.Thread(target=fetcher.fetch_multiple_webcams,
+                                    kwargs={'location_ids': cameras, 'return_format': 'bytes'})
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert fetcher.get_conditional_stats()['downloaded'] == 20
+
+
+
+@pytest.mark.unit
+class TestSunSelection:
+
+    def test_shares_predictor_location(self):
+        """攝影機選擇與預測器共用同一香港位置"""
+        import advanced_predictor
+        import hko_webcam_fetcher
+
+        assert hko_webcam_fetcher.HK_LOCATION is advanced_predictor.HK_LOCATION
+        assert advanced_predictor.AdvancedBurnskyPredictor().hong_kong is advanced_predictor.HK_LOCATION
+
+    def test_summer_sunset_selects_western_cameras(self):
+        fetcher = HKOWebcamFetcher()
+        selection = fetcher.select_cameras_for_sun(datetime(2025, 6, 21, 18, 0), 'sunset')
+        assert 290 < selection['azimuth'] < 300
+        assert selection['selected']
+        assert all('west' in fetcher.WEBCAM_LOCATIONS[location_id]['direction'].lower()
+                   for location_id in selection['selected'])
@@ -0,0 +1,109 @@
+"""
+背景攝影機監控快照測試
+"""
+import time
+
+import pytest
+
+from hko_webcam_fetcher import BackgroundWebcamMonitor
+
+
+def make_snapshot(age=0):
+    return {
+        'status': 'success',
+        'overall_sunset_potential': 42.0,
+        'webcam_count': 1,
+        'individual_analyses': {
+            'HK_HKO': {
+                'location': '香港天文台', 'direction': 'W', 'region': '九龍',
+                'capture_time': '2025-07-01T19:00:00',
+                'analysis': {'sunset_potential': {'score': 42.0, 'level': '中等', 'factors': {}}}
+            }
+        },
+        'snapshot_time': '2025-07-01T19:00:00',
+        'snapshot_monotonic': time.monotonic() - age
+    }
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monitor = BackgroundWebcamMonitor(dense_interval=120, normal_interval=600, night_interval=1800)
+    monkeypatch.setattr(monitor, 'next_interval', lambda now=None: (120, 'dense'))
+    return monitor
+
+
+@pytest.mark.unit
+class TestSnapshotAge:
+
+    def test_max_age_follows_current_interval(self, monitor):
+        monitor._snapshot = make_snapshot(age=200)
+        assert monitor.get_snapshot() is not None
+        monitor._snapshot = make_snapshot(age=300)
+        assert monitor.get_snapshot() is None
+
+    def test_explicit_max_age(self, monitor):
+        monitor._snapshot = make_snapshot(age=300)
+        assert monitor.get_snapshot(max_age=600) is not None
+
+    def test_no_snapshot(self, monitor):
+        assert monitor.get_snapshot() is None
+
+
+@pytest.mark.unit
+class TestCurrentConditionsRoute:
+
+    @pytest.fixture
+    def app_monitor(self, monkeypatch):
+        import app as app_module
+        monkeypatch.setattr(app_module, 'WEBCAM_BACKGROUND_MONITOR', True)
+        monitor = app_module.webcam_monitor
+        monkeypatch.setattr(monitor, '_snapshot', None)
+        monkeypatch.setattr(monitor, 'next_interval', lambda now=None: (120, 'dense'))
+
+        def no_fetch(*args, **kwargs):
+            raise AssertionError('不應在請求中即時下載攝影機圖片')
+        monkeypatch.setattr(monitor, 'get_current_conditions', no_fetch)
+        return monitor
+
+    def test_warming_up_returns_503(self, client, app_monitor):
+        response = client.get('/api/webcam/current')
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+        assert response.get_json()['analysis_status'] == 'warming_up'
+
+    def test_stale_snapshot_returns_503(self, client, app_monitor):
+        app_monitor._snapshot = make_snapshot(age=3000)
+        assert client.get('/api/webcam/current').status_code == 503
+
+    def test_snapshot_detailed(self, client, app_monitor):
+        app_monitor._snapshot = make_snapshot()
+        data = client.get('/api/webcam/current').get_json()
+        assert data['overall_sunset_potential'] == 42.0
+        assert list(data['webcam_data']) == ['HK_HKO']
+
+    def test_snapshot_not_detailed(self, client, app_monitor):
+        app_monitor._snapshot = make_snapshot()
+        data = client.get('/api/webcam/current?detailed=false').get_json()
+        assert data['overall_sunset_potential'] == 42.0
+        assert data['webcam_data'] == {}
+        assert 'individual_analyses' in app_monitor._snapshot
+
+
+@pytest.mark.unit
+def test_poll_loop_wakes_when_period_shortens(monkeypatch):
+    """夜間等待期間進入密集時段時提早輪詢，不必等完整的夜間間隔"""
+    monitor = BackgroundWebcamMonitor(dense_interval=0.05, night_interval=1800)
+    intervals = iter([(1800, 'night'), (1800, 'night')])
+    monkeypatch.setattr(monitor, 'next_interval', lambda now=None: next(intervals, (0.05, 'dense')))
+    refreshes = []
+
+    def refresh():
+        refreshes.append(time.monotonic())
+        if len(refreshes) == 2:
+            monitor.stop()
+    monkeypatch.setattr(monitor, 'refresh', refresh)
+
+    monitor.start()
+    monitor._thread.join(timeout=5)
+    assert not monitor._thread.is_alive()
+    assert len(refreshes) == 2
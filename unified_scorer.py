@@ -7,11 +7,13 @@
 """
 
 import math
+import os
 import numpy as np
 from datetime import datetime, time
 import pytz
 from advanced_predictor import AdvancedBurnskyPredictor
 from air_quality_fetcher import AirQualityFetcher
+from model_distiller import check_fidelity, load_surrogate
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,6 +24,9 @@ class UnifiedBurnskyScorer:
         """初始化統一計分器"""
         self.advanced_predictor = AdvancedBurnskyPredictor()
         self.air_quality_fetcher = AirQualityFetcher()
+        self._surrogate = None
+        self._surrogate_loaded = False
+        self._stale_surrogate_warned = None
         
         # 評分系統配置（已修正）
         self.SCORING_CONFIG = {
@@ -38,6 +43,10 @@ class UnifiedBurnskyScorer:
                 'air_quality': 15     # 空氣品質因子 (10% - 不變)
             },
             
+            # ML 後端: 'forest' 使用完整 Random Forest，'surrogate' 使用蒸餾代理模型
+            'ml_backend': os.getenv('ML_SCORER_BACKEND', 'forest'),
+            'surrogate_path': os.getenv('ML_SURROGATE_PATH', 'models/surrogate_model.npz'),
+            
             # 權重配置
             'ml_weights': {
                 'immediate': {'traditional': 0.45, 'ml': 0.55},      # 即時預測
@@ -105,7 +114,7 @@ class UnifiedBurnskyScorer:
             result['traditional_normalized'] = traditional_normalized
             
             # 4. 獲取機器學習分數
-            ml_score = self._get_ml_score(weather_data, forecast_data)
+            ml_score = self._get_ml_score(weather_data, forecast_data, result)
             result['ml_score'] = ml_score
             
             # 5. 確定權重並計算加權分數
@@ -406,14 +415,54 @@ class UnifiedBurnskyScorer:
         except:
             return 5  # 預設值（降低）
     
-    def _get_ml_score(self, weather_data, forecast_data):
-        """獲取機器學習分數"""
+    def _get_ml_score(self, weather_data, forecast_data, result=None):
+        """獲取機器學習分數（提供 result 時，一併記錄模型實際使用的輸入特徵到 result['ml_features']）"""
         try:
+            if self.SCORING_CONFIG['ml_backend'] == 'surrogate':
+                surrogate = self._get_surrogate()
+                if surrogate is not None:
+                    features = self.advanced_predictor.extract_features(weather_data, forecast_data)
+                    if result is not None:
+                        result['ml_features'] = features
+                    return surrogate.predict_score(features)
+            
             ml_result = self.advanced_predictor.predict_ml(weather_data, forecast_data)
+            if result is not None:
+                result['ml_features'] = ml_result.get('input_features', {})
             return ml_result.get('ml_burnsky_score', 50)
         except:
             return 50  # 預設值
     
+    def _get_surrogate(self):
+        """
+        延遲載入蒸餾代理模型
+        
+        載入失敗、保真度未達驗收門檻（見 model_distiller.check_fidelity），或代理模型的教師版本
+        與目前模型版本不同（模型已被重新訓練替換）時返回 None，回退到完整模型
+        """
+        if not self._surrogate_loaded:
+            self._surrogate = load_surrogate(self.SCORING_CONFIG['surrogate_path'])
+            self._surrogate_loaded = True
+            if self._surrogate is None:
+                print("⚠️ 代理模型不可用，使用完整 Random Forest 模型")
+            else:
+                failures = check_fidelity(self._surrogate.metadata)
+                if failures:
+                    print(f"⚠️ 代理模型保真度未達驗收門檻（{'；'.join(failures)}），使用完整 Random Forest 模型")
+                    self._surrogate = None
+        if self._surrogate is None:
+            return None
+        
+        teacher_version = self._surrogate.metadata.get('teacher_version')
+        current_version = self.advanced_predictor.model_version
+        if teacher_version != current_version:
+            if self._stale_surrogate_warned != current_version:
+                print(f"⚠️ 代理模型由模型版本 {teacher_version} 蒸餾，目前版本為 {current_version}，"
+                      f"改用完整 Random Forest 模型（請重新執行 model_distiller.py）")
+                self._stale_surrogate_warned = current_version
+            return None
+        return self._surrogate
+    
     def _determine_weights(self, advance_hours):
         """確定權重配置"""
         if 1 <= advance_hours <= 2:
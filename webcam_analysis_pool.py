@@ -0,0 +1,166 @@
+"""
+攝影機圖片並行分析模組
+以進程池並行計算多部攝影機的像素指標；已解碼的圖片經 multiprocessing.shared_memory
+傳遞給工作進程，不需序列化大型陣列。單核主機或進程池故障時自動改為在本進程計算
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from hko_webcam_fetcher import WebcamImageAnalyzer
+
+# 預設工作進程數上限：單一 dyno 記憶體有限，每個 spawn 進程都會重新匯入主模組，不按 CPU 核心數擴展
+DEFAULT_ANALYSIS_WORKERS = 2
+
+# 工作進程內的分析器（由 _init_worker 建立）
+_WORKER_ANALYZER = None
+
+
+def _init_worker(sky_masks):
+    """工作進程初始化：建立不使用快取的分析器（天空遮罩只傳送一次）"""
+    global _WORKER_ANALYZER
+    _WORKER_ANALYZER = WebcamImageAnalyzer(metrics_cache_size=0, sky_masks=sky_masks)
+
+
+def _analyze_shared_frame(shm_name, offset, shape, location_id):
+    """在工作進程內附加共享記憶體，直接以視圖計算像素指標"""
+    # 工作進程與主進程共用同一資源追蹤器，共享記憶體只由主進程 unlink
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        metrics = _WORKER_ANALYZER.compute_pixel_metrics(frame, location_id)
+        del frame
+        return metrics
+    finally:
+        shm.close()
+
+
+class WebcamAnalysisPool:
+    """攝影機像素指標的進程池分析後端"""
+
+    def __init__(self, workers: int = None, sky_masks: dict = None):
+        """
+        Args:
+            workers: 工作進程數，None 使用 DEFAULT_ANALYSIS_WORKERS 與 CPU 核心數的較小者；
+                     小於 2（例如單核主機）時直接在本進程計算
+            sky_masks: 傳給工作進程的天空遮罩，None 時各進程從 SKY_MASK_PATH 載入
+        """
+        self.workers = min(DEFAULT_ANALYSIS_WORKERS, os.cpu_count() or 1) if workers is None else workers
+        self.sky_masks = sky_masks
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._local_analyzer = None
+        self.enabled = self.workers >= 2
+        self.batches = 0
+        self.fallbacks = 0
+        self.frame_errors = 0
+
+    @classmethod
+    def from_env(cls, sky_masks: dict = None):
+        """根據 WEBCAM_ANALYSIS_WORKERS 建立（未設定時使用 DEFAULT_ANALYSIS_WORKERS）"""
+        workers = os.getenv('WEBCAM_ANALYSIS_WORKERS')
+        return cls(int(workers) if workers else None, sky_masks)
+
+    def get_executor(self):
+        """延遲建立進程池（背景監控及照片批次分析共用同一組工作進程）"""
+        with self._executor_lock:
+            if self._executor is None:
+                # 使用 spawn 啟動，避免在多執行緒的 Flask 進程中 fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.sky_masks,)
+                )
+            return self._executor
+
+    def _compute_local(self, frames):
+        """在本進程逐張計算；個別圖片分析失敗時略過該圖片（由調用者之後按需要重新分析）"""
+        if self._local_analyzer is None:
+            self._local_analyzer = WebcamImageAnalyzer(metrics_cache_size=0, sky_masks=self.sky_masks)
+        results = {}
+        for key, location_id, frame in frames:
+            try:
+                results[key] = self._local_analyzer.compute_pixel_metrics(frame, location_id)
+            except Exception as e:
+                self.logger.warning(f"Pixel analysis failed for {location_id}: {e}")
+                self.frame_errors += 1
+        return results
+
+    def compute_metrics(self, frames):
+        """
+        計算多張圖片的像素指標
+
+        Args:
+            frames: [(鍵, 攝影機ID, RGB uint8 陣列), ...]
+
+        Returns:
+            dict: 鍵 → 像素指標（分析失敗的圖片不在結果內）
+        """
+        if not self.enabled or len(frames) < 2:
+            return self._compute_local(frames)
+
+        total_size = sum(frame.nbytes for _, _, frame in frames)
+        shm = shared_memory.SharedMemory(create=True, size=total_size)
+        try:
+            # 所有圖片依次複製到同一塊共享記憶體，工作進程只收到名稱、偏移及形狀
+            offsets = []
+            offset = 0
+            for _, _, frame in frames:
+                target = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                target[...] = frame
+                del target
+                offsets.append(offset)
+                offset += frame.nbytes
+
+            executor = self.get_executor()
+            futures = [
+                executor.submit(_analyze_shared_frame, shm.name, frame_offset, frame.shape, location_id)
+                for (_, location_id, frame), frame_offset in zip(frames, offsets)
+            ]
+            results = {}
+            retry = []
+            for (key, location_id, frame), future in zip(frames, futures):
+                try:
+                    results[key] = future.result()
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    # 單張圖片分析失敗，或共用進程池被照片批次分析關閉而取消：只有該圖片改為本進程計算
+                    self.logger.warning(f"Pool analysis failed for {location_id}, retrying in-process: {e}")
+                    retry.append((key, location_id, frame))
+            results.update(self._compute_local(retry))
+            self.batches += 1
+            return results
+        except BrokenExecutor as e:
+            # 進程池故障（例如工作進程被終止）時改為本進程計算
+            self.logger.warning(f"Analysis pool failed, falling back to in-process analysis: {e}")
+            self.fallbacks += 1
+            self.shutdown()
+            self.enabled = False
+            return self._compute_local(frames)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        """關閉工作進程（下次使用時重新建立）"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'enabled': self.enabled,
+            'batches': self.batches,
+            'fallbacks': self.fallbacks,
+            'frame_errors': self.frame_errors
+        }
@@ -0,0 +1,136 @@
+"""
+攝影機圖片代理快取模組
+保存每部攝影機最新一張圖片及預先生成的縮圖／中等尺寸版本，
+以內容雜湊作 ETag，瀏覽器重複載入時可直接回應 304，
+攝影機分析頁面一次顯示 32 張縮圖也只需讀取記憶體
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+from PIL import Image
+
+WEBCAM_PROXY_MAX_AGE = int(os.getenv('WEBCAM_PROXY_MAX_AGE', '60'))
+
+# 各尺寸版本的最大寬度（'full' 為上游原圖，不重新編碼）
+VARIANT_WIDTHS = {
+    'thumb': 400,
+    'medium': 960
+}
+VARIANT_JPEG_QUALITY = 80
+SUPPORTED_SIZES = ('full',) + tuple(VARIANT_WIDTHS)
+
+
+def build_variant(data: bytes, width: int, quality: int = VARIANT_JPEG_QUALITY) -> bytes:
+    """以 JPEG draft 模式低解析度解碼後縮放，生成指定寬度的 JPEG"""
+    image = Image.open(io.BytesIO(data))
+    if image.width <= width:
+        return data
+    height = max(1, round(image.height * width / image.width))
+    # draft 令解碼器直接輸出不小於目標尺寸的 1/2、1/4 或 1/8 縮圖
+    image.draft('RGB', (width, height))
+    image = image.convert('RGB').resize((width, height), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+class WebcamImageProxy:
+    """攝影機圖片代理快取（每部攝影機只保留最新一張圖片的各尺寸版本）"""
+
+    def __init__(self, fetcher, max_age: int = WEBCAM_PROXY_MAX_AGE, variant_widths: dict = None):
+        """
+        Args:
+            fetcher: HKOWebcamFetcher（共用其條件請求快取）
+            max_age: 圖片在此秒數內不再向上游確認，亦作為 Cache-Control max-age
+            variant_widths: 尺寸名稱 → 最大寬度（可用尺寸由此決定，另加 'full'）
+        """
+        variant_widths = dict(variant_widths or VARIANT_WIDTHS)
+        for name, width in variant_widths.items():
+            if name == 'full':
+                raise ValueError("'full' is reserved for the upstream image")
+            if not isinstance(width, int) or width <= 0:
+                raise ValueError(f"Invalid width for size {name}: {width!r}")
+        self.fetcher = fetcher
+        self.max_age = max_age
+        self.variant_widths = variant_widths
+        self.supported_sizes = ('full',) + tuple(variant_widths)
+        self.logger = logging.getLogger(__name__)
+        self._entries = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats_counters = {'memory_hits': 0, 'upstream_checks': 0, 'variant_builds': 0, 'failures': 0}
+
+    def _lock_for(self, location_id):
+        with self._locks_guard:
+            return self._locks.setdefault(location_id, threading.Lock())
+
+    def get(self, location_id: str, size: str = 'full'):
+        """
+        取得攝影機圖片的指定尺寸版本
+
+        Returns:
+            dict: {'data', 'etag', 'capture_time', 'content_hash', 'size'}，上游無法取得時返回 None
+        """
+        if size not in self.supported_sizes:
+            raise ValueError(f"Unsupported size: {size}")
+
+        # 同一攝影機的並發請求只由一個執行緒向上游確認及生成縮圖
+        with self._lock_for(location_id):
+            entry = self._entries.get(location_id)
+            if entry and time.monotonic() - entry['checked_at'] <= self.max_age:
+                self.stats_counters['memory_hits'] += 1
+            else:
+                # 背景監控剛下載過的圖片直接沿用，否則發出條件請求（未更新時上游回應 304）
+                result = self.fetcher.get_cached_image(location_id, self.max_age, return_format='bytes')
+                if result is None:
+                    self.stats_counters['upstream_checks'] += 1
+                    result = self.fetcher.fetch_webcam_image(location_id, return_format='bytes')
+                if result is None:
+                    self.stats_counters['failures'] += 1
+                    # 上游失敗時仍以舊圖片回應
+                    if entry is None:
+                        return None
+                else:
+                    entry = self._refresh_entry(location_id, entry, result)
+
+        return {
+            'data': entry['variants'][size],
+            'etag': f'{entry["content_hash"][:20]}-{size}',
+            'capture_time': entry['capture_time'],
+            'content_hash': entry['content_hash'],
+            'size': size
+        }
+
+    def _refresh_entry(self, location_id, entry, result):
+        """圖片內容改變時重新生成所有尺寸版本，否則只更新確認時間"""
+        if entry and entry['content_hash'] == result['content_hash']:
+            entry = dict(entry, checked_at=time.monotonic())
+        else:
+            data = result['image']
+            variants = {'full': data}
+            for name, width in self.variant_widths.items():
+                try:
+                    variants[name] = build_variant(data, width)
+                except Exception as e:
+                    self.logger.warning(f"Failed to build {name} variant for {location_id}: {e}")
+                    variants[name] = data
+            self.stats_counters['variant_builds'] += 1
+            entry = {
+                'content_hash': result['content_hash'],
+                'capture_time': result['capture_time'],
+                'variants': variants,
+                'checked_at': time.monotonic()
+            }
+        self._entries[location_id] = entry
+        return entry
+
+    def stats(self):
+        """代理快取統計"""
+        return dict(self.stats_counters,
+                    cameras_cached=len(self._entries),
+                    cached_bytes=sum(len(data) for entry in list(self._entries.values())
+                                     for data in entry['variants'].values()),
+                    max_age=self.max_age)
@@ -0,0 +1,201 @@
+"""
+攝影機指標時間序列模組
+每次攝影機分析的指標（平均RGB、雲覆蓋度、能見度、顏色豐富度、燒天潛力）以定寬記錄
+寫入 SQLite，提供時間窗口統計及以顏色豐富度斜率推算的短期臨近預報，圖表無需重新下載圖片
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+WEBCAM_METRICS_DB = os.getenv('WEBCAM_METRICS_DB', 'webcam_metrics.db')
+WEBCAM_METRICS_RETENTION_DAYS = int(os.getenv('WEBCAM_METRICS_RETENTION_DAYS', '14'))
+
+METRIC_COLUMNS = ['red', 'green', 'blue', 'cloud_coverage', 'visibility', 'color_richness', 'sunset_potential']
+
+# 斜率（每分鐘）絕對值低於此值視為持平
+STABLE_SLOPE_PER_MINUTE = 0.2
+
+
+class WebcamMetricsStore:
+    """攝影機指標時間序列（SQLite，(攝影機, 時間) 為主鍵）"""
+
+    def __init__(self, db_path=WEBCAM_METRICS_DB, retention_days=WEBCAM_METRICS_RETENTION_DAYS):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._last_hashes = {}
+        self._last_prune = 0
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._initialized:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS webcam_metrics (
+                    location_id TEXT NOT NULL,
+                    ts REAL NOT NULL,           -- 拍攝時間 (Unix 秒)
+                    content_hash TEXT,
+                    {', '.join(f'{column} REAL' for column in METRIC_COLUMNS)},
+                    PRIMARY KEY (location_id, ts)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_webcam_metrics_ts ON webcam_metrics(ts)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def record_conditions(self, conditions):
+        """
+        記錄 RealTimeWebcamMonitor.get_current_conditions 的分析結果
+
+        與上一筆內容雜湊相同的圖片（攝影機未更新）不會重複記錄
+
+        Returns:
+            int: 新增記錄數
+        """
+        rows = []
+        for location_id, item in conditions.get('individual_analyses', {}).items():
+            analysis = item.get('analysis', {})
+            if 'sunset_potential' not in analysis:
+                continue
+            content_hash = item.get('content_hash')
+            if content_hash and self._last_hashes.get(location_id) == content_hash:
+                continue
+
+            capture_ts = self._to_timestamp(item.get('capture_time'))
+            color = analysis.get('mean_color', {})
+            potential = analysis['sunset_potential']
+            rows.append((
+                location_id, capture_ts, content_hash,
+                color.get('red'), color.get('green'), color.get('blue'),
+                analysis.get('cloud_coverage'), analysis.get('visibility'),
+                potential.get('factors', {}).get('color_richness'), potential.get('score')
+            ))
+            self._last_hashes[location_id] = content_hash
+
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO webcam_metrics (location_id, ts, content_hash, "
+                        f"{', '.join(METRIC_COLUMNS)}) VALUES ({', '.join(['?'] * (3 + len(METRIC_COLUMNS)))})",
+                        rows
+                    )
+                    # 每小時清理一次過期記錄
+                    if time.time() - self._last_prune > 3600:
+                        conn.execute('DELETE FROM webcam_metrics WHERE ts < ?',
+                                     (time.time() - self.retention_days * 86400,))
+                        self._last_prune = time.time()
+            finally:
+                conn.close()
+        return len(rows)
+
+    @staticmethod
+    def _to_timestamp(capture_time):
+        """ISO 字串或 datetime 轉為 Unix 秒"""
+        if capture_time is None:
+            return time.time()
+        if isinstance(capture_time, str):
+            from datetime import datetime
+            capture_time = datetime.fromisoformat(capture_time)
+        return capture_time.timestamp()
+
+    def query(self, location_id=None, window_minutes=120):
+        """讀取時間窗口內的記錄，返回 攝影機ID → {'ts': 陣列, 欄位: 陣列}"""
+        since = time.time() - window_minutes * 60
+        sql = f"SELECT location_id, ts, {', '.join(METRIC_COLUMNS)} FROM webcam_metrics WHERE ts >= ?"
+        params = [since]
+        if location_id:
+            sql += " AND location_id = ?"
+            params.append(location_id)
+        sql += " ORDER BY location_id, ts"
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+
+        series = {}
+        for row in rows:
+            series.setdefault(row[0], []).append(row[1:])
+        result = {}
+        for cam_id, records in series.items():
+            values = np.array(records, dtype=np.float64)
+            result[cam_id] = {'ts': values[:, 0]}
+            for index, column in enumerate(METRIC_COLUMNS, start=1):
+                result[cam_id][column] = values[:, index]
+        return result
+
+    @staticmethod
+    def nowcast(ts, color_richness, lookback_minutes=30, horizons=(15, 30)):
+        """
+        以最近 lookback_minutes 分鐘顏色豐富度的線性斜率推算短期走勢
+
+        Returns:
+            dict 或 None（數據點不足）
+        """
+        mask = ~np.isnan(color_richness) & (ts >= ts[-1] - lookback_minutes * 60)
+        if mask.sum() < 3:
+            return None
+        minutes = (ts[mask] - ts[mask][-1]) / 60
+        values = color_richness[mask]
+        if np.ptp(minutes) == 0:
+            return None
+        slope, intercept = np.polyfit(minutes, values, 1)
+        if slope > STABLE_SLOPE_PER_MINUTE:
+            trend = 'rising'
+        elif slope < -STABLE_SLOPE_PER_MINUTE:
+            trend = 'falling'
+        else:
+            trend = 'stable'
+        return {
+            'slope_per_minute': round(float(slope), 3),
+            'trend': trend,
+            'points_used': int(mask.sum()),
+            'projected_color_richness': {
+                f'{horizon}min': round(float(np.clip(intercept + slope * horizon, 0, 100)), 1)
+                for horizon in horizons
+            }
+        }
+
+    def trend(self, location_id=None, window_minutes=120, include_series=False):
+        """每部攝影機的窗口統計、最新值及臨近預報"""
+        cameras = {}
+        for cam_id, series in self.query(location_id, window_minutes).items():
+            aggregates = {}
+            for column in METRIC_COLUMNS:
+                values = series[column][~np.isnan(series[column])]
+                if len(values):
+                    aggregates[column] = {
+                        'mean': round(float(values.mean()), 2),
+                        'min': round(float(values.min()), 2),
+                        'max': round(float(values.max()), 2),
+                        'latest': round(float(values[-1]), 2)
+                    }
+            entry = {
+                'count': int(len(series['ts'])),
+                'first_time': float(series['ts'][0]),
+                'last_time': float(series['ts'][-1]),
+                'aggregates': aggregates,
+                'nowcast': self.nowcast(series['ts'], series['color_richness'])
+            }
+            if include_series:
+                entry['series'] = {
+                    'ts': series['ts'].tolist(),
+                    **{column: [None if np.isnan(v) else round(float(v), 2) for v in series[column]]
+                       for column in METRIC_COLUMNS}
+                }
+            cameras[cam_id] = entry
+        return cameras
+
+
+# 全域共用實例
+webcam_metrics_store = WebcamMetricsStore()